@@ -28,33 +28,597 @@ asyncio.create_task() → Runs multiple tasks concurrently.
 #
 #     execute() # ⏳ Takes 6 seconds (each task runs one after another).
 
-if __name__ == "__main__":
-    import asyncio
+import asyncio
 
 
-    async def async_task(name):
+async def async_task(name, delay=3, verbose=True):
+    if verbose:
         print(f"Starting {name}...")
-        await asyncio.sleep(3)  # Simulates a delay (non-blocking)
+    await asyncio.sleep(delay)  # Simulates a delay (non-blocking)
+    if verbose:
         print(f"Finished {name}!")
+    return name
 
 
-    async def main():
-        task1 = asyncio.create_task(async_task("Task 1"))
-        task2 = asyncio.create_task(async_task("Task 2"))
+async def main():
+    task1 = asyncio.create_task(async_task("Task 1"))
+    task2 = asyncio.create_task(async_task("Task 2"))
 
-        await task1  # Waits for task1 to complete
-        await task2  # Waits for task2 to complete
+    await task1  # Waits for task1 to complete
+    await task2  # Waits for task2 to complete
 
 
+if __name__ == "__main__":
     asyncio.run(main())  # Run the async event loop
 
-
-    """
-    4️⃣ When to Use asyncio?
+"""
+4️⃣ When to Use asyncio?
 ✅ I/O-bound tasks (e.g., API calls, file handling, databases).
 ✅ Multiple tasks that can run independently (e.g., fetching multiple web pages).
 ❌ Not for CPU-heavy tasks (use multiprocessing instead).
-    """
+"""
+
+"""
+5️⃣ Running Thousands of Tasks: Bounded Runner
+create_task() for every job works for two tasks, not for 50,000: nothing limits how many run at once,
+every coroutine object is created up front, and one failure is simply lost.
+run_bounded() pulls jobs lazily from any iterable and yields (index, result) in completion order:
+✅ limit → at most `limit` tasks in flight, so memory stays flat however long the input is
+✅ rate → token bucket, at most `rate` starts per second (bursts up to `burst`)
+✅ timeout → per attempt, via asyncio.wait_for()
+✅ retries → exponential backoff with random jitter
+Jobs can be coroutines or callables returning one (e.g. functools.partial(async_task, "Task 1")).
+Only callables can be retried, since a coroutine object can only be awaited once.
+"""
+import functools
+import itertools
+import random
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: the benchmark skips the memory column
+    resource = None
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst is not None and burst < 1:
+            raise ValueError("burst must be at least 1, or acquire() could never get a whole token")
+        self.rate = rate
+        self.capacity = max(1.0, burst or rate)  # rate=0.5 still holds one token, handed out every 2s
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:  # no await between check and take, so no other task can interleave
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def run_job(index, job, bucket, timeout, retries, backoff):
+    for attempt in range(retries + 1):
+        if bucket:
+            await bucket.acquire()
+        try:
+            return index, await asyncio.wait_for(job() if callable(job) else job, timeout), None
+        except Exception as exc:  # asyncio.TimeoutError included
+            if attempt == retries or not callable(job):
+                return index, None, exc
+            await asyncio.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))  # jitter spreads retries out
+
+
+async def run_bounded(jobs, limit=100, rate=None, burst=None, timeout=None, retries=0, backoff=0.1,
+                      return_exceptions=True):
+    bucket = TokenBucket(rate, burst) if rate else None
+    jobs = enumerate(jobs)
+    pending = set()
+
+    def fill():
+        for index, job in itertools.islice(jobs, limit - len(pending)):
+            pending.add(asyncio.create_task(run_job(index, job, bucket, timeout, retries, backoff)))
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            fill()  # top up before handing results to a possibly slow consumer
+            for task in done:
+                index, result, error = task.result()
+                if error is not None and not return_exceptions:
+                    raise error
+                yield index, result if error is None else error
+    finally:
+        for task in pending:  # the consumer stopped early or an error was raised
+            task.cancel()
+
+
+async def benchmark_runner(sizes=(10_000, 100_000, 1_000_000), limit=1_000):
+    print(f"{'tasks':>10}{'seconds':>10}{'tasks/s':>12}{'peak RSS +MB':>14}")
+    timings = {}
+    for n in sizes:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+        jobs = (functools.partial(async_task, f"Task {i}", 0, False) for i in range(n))
+        start_time = time.perf_counter()
+        async for _ in run_bounded(jobs, limit=limit):
+            pass
+        elapsed = time.perf_counter() - start_time
+        grown = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024 if resource else float("nan")
+        timings[n] = elapsed
+        print(f"{n:>10,}{elapsed:>10.2f}{n / elapsed:>12,.0f}{grown:>14.1f}")
+    return timings
+
+
+# if __name__ == "__main__":
+#     async def fan_out():
+#         jobs = (functools.partial(async_task, f"Task {i}", 1, False) for i in range(50_000))
+#         async for index, result in run_bounded(jobs, limit=500, rate=10_000, timeout=5, retries=2):
+#             pass  # ✅ results arrive as tasks finish, never more than 500 running
+#
+#     asyncio.run(fan_out())
+#     asyncio.run(benchmark_runner())
+
+"""
+6️⃣ CPU Work Inside the Event Loop: Offloading
+"Not for CPU-heavy tasks" is only half the story: while a coroutine runs cpu_task() the whole loop
+is frozen and every other task waits. Offloader moves that work out of the loop:
+✅ run_cpu()   → a shared process pool (CPU-bound callables, through loop.run_in_executor-style futures)
+✅ run_io()    → a thread pool via loop.run_in_executor (blocking I/O, e.g. a sync database driver)
+✅ run_small() → many tiny CPU calls are batched into one pool round-trip
+✅ Cancelling an awaiting coroutine reaches the worker: a queued call never starts, and a running one
+   stops at its next check_cancelled()
+measure_loop_lag() shows how late the loop wakes up, with and without offloading.
+"""
+import multiprocessing
+import statistics
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def cpu_task(n):  # the CPU-bound task from multi-threading-processing.py
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+class WorkerCancelled(Exception):
+    pass
+
+
+_cancel_flags = None  # shared with every worker process at startup
+_current_slot = None
+
+
+def init_worker(flags):
+    global _cancel_flags
+    _cancel_flags = flags
+
+
+def check_cancelled():
+    # Call this every so often inside long CPU functions to make them cancellable
+    if _current_slot is not None and _cancel_flags[_current_slot]:
+        raise WorkerCancelled()
+
+
+def run_in_slot(slot, func, args):
+    global _current_slot
+    if slot is not None and _cancel_flags[slot]:
+        raise WorkerCancelled()  # cancelled while still queued: don't even start
+    _current_slot = slot
+    try:
+        return func(*args)
+    finally:
+        _current_slot = None
+
+
+def run_batch(func, calls):
+    results = []
+    for args in calls:
+        try:
+            results.append((True, func(*args)))
+        except Exception as exc:
+            results.append((False, exc))
+    return results
+
+
+def cancellable_cpu_task(n, check_every=100_000):
+    total = 0
+    for start in range(0, n, check_every):
+        check_cancelled()
+        for i in range(start, min(start + check_every, n)):
+            total += i * i
+    return total
+
+
+class Offloader:
+    def __init__(self, processes=None, threads=None, slots=1024, batch_window=0.002, max_batch=64):
+        self._flags = multiprocessing.RawArray("b", slots)  # one cancel flag per in-flight run_cpu() call
+        self._free_slots = deque(range(slots))
+        self.process_pool = ProcessPoolExecutor(processes, initializer=init_worker, initargs=(self._flags,))
+        self.thread_pool = ThreadPoolExecutor(threads)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._batches = {}  # func -> (calls, timer handle)
+
+    async def run_cpu(self, func, *args):
+        slot = self._free_slots.popleft() if self._free_slots else None  # out of slots: not cancellable
+        if slot is not None:
+            self._flags[slot] = 0
+        future = self.process_pool.submit(run_in_slot, slot, func, args)
+        if slot is not None:
+            # The slot is reused only once the worker is really done with it, not when we stop waiting
+            future.add_done_callback(lambda _: self._free_slots.append(slot))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if slot is not None:
+                self._flags[slot] = 1  # reaches the worker through shared memory
+            raise
+
+    async def run_io(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.thread_pool, functools.partial(func, *args))
+
+    async def run_small(self, func, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if func not in self._batches:
+            self._batches[func] = ([], loop.call_later(self.batch_window, self._flush, func))
+        calls = self._batches[func][0]
+        calls.append((args, future))
+        if len(calls) >= self.max_batch:
+            self._flush(func)
+        return await future
+
+    def _flush(self, func):
+        calls, timer = self._batches.pop(func)
+        timer.cancel()
+        calls = [(args, future) for args, future in calls if not future.cancelled()]
+        if not calls:
+            return
+        done = asyncio.wrap_future(self.process_pool.submit(run_batch, func, [args for args, _ in calls]))
+
+        def deliver(done):
+            if done.cancelled() or done.exception() is not None:
+                for _, future in calls:
+                    if not future.done():
+                        future.set_exception(done.exception() if not done.cancelled() else asyncio.CancelledError())
+                return
+            for (_, future), (ok, value) in zip(calls, done.result()):
+                if not future.done():  # a caller may have given up meanwhile
+                    future.set_result(value) if ok else future.set_exception(value)
+
+        done.add_done_callback(deliver)
+
+    def close(self):
+        self.process_pool.shutdown(cancel_futures=True)
+        self.thread_pool.shutdown(cancel_futures=True)
+
+
+async def measure_loop_lag(duration=1.0, interval=0.005):
+    loop = asyncio.get_running_loop()
+    lags = []
+    end = loop.time() + duration
+    while loop.time() < end:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)  # how late the loop woke us up
+    return lags
+
+
+async def compare_loop_lag(n=2_000_000, calls=4):
+    offloader = Offloader()
+    await offloader.run_cpu(cpu_task, 1)  # start the worker processes before measuring
+
+    async def inline():
+        for _ in range(calls):
+            cpu_task(n)  # blocks the loop
+            await asyncio.sleep(0)
+
+    async def offloaded():
+        await asyncio.gather(*(offloader.run_cpu(cpu_task, n) for _ in range(calls)))
 
+    results = {}
+    for name, work in (("inline", inline), ("offloaded", offloaded)):
+        monitor = asyncio.create_task(measure_loop_lag(duration=0.2))
+        await work()
+        lags = sorted(await monitor + [0.0])
+        results[name] = {"p50": statistics.median(lags), "p99": lags[int(len(lags) * 0.99)], "max": lags[-1]}
+        print(f"{name:<10} loop lag p50 {results[name]['p50'] * 1000:7.2f} ms   "
+              f"p99 {results[name]['p99'] * 1000:7.2f} ms   max {results[name]['max'] * 1000:7.2f} ms")
+    offloader.close()
+    return results
 
 
+# if __name__ == "__main__":
+#     asyncio.run(compare_loop_lag())  # ✅ inline: lag ≈ one cpu_task() call, offloaded: a few ms at most
+
+"""
+7️⃣ Event-Loop Health: Slow Steps and a Task Timeline
+main() only prints "Starting/Finished", so a coroutine that blocks the loop is invisible.
+A task runs as a series of steps: from one await to the next, the loop can do nothing else.
+LoopMonitor installs a task factory that times every step of every task:
+✅ Per task: wall time, number of steps and time spent blocking the loop
+✅ Slow steps above slow_step (default 10 ms) are reported as they happen
+✅ Loop lag percentiles and the number of pending tasks, sampled in the background
+✅ export_trace() writes a Chrome trace / Perfetto JSON timeline (one row per task)
+✅ Memory stays bounded in long-running services: only the last max_tasks tasks and max_samples lag
+   samples are kept, each task keeps its last max_steps steps (its counts and totals cover them all)
+✅ An existing task factory (e.g. asyncio.eager_task_factory) keeps working: the monitor wraps the
+   coroutine and hands it to that factory, uninstall() puts the factory back
+When the monitor is not installed nothing is wrapped, so the cost is exactly zero.
+"""
+import collections.abc
+import json
+import sys
+from collections import deque
+
+
+class TimedCoroutine(collections.abc.Coroutine):
+    # Wraps a coroutine and times each send()/throw(): one call = one step between two awaits
+    __slots__ = ("coro", "created", "steps", "count", "blocking", "longest", "_monitor")
+
+    def __init__(self, coro, monitor):
+        self.coro = coro
+        self.created = time.perf_counter()
+        self.steps = deque(maxlen=monitor.max_steps)  # (start, end) of the most recent steps
+        self.count = 0
+        self.blocking = 0.0
+        self.longest = 0.0
+        self._monitor = monitor
+
+    def _step(self, start, end):
+        self.steps.append((start, end))
+        self.count += 1
+        self.blocking += end - start
+        self.longest = max(self.longest, end - start)
+        if end - start > self._monitor.slow_step:
+            self._monitor.slow(self, end - start)
+
+    def send(self, value, clock=time.perf_counter):
+        start = clock()
+        try:
+            return self.coro.send(value)
+        finally:
+            self._step(start, clock())
+
+    def throw(self, typ, val=None, tb=None, clock=time.perf_counter):
+        start = clock()
+        try:
+            return self.coro.throw(typ, val, tb) if val is not None else self.coro.throw(typ)
+        finally:
+            self._step(start, clock())
+
+    def close(self):
+        return self.coro.close()
+
+    def __await__(self):
+        return self  # Coroutine requires it, a Task never calls it
+
+
+class LoopMonitor:
+    def __init__(self, slow_step=0.010, sample_interval=0.010, on_slow_step=None,
+                 max_tasks=10_000, max_steps=1_000, max_samples=100_000):
+        self.slow_step = slow_step
+        self.sample_interval = sample_interval
+        self.on_slow_step = on_slow_step or self._report_slow_step
+        self.max_steps = max_steps
+        self.traced = deque(maxlen=max_tasks)  # one TimedCoroutine per recent task created while installed
+        self.lags = deque(maxlen=max_samples)
+        self.pending = deque(maxlen=max_samples)
+        self._origin = time.perf_counter()
+        self._sampler = None
+        self._previous_factory = None
+
+    def install(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        self._sampler = loop.create_task(self._sample(loop))  # created before the factory, so not traced
+        self._previous_factory = loop.get_task_factory()
+        loop.set_task_factory(self._task_factory)
+        return self
+
+    def uninstall(self, loop=None):
+        loop = loop or asyncio.get_running_loop()
+        loop.set_task_factory(self._previous_factory)
+        if self._sampler:
+            self._sampler.cancel()
+
+    def _task_factory(self, loop, coro, **kwargs):
+        # Kept as small as possible: names and totals are only worked out in summary()
+        timed = TimedCoroutine(coro, self)
+        self.traced.append(timed)
+        if self._previous_factory is not None:  # e.g. eager tasks: keep them, just timed
+            return self._previous_factory(loop, timed, **kwargs)
+        return asyncio.Task(timed, loop=loop, **kwargs)
+
+    async def _sample(self, loop):
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.sample_interval)
+            self.lags.append(loop.time() - start - self.sample_interval)
+            self.pending.append(len(asyncio.all_tasks(loop)) - 1)  # minus the sampler itself
+
+    def slow(self, timed, seconds):
+        self.on_slow_step(getattr(timed.coro, "__qualname__", repr(timed.coro)), seconds)
+
+    @staticmethod
+    def _report_slow_step(name, seconds):
+        print(f"⚠️ {name} blocked the loop for {seconds * 1000:.1f} ms", file=sys.stderr)
+
+    def summary(self):
+        lags = sorted(self.lags) or [0.0]
+        now = time.perf_counter()
+        tasks = []
+        for timed in self.traced:
+            finished = getattr(timed.coro, "cr_frame", None) is None  # a finished coroutine drops its frame
+            end = timed.steps[-1][1] if finished and timed.steps else now
+            tasks.append({"name": getattr(timed.coro, "__qualname__", repr(timed.coro)), "wall": end - timed.created,
+                          "finished": finished, "steps": timed.count, "blocking": timed.blocking,
+                          "longest_step": timed.longest})
+        return {
+            "tasks": sorted(tasks, key=lambda t: t["blocking"], reverse=True),
+            "loop_lag": {p: lags[min(len(lags) - 1, int(len(lags) * p / 100))] for p in (50, 90, 99)},
+            "max_pending": max(self.pending, default=0),
+        }
+
+    def export_trace(self, path):
+        events = []
+        for tid, timed in enumerate(self.traced, start=1):
+            name = f"{tid}: {getattr(timed.coro, '__qualname__', repr(timed.coro))}"
+            events.append({"ph": "M", "name": "thread_name", "pid": 1, "tid": tid, "args": {"name": name}})
+            for start, end in timed.steps:  # complete events, timestamps in µs
+                events.append({"ph": "X", "name": "step", "pid": 1, "tid": tid,
+                               "ts": (start - self._origin) * 1e6, "dur": (end - start) * 1e6})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+async def monitored(coro, monitor=None):
+    if monitor is None:
+        return await coro  # monitoring off: nothing is installed, no overhead
+    monitor.install()
+    try:
+        return await coro
+    finally:
+        monitor.uninstall()
+
+
+async def handler(i, delay=0, work=0):
+    cpu_task(work)  # some real work between awaits, as a request handler would do
+    return await async_task(f"Task {i}", delay, False)
+
+
+async def fan_out(n=10_000, delay=0, work=0):
+    await asyncio.gather(*(handler(i, delay, work) for i in range(n)))
+
+
+async def benchmark_monitor_overhead(n=20_000, delay=0.001, work=5_000, repeats=5):
+    # Tracing costs a few µs per step: empty tasks (work=0) show a large relative overhead,
+    # tasks doing real work between awaits should stay under 5%
+    timings = {}
+    for label, make_monitor in (("off", lambda: None), ("on", lambda: LoopMonitor(slow_step=1))):
+        samples = []
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            await monitored(fan_out(n, delay, work), make_monitor())
+            samples.append(time.perf_counter() - start_time)
+        timings[label] = min(samples)
+    overhead = timings["on"] / timings["off"] - 1
+    print(f"{n:,} tasks (work={work:,}): off {timings['off']:.3f}s, on {timings['on']:.3f}s, "
+          f"overhead {overhead:+.1%}")
+    return timings
+
+
+# if __name__ == "__main__":
+#     async def demo():
+#         monitor = LoopMonitor()
+#         await monitored(main(), monitor)  # ✅ Task 1 / Task 2 with their steps
+#         print(monitor.summary()["loop_lag"])
+#         monitor.export_trace("trace.json")  # open in ui.perfetto.dev or chrome://tracing
+#
+#     asyncio.run(demo())
+#     asyncio.run(benchmark_monitor_overhead())
+
+"""
+8️⃣ Picking the Fastest Loop Setup (Loop Factory, TaskGroup, Eager Tasks)
+asyncio.run() always uses the default loop. run() below takes any loop factory
+(e.g. uvloop.new_event_loop when uvloop is installed) and can switch on eager task execution
+(asyncio.eager_task_factory, Python 3.12+: a task runs right away until its first real suspension).
+benchmark_loops() runs the same async_task fan-out on every available setup and measures:
+✅ create_task → create n tasks, then await them one by one (like main())
+✅ gather      → asyncio.gather(*coroutines)
+✅ TaskGroup   → async with asyncio.TaskGroup() (3.11+)
+✅ creation    → only the cost of creating n tasks
+✅ switch      → one asyncio.sleep(0) round trip through the loop
+"""
+
+
+def loop_factories():
+    factories = {"default": asyncio.new_event_loop}
+    try:
+        import uvloop
+    except ImportError:  # uvloop is optional
+        pass
+    else:
+        factories["uvloop"] = uvloop.new_event_loop
+    return factories
+
+
+def run(coro, loop_factory=None, eager=False):
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        if eager:
+            runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+        return runner.run(coro)
+
+
+async def fan_out_create_task(n):
+    tasks = [asyncio.create_task(async_task(f"Task {i}", 0, False)) for i in range(n)]
+    for task in tasks:
+        await task
+
+
+async def fan_out_gather(n):
+    await asyncio.gather(*(async_task(f"Task {i}", 0, False) for i in range(n)))
+
+
+async def fan_out_task_group(n):
+    async with asyncio.TaskGroup() as group:
+        for i in range(n):
+            group.create_task(async_task(f"Task {i}", 0, False))
+
+
+async def task_creation(n):
+    start_time = time.perf_counter()
+    tasks = [asyncio.create_task(async_task(f"Task {i}", 0, False)) for i in range(n)]
+    elapsed = time.perf_counter() - start_time
+    await asyncio.gather(*tasks)
+    return elapsed  # only the creation part
+
+
+async def switches(n):
+    for _ in range(n):
+        await asyncio.sleep(0)
+
+
+def benchmark_loops(n=100_000, repeats=3):
+    variants = {"create_task": fan_out_create_task, "gather": fan_out_gather, "creation": task_creation,
+                "switch": switches}
+    if hasattr(asyncio, "TaskGroup"):
+        variants["TaskGroup"] = fan_out_task_group
+    setups = [(name, factory, False) for name, factory in loop_factories().items()]
+    if hasattr(asyncio, "eager_task_factory"):
+        setups += [(name + "+eager", factory, True) for name, factory in loop_factories().items()]
+
+    rows = []
+    print(f"Python {sys.version.split()[0]}, {n:,} tasks, µs per task (per switch for `switch`)")
+    print(f"{'setup':<16}" + "".join(f"{variant:>13}" for variant in variants))
+    for setup, factory, eager in setups:
+        line = f"{setup:<16}"
+        for variant, workload in variants.items():
+            samples = []
+            for _ in range(repeats):
+                start_time = time.perf_counter()
+                measured = run(workload(n), loop_factory=factory, eager=eager)
+                samples.append(measured if measured is not None else time.perf_counter() - start_time)
+            per_task = min(samples) / n * 1e6
+            rows.append({"setup": setup, "variant": variant, "us_per_task": per_task})
+            line += f"{per_task:>13.2f}"
+        print(line)
+
+    fastest = min((r for r in rows if r["variant"] not in ("creation", "switch")), key=lambda r: r["us_per_task"])
+    print(f"Fastest fan-out: {fastest['variant']} on {fastest['setup']}")
+    return rows
+
+
+# if __name__ == "__main__":
+#     run(main(), loop_factory=loop_factories().get("uvloop"))  # ✅ same demo, uvloop if installed
+#     benchmark_loops()
@@ -64,3 +64,882 @@ with statement handles setup and cleanup automatically.
 Custom context managers can be created using __enter__() and __exit__().
 Use contextlib.contextmanager for simpler context management.
 """
+
+"""
+4️⃣ Pooled Resources: Reuse Instead of Re-Creating
+with open(...) pays the setup and cleanup cost every time. For expensive resources
+(database connections, HTTP sessions, ...) a pool keeps them alive between uses:
+✅ Up to max_size live resources, handed out on __enter__ and returned on __exit__
+✅ Idle resources older than max_idle seconds are closed: on every checkout, and by a background
+   reaper (a daemon thread / an asyncio task) every max_idle / 2 seconds once the pool holds idle resources
+✅ health_check(resource) runs before a reused resource is handed out, failures are replaced
+   (a check that raises counts as a failure)
+✅ Tracks how long callers waited for a resource
+ResourcePool works with `with pool.checkout()`, AsyncResourcePool with `async with pool.acheckout()`
+(async create/close/health_check, aclose() instead of close()).
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+_NEW = object()  # "make a new resource" marker
+
+
+class PoolStats:
+    def __init__(self):
+        self.created = self.reused = self.evicted = self.failed_checks = self.checkouts = 0
+        self.wait_total = self.wait_max = 0.0
+        self._lock = threading.Lock()  # callers in several threads update the counters
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def waited(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self):
+        stats = {name: value for name, value in vars(self).items() if not name.startswith("_")}
+        stats["wait_mean"] = self.wait_total / self.checkouts if self.checkouts else 0.0
+        return stats
+
+
+class _PoolCore:
+    # Bookkeeping shared by ResourcePool and AsyncResourcePool, always called with the pool's lock held
+
+    def __init__(self, create, max_size=10, max_idle=60.0, health_check=None, close=None):
+        self._create = create
+        self._close = close or (lambda resource: resource.close())
+        self._health_check = health_check
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.stats = PoolStats()
+        self._idle = deque()  # (resource, returned at), most recently returned on the right
+        self._size = 0  # idle + checked out
+        self._closed = False
+
+    def _expired(self, now):
+        expired = []
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+            self.stats.count("evicted")
+        return expired
+
+    def _pick(self, expired):
+        # The warmest idle resource, _NEW (a slot reserved, create outside the lock) or None (wait)
+        if self._closed:
+            raise RuntimeError("pool is closed")
+        expired += self._expired(time.monotonic())
+        if self._idle:
+            return self._idle.pop()[0]
+        if self._size < self.max_size:
+            self._size += 1
+            return _NEW
+        return None
+
+    def _remaining(self, deadline):
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"no resource available within the timeout (max_size={self.max_size})")
+        return remaining
+
+    def _give_back(self, resource):
+        # True if the resource went back to the idle list, False if the caller has to close it
+        if self._closed:
+            self._size -= 1
+            return False
+        self._idle.append((resource, time.monotonic()))
+        return True
+
+    def _drain(self):
+        self._closed = True
+        idle = [resource for resource, _ in self._idle]
+        self._size -= len(idle)
+        self._idle.clear()
+        return idle  # checked-out resources are closed when they come back
+
+
+class ResourcePool(_PoolCore):
+    def __init__(self, create, max_size=10, max_idle=60.0, health_check=None, close=None):
+        super().__init__(create, max_size, max_idle, health_check, close)
+        self._cond = threading.Condition()
+        self._reaper = None
+        self._stop_reaping = threading.Event()
+
+    def _take(self, deadline):
+        expired = []
+        try:
+            with self._cond:
+                while (resource := self._pick(expired)) is None:
+                    self._cond.wait(self._remaining(deadline))
+            return resource
+        finally:
+            for old in expired:
+                self._close(old)
+
+    def _discard(self, resource):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        if resource is not _NEW:
+            self._close(resource)
+
+    def _reap(self):
+        # Evicts idle resources even when nobody checks one out (checkouts evict too)
+        while not self._stop_reaping.wait(self.max_idle / 2):
+            with self._cond:
+                expired = self._expired(time.monotonic())
+                self._cond.notify(len(expired))  # their slots are free for waiters
+            for old in expired:
+                self._close(old)
+
+    def _healthy(self, resource):
+        try:
+            return self._health_check(resource)
+        except Exception:  # a check that raises is a failed check: the resource is replaced
+            return False
+
+    def acquire(self, timeout=None):
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            resource = self._take(deadline)
+            if resource is _NEW:
+                try:
+                    resource = self._create()
+                except BaseException:
+                    self._discard(_NEW)
+                    raise
+                self.stats.count("created")
+            elif self._health_check and not self._healthy(resource):
+                self.stats.count("failed_checks")
+                self._discard(resource)
+                continue
+            else:
+                self.stats.count("reused")
+            self.stats.waited(time.monotonic() - start)
+            return resource
+
+    def release(self, resource):
+        with self._cond:
+            if self._give_back(resource):
+                self._cond.notify()
+                if self._reaper is None:
+                    self._reaper = threading.Thread(target=self._reap, daemon=True, name="pool-reaper")
+                    self._reaper.start()
+                return
+        self._close(resource)
+
+    def checkout(self, timeout=None):
+        return Checkout(self, timeout)
+
+    def close(self):
+        self._stop_reaping.set()
+        with self._cond:
+            idle = self._drain()
+            self._cond.notify_all()
+        for resource in idle:
+            self._close(resource)
+        if self._reaper is not None and self._reaper is not threading.current_thread():
+            self._reaper.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Checkout:
+    def __init__(self, pool, timeout=None):
+        self.pool = pool
+        self.timeout = timeout
+        self.resource = None
+
+    def __enter__(self):
+        self.resource = self.pool.acquire(self.timeout)
+        return self.resource
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.pool.release(self.resource)  # back to the pool, even if the block raised
+        self.resource = None
+
+
+async def close_resource(resource):
+    # The default close for AsyncResourcePool: resource.close(), awaited when it is a coroutine
+    result = resource.close()
+    if asyncio.iscoroutine(result):
+        await result
+
+
+class AsyncResourcePool(_PoolCore):
+    # Same bookkeeping, but create/close/health_check are coroutine functions and waiting never blocks the loop.
+    # Only `async with pool`, `async with pool.acheckout()` and the coroutine methods: no sync `with`.
+
+    def __init__(self, create, max_size=10, max_idle=60.0, health_check=None, close=None):
+        super().__init__(create, max_size, max_idle, health_check, close or close_resource)
+        self._cond = asyncio.Condition()
+        self._reaper = None
+
+    async def _take(self, deadline):
+        expired = []
+        try:
+            async with self._cond:
+                while (resource := self._pick(expired)) is None:
+                    remaining = self._remaining(deadline)  # outside the try: this TimeoutError is ours
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass  # loop round and raise our own TimeoutError
+            return resource
+        finally:
+            for old in expired:
+                await self._close(old)
+
+    async def _discard(self, resource):
+        async with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        if resource is not _NEW:
+            await self._close(resource)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(self.max_idle / 2)
+            async with self._cond:
+                expired = self._expired(time.monotonic())
+                self._cond.notify(len(expired))
+            for old in expired:
+                await self._close(old)
+
+    async def _healthy(self, resource):
+        try:
+            return await self._health_check(resource)
+        except Exception:
+            return False
+
+    async def acquire(self, timeout=None):
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            resource = await self._take(deadline)
+            if resource is _NEW:
+                try:
+                    resource = await self._create()
+                except BaseException:
+                    await self._discard(_NEW)
+                    raise
+                self.stats.count("created")
+            elif self._health_check and not await self._healthy(resource):
+                self.stats.count("failed_checks")
+                await self._discard(resource)
+                continue
+            else:
+                self.stats.count("reused")
+            self.stats.waited(time.monotonic() - start)
+            return resource
+
+    async def release(self, resource):
+        async with self._cond:
+            if self._give_back(resource):
+                self._cond.notify()
+                if self._reaper is None:
+                    self._reaper = asyncio.get_running_loop().create_task(self._reap())
+                return
+        await self._close(resource)
+
+    def acheckout(self, timeout=None):
+        return AsyncCheckout(self, timeout)
+
+    async def aclose(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        async with self._cond:
+            idle = self._drain()
+            self._cond.notify_all()
+        for resource in idle:
+            await self._close(resource)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+
+class AsyncCheckout:
+    def __init__(self, pool, timeout=None):
+        self.pool = pool
+        self.timeout = timeout
+        self.resource = None
+
+    async def __aenter__(self):
+        self.resource = await self.pool.acquire(self.timeout)
+        return self.resource
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.pool.release(self.resource)
+        self.resource = None
+
+
+class SlowConnection:  # a stand-in for a real connection whose setup is slow on purpose
+    setup_seconds = 0.2
+
+    def __init__(self):
+        time.sleep(self.setup_seconds)
+        self.alive = True
+
+    def ping(self):
+        return self.alive
+
+    def query(self, value):
+        return value * 2
+
+    def close(self):
+        self.alive = False
+
+
+def compare_pooled(uses=20, threads=4):
+    start_time = time.perf_counter()
+    for i in range(uses):
+        conn = SlowConnection()  # setup every time, like with open(...)
+        conn.query(i)
+        conn.close()
+    fresh = time.perf_counter() - start_time
+
+    with ResourcePool(SlowConnection, max_size=threads, health_check=SlowConnection.ping) as pool:
+        def worker(n):
+            for i in range(n):
+                with pool.checkout() as conn:  # ✅ reused, returned on exit
+                    conn.query(i)
+
+        start_time = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(uses // threads,)) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        pooled = time.perf_counter() - start_time
+        stats = pool.stats.as_dict()
+
+    print(f"New connection per use: {fresh:.2f}s, pooled: {pooled:.2f}s "
+          f"(created {stats['created']}, reused {stats['reused']}, mean wait {stats['wait_mean'] * 1000:.1f} ms)")
+    return {"fresh": fresh, "pooled": pooled, "stats": stats}
+
+
+# if __name__ == "__main__":
+#     compare_pooled()  # ✅ only max_size connections are ever set up
+#
+#     async def use_async_pool():
+#         async def connect():
+#             await asyncio.sleep(SlowConnection.setup_seconds)
+#             return {"alive": True}
+#
+#         async def disconnect(conn):
+#             conn["alive"] = False
+#
+#         async with AsyncResourcePool(connect, max_size=2, close=disconnect) as pool:
+#             async with pool.acheckout() as conn:
+#                 print(conn)  # ✅ {'alive': True}
+#
+#     asyncio.run(use_async_pool())
+
+"""
+5️⃣ Buffered, Batched File Writer
+with open("data.txt", "w") for every record pays open + write + flush + close each time.
+BatchWriter keeps the file open for the whole `with` block and writes records in batches:
+✅ Records collect in a buffer, written out once it holds buffer_size bytes
+✅ A background thread also flushes every flush_interval seconds, so nothing sits in memory for long
+✅ fsync policy: "never" (leave it to the OS), "interval" (at most one fsync per fsync_interval),
+   "always" (write() returns only once the record is on disk; concurrent writers share one fsync)
+✅ __exit__ flushes and fsyncs everything, even when the block raised
+✅ A failed write keeps its batch in the buffer for the next flush; a failure in the background
+   thread is raised by the next write() / flush() / __exit__
+"""
+import os
+import tempfile
+
+
+class BatchWriter:
+    FSYNC_POLICIES = ("never", "interval", "always")
+
+    def __init__(self, path, mode="a", buffer_size=64 * 1024, flush_interval=0.5, fsync="interval",
+                 fsync_interval=1.0, encoding="utf-8"):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {self.FSYNC_POLICIES}, not {fsync!r}")
+        self.path = path
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.encoding = encoding
+        self.stats = {"records": 0, "flushes": 0, "fsyncs": 0, "bytes": 0}
+        self._buffer = []
+        self._buffered = 0
+        self._written = 0  # records handed to write()
+        self._synced = 0  # records known to be on disk
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()  # guards the buffer, held only briefly by write()
+        self._io_lock = threading.Lock()  # one flush at a time, so batches reach the file in order
+        self._stop = threading.Event()
+        self._flusher = None
+        self._error = None  # raised by the background flusher, re-raised to the caller
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, self.mode + "b")
+        if self.flush_interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+        return self
+
+    def _raise_pending(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def write(self, record):
+        self._raise_pending()
+        data = record.encode(self.encoding) if isinstance(record, str) else record
+        with self._lock:
+            self._buffer.append(data)
+            self._buffered += len(data)
+            self._written += 1
+            seq = self._written
+            full = self._buffered >= self.buffer_size
+        if self.fsync == "always":
+            self._flush(sync_upto=seq)
+        elif full:
+            self._flush()
+
+    def flush(self):
+        self._raise_pending()
+        self._flush()
+
+    def _flush(self, sync_upto=None, force_sync=False):
+        with self._io_lock:
+            if sync_upto is not None and self._synced >= sync_upto:
+                return  # another writer's fsync already covered this record (group commit)
+            with self._lock:
+                batch, self._buffer, self._buffered = self._buffer, [], 0
+                upto = self._written
+            if batch:
+                data = b"".join(batch)
+                try:
+                    self._file.write(data)
+                    self._file.flush()  # hand the batch to the OS
+                except BaseException:
+                    with self._lock:  # keep the records for the next attempt, ahead of newer ones
+                        self._buffer[:0] = batch
+                        self._buffered += len(data)
+                    raise
+                self.stats["records"] += len(batch)
+                self.stats["bytes"] += len(data)
+                self.stats["flushes"] += 1
+
+            now = time.monotonic()
+            due = self.fsync == "interval" and now - self._last_sync >= self.fsync_interval
+            if self._synced < upto and (sync_upto is not None or due or force_sync):
+                os.fsync(self._file.fileno())
+                self._synced = upto
+                self._last_sync = now
+                self.stats["fsyncs"] += 1
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self._flush()
+            except Exception as exc:
+                if self._error is None:
+                    self._error = exc  # nobody to raise it to in this thread: the next call raises it
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+        try:
+            self._flush(force_sync=self.fsync != "never")  # everything written so far, even on errors
+        finally:
+            self._file.close()
+        if exc_type is None:
+            self._raise_pending()  # the data made it in the end, but the caller should know
+
+
+def benchmark_writer(records=100_000, record="x" * 99 + "\n", open_close_records=2_000):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.txt")
+
+        start_time = time.perf_counter()
+        for _ in range(open_close_records):  # what the examples above do, once per record
+            with open(path, "a") as file:
+                file.write(record)
+        results["open/close"] = open_close_records / (time.perf_counter() - start_time)
+
+        for policy in BatchWriter.FSYNC_POLICIES:
+            count = records if policy != "always" else open_close_records  # one fsync per record is slow
+            start_time = time.perf_counter()
+            with BatchWriter(path, fsync=policy) as writer:
+                for _ in range(count):
+                    writer.write(record)
+            results[policy] = count / (time.perf_counter() - start_time)
+
+    for name, rate in results.items():
+        print(f"{name:<12}{rate:>14,.0f} records/s")
+    return results
+
+
+# if __name__ == "__main__":
+#     with BatchWriter("data.txt", fsync="interval") as writer:
+#         for i in range(1_000_000):
+#             writer.write(f"record {i}\n")  # ✅ one file open, a few hundred writes, ~1 fsync per second
+#     benchmark_writer()
+
+"""
+6️⃣ Memory-Mapped Reader: Scanning Big Files Without Copying
+Reading through a file object copies every line into a new bytes object. MappedRecords maps the
+file into memory instead and hands out memoryview slices of the mapping:
+✅ fixed(width) → fixed-width records, lines() → newline-delimited records
+✅ A record is a cursor: it stays valid until the next one is produced (bytes(record) keeps a copy)
+✅ madvise(MADV_SEQUENTIAL) tells the OS to read ahead and drop pages behind us
+✅ __exit__ releases every outstanding view before closing the mapping, so nothing can dangle
+Each record still costs one trip through Python, so the win is for records of a few KB and up;
+for short lines `for line in file` remains faster (see benchmark_scan()).
+"""
+import mmap
+import weakref
+
+
+class MappedRecords:
+    def __init__(self, path, sequential=True):
+        self.path = path
+        self.sequential = sequential
+        self._file = None
+        self._map = None
+        self._view = memoryview(b"")
+        self._cursors = weakref.WeakSet()  # generators that may still hold a record
+
+    def __enter__(self):
+        self._file = open(self.path, "rb")
+        if os.fstat(self._file.fileno()).st_size:  # an empty file cannot be mapped
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self.sequential and hasattr(self._map, "madvise"):  # madvise needs Python 3.8+ on Unix
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+            self._view = memoryview(self._map)
+        return self
+
+    def __len__(self):
+        return len(self._view)
+
+    def _track(self, cursor):
+        self._cursors.add(cursor)
+        return cursor
+
+    def fixed(self, width):
+        return self._track(self._fixed(width))
+
+    def lines(self, keepends=False):
+        return self._track(self._lines(keepends))
+
+    def _fixed(self, width):
+        view = self._view
+        record = None
+        try:
+            for start in range(0, len(view), width):
+                if record is not None:
+                    record.release()  # the previous record is done with
+                record = view[start:start + width]
+                yield record
+        finally:
+            if record is not None:
+                record.release()
+
+    def _lines(self, keepends):
+        view = self._view
+        size = len(view)
+        find = self._map.find if self._map is not None else None
+        record = None
+        start = 0
+        try:
+            while start < size:
+                end = find(b"\n", start)
+                if end == -1:  # last line without a trailing newline
+                    end = size
+                if record is not None:
+                    record.release()
+                record = view[start:end + 1 if keepends else end]
+                yield record
+                start = end + 1
+        finally:
+            if record is not None:
+                record.release()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for cursor in list(self._cursors):
+            cursor.close()  # runs the cursor's finally: its current record is released
+        self._view.release()
+        try:
+            if self._map is not None:
+                self._map.close()
+        except BufferError:
+            if exc_type is None:  # don't hide the original error
+                raise BufferError("a slice of a record is still referenced; copy it with bytes() "
+                                  "to keep it after the with block") from None
+        finally:
+            self._file.close()
+
+
+def benchmark_scan(lines=1_000_000, width=64):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "records.txt")
+        with open(path, "wb") as file:
+            file.write((b"x" * (width - 1) + b"\n") * lines)
+
+        def timed(name, scan):
+            start_time = time.perf_counter()
+            count = scan()
+            results[name] = time.perf_counter() - start_time
+            assert count == lines, (name, count)
+
+        def readlines():
+            with open(path, "rb") as file:
+                return len(file.readlines())
+
+        def buffered():
+            with open(path, "rb") as file:
+                return sum(1 for _ in file)
+
+        def mapped_lines():
+            with MappedRecords(path) as records:
+                return sum(1 for _ in records.lines())
+
+        def mapped_fixed():
+            with MappedRecords(path) as records:
+                return sum(1 for _ in records.fixed(width))
+
+        timed("readlines()", readlines)
+        timed("for line in file", buffered)
+        timed("mmap lines()", mapped_lines)
+        timed("mmap fixed()", mapped_fixed)
+
+    size_mb = lines * width / 1024 / 1024
+    for name, seconds in results.items():
+        print(f"{name:<18}{seconds:>8.3f}s{size_mb / seconds:>10.0f} MB/s")
+    return results
+
+
+# if __name__ == "__main__":
+#     with MappedRecords("data.txt") as records:
+#         for line in records.lines():
+#             print(bytes(line))  # ✅ b'Hello, World!' (the copy outlives the with block)
+#     benchmark_scan()
+
+"""
+7️⃣ Timing Blocks and Functions: timed()
+CustomContext and my_context() are natural places to measure time. timed("name") records the
+duration of a `with` block (or of every call, used as @timed("name")) in nanoseconds:
+✅ Durations go into an HDR-style histogram: 32 buckets per power of two, ~3% relative error
+✅ Each thread writes to its own histograms, so recording takes no lock
+✅ percentiles() merges all threads; snapshot() / merge_snapshot() carry histograms across processes
+✅ dump() prints p50 / p99 / p99.9 on demand, report_at_exit() does it when the program ends
+timed_reference() is the same thing written with @contextmanager. The generator version costs
+noticeably more per use (see benchmark_timers()), so timed is a class.
+"""
+import atexit
+import functools
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_index(value):
+    bits = value.bit_length()
+    if bits <= SUB_BUCKET_BITS + 1:
+        return value  # small values are exact
+    shift = bits - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)  # keep the top 6 bits
+
+
+def bucket_value(index):
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    low = (index - shift * SUB_BUCKETS) << shift
+    return low + (1 << shift) // 2  # middle of the bucket
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = {}  # bucket index -> count
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in dict(other.counts).items():  # dict() copies in one step, safe while other records
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+
+_local = threading.local()
+_registry = []  # (name, Histogram) for every thread, appended once per thread and name
+_registry_lock = threading.Lock()
+_imported = {}  # name -> Histogram merged from other processes
+
+
+def record(name, nanoseconds):
+    try:
+        histograms = _local.histograms
+    except AttributeError:
+        histograms = _local.histograms = {}
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+        with _registry_lock:  # only the first time this thread records `name`
+            _registry.append((name, histogram))
+    histogram.add(nanoseconds)
+
+
+class timed:
+    __slots__ = ("name", "_start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        record(self.name, time.perf_counter_ns() - self._start)
+
+    def __call__(self, func):  # @timed("name")
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter_ns() - start)
+
+        return wrapper
+
+
+@contextmanager
+def timed_reference(name):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter_ns() - start)
+
+
+def merged():
+    with _registry_lock:
+        entries = list(_registry)
+    histograms = {}
+    for name, histogram in entries + list(_imported.items()):
+        histograms.setdefault(name, Histogram()).merge(histogram)
+    return histograms
+
+
+def snapshot():
+    # Plain data, safe to pickle and send back from a worker process
+    return {name: {"counts": h.counts, "count": h.count, "total": h.total, "max": h.max}
+            for name, h in merged().items()}
+
+
+def merge_snapshot(data):
+    for name, values in data.items():
+        histogram = Histogram()
+        histogram.counts = dict(values["counts"])
+        histogram.count, histogram.total, histogram.max = values["count"], values["total"], values["max"]
+        _imported.setdefault(name, Histogram()).merge(histogram)
+
+
+def percentiles(name=None):
+    histograms = merged()
+    names = [name] if name else sorted(histograms)
+    return {n: {"count": histograms[n].count,
+                "mean": histograms[n].total / histograms[n].count if histograms[n].count else 0,
+                "p50": histograms[n].percentile(50),
+                "p99": histograms[n].percentile(99),
+                "p999": histograms[n].percentile(99.9),
+                "max": histograms[n].max} for n in names if n in histograms}
+
+
+def dump():
+    print(f"{'name':<20}{'count':>10}{'p50 µs':>10}{'p99 µs':>10}{'p99.9 µs':>10}{'max µs':>10}")
+    for name, p in percentiles().items():
+        print(f"{name:<20}{p['count']:>10}{p['p50'] / 1000:>10.1f}{p['p99'] / 1000:>10.1f}"
+              f"{p['p999'] / 1000:>10.1f}{p['max'] / 1000:>10.1f}")
+
+
+def report_at_exit():
+    atexit.register(dump)
+
+
+def benchmark_timers(n=1_000_000):
+    def loop(make):
+        start_time = time.perf_counter_ns()
+        for _ in range(n):
+            with make("benchmark"):
+                pass
+        return (time.perf_counter_ns() - start_time) / n
+
+    @timed("benchmark")
+    def decorated():
+        pass
+
+    start_time = time.perf_counter_ns()
+    for _ in range(n):
+        pass
+    empty = (time.perf_counter_ns() - start_time) / n
+
+    results = {"timed_reference": loop(timed_reference) - empty, "timed": loop(timed) - empty}
+    start_time = time.perf_counter_ns()
+    for _ in range(n):
+        decorated()
+    results["@timed"] = (time.perf_counter_ns() - start_time) / n - empty
+
+    for name, ns in results.items():
+        print(f"{name:<16}{ns:>8.0f} ns per use")
+    return results
+
+
+# if __name__ == "__main__":
+#     report_at_exit()  # ✅ p50/p99/p99.9 table printed when the program ends
+#     with timed("write data.txt"):
+#         with open("data.txt", "w") as file:
+#             file.write("Hello, World!")
+#     benchmark_timers()
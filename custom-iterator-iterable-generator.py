@@ -72,20 +72,272 @@ Instead of manually implementing __iter__() and __next__(), a generator does it
 
 Example: Generator-Based Iterable
 """
-if __name__ == "__main__":
-    class MyRange:
-        def __init__(self,max_value):
-            self.max = max_value
+import array
+from collections.abc import Sequence
+from functools import lru_cache
+
+
+def load_numpy():
+    # Imported on first use: NumPy takes far longer to import than this whole file
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional, iter_chunks(numpy=True) needs it
+        return None
+    return numpy
+
+class MyRange:
+    def __init__(self, max_value, func=None, cache_size=0, inverse=None):
+        self.max = max_value
+        self._indices = range(1, max_value + 1)  # what to look up, never materialized
+        if func is not None and cache_size != 0:
+            func = lru_cache(maxsize=cache_size)(func)  # cache_size=None → unbounded memo, shared by all views
+        self._func = func
+        self._inverse = inverse
+
+    def __iter__(self):
+        for num in self._indices:
+            yield num if self._func is None else self._func(num)  # Yield instead of `__next__()`
+
+    def __len__(self):
+        return len(self._indices)  # also lets list(MyRange(n)) allocate n slots up front
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._view(self._indices[index])  # O(1): slicing a range gives a range
+        num = self._indices[index]  # negative indexes and IndexError come for free
+        return num if self._func is None else self._func(num)
+
+    def __contains__(self, value):
+        if self._func is None:
+            return value in self._indices  # O(1) arithmetic check for ints
+        if self._inverse is not None:
+            try:
+                num = self._inverse(value)
+            except (TypeError, ValueError):
+                return False
+            return num in self._indices and self._func(num) == value
+        return any(item == value for item in self)  # no inverse: nothing better than a scan
+
+    def __reversed__(self):
+        return iter(self._view(self._indices[::-1]))
+
+    def index(self, value):
+        if value in self:
+            if self._func is None:
+                return self._indices.index(value)
+            if self._inverse is not None:
+                return self._indices.index(self._inverse(value))
+            for position, item in enumerate(self):
+                if item == value:
+                    return position
+        raise ValueError(f"{value!r} is not in {self!r}")
+
+    def count(self, value):
+        if self._func is None or self._inverse is not None:
+            return 1 if value in self else 0  # one index per value
+        return sum(1 for item in self if item == value)
+
+    def _view(self, indices):
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)  # same func and memo, different indexes
+        view._indices = indices
+        view.max = max(indices[0], indices[-1]) if indices else 0  # like MyRange(n).max == n
+        return view
+
+    def __repr__(self):
+        func = "" if self._func is None else f", func={self._func!r}"
+        return f"MyRange({self._indices!r}{func})"
 
-        def __iter__(self):
-            for num in range(1, self.max + 1):
-                yield num  # Yield instead of `__next__()`
+    def iter_chunks(self, size=65_536, numpy=False):
+        # The same values, `size` at a time, as array.array('q') (or NumPy arrays): one object per chunk
+        # func values go through array.array too: 'q' for ints, 'd' as soon as a chunk holds a float
+        np = load_numpy() if numpy else None
+        if numpy and np is None:
+            raise ImportError("iter_chunks(numpy=True) requires NumPy to be installed")
+        for start in range(0, len(self._indices), size):
+            part = self._indices[start:start + size]
+            if self._func is not None:
+                values = [self._func(num) for num in part]
+                yield np.asarray(values) if numpy else typed_array(values)
+            elif numpy:
+                yield np.arange(part.start, part.stop, part.step, dtype=np.int64)
+            else:
+                yield array.array("q", part)
 
 
+def typed_array(values):
+    try:
+        return array.array("q", values)
+    except TypeError:  # floats; anything else fails again below
+        return array.array("d", values)
+
+
+Sequence.register(MyRange)  # isinstance(MyRange(5), Sequence) → True
+
+if __name__ == "__main__":
     # ✅ Using the generator-based iterable
     for num in MyRange(5):
         print(num)  # Output: 1, 2, 3, 4, 5
 
+"""
+4️⃣ Faster Consumption: Chunks and Prefetching
+At 10^8 elements the cost of handing out one Python int at a time dominates whatever the consumer does.
+✅ iter_chunks(size) → one array.array (or NumPy array) per `size` values, handled as a single buffer
+✅ __len__() → list(MyRange(n)) sizes its storage once instead of growing step by step
+✅ prefetch(iterable, depth) → a background thread produces the next items while the consumer works
+   on the current one (worth it when producing an item is expensive: I/O, decoding, NumPy)
+"""
+import io
+import queue
+import struct
+import threading
+import time
+
+
+def prefetch(iterable, depth=2):
+    # Messages are ("item", x), ("error", exc) or ("done", None), so items that are exceptions pass through
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def send(message):
+        while not stop.is_set():  # never block for good: the consumer may already be gone
+            try:
+                items.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not send(("item", item)):
+                    return
+        except BaseException as exc:  # re-raised in the consumer
+            send(("error", exc))
+        else:
+            send(("done", None))
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()  # the consumer stopped early: let the producer thread finish
+
+
+def slow_chunks(values, delay=0.001):
+    for chunk in values.iter_chunks():
+        time.sleep(delay)  # an expensive producer (reading, decoding, ...)
+        yield chunk
+
+
+def benchmark_consumption(n=10_000_000):
+    # The consumer serializes every value as an int64, e.g. to write it to a file or a socket
+    values = MyRange(n)
+    pack = struct.Struct("<q").pack
+
+    def timed(name, consume):
+        out = io.BytesIO()
+        start_time = time.perf_counter()
+        consume(out.write)
+        elapsed = time.perf_counter() - start_time
+        assert out.tell() == 8 * n, name
+        print(f"{name:<26}{elapsed:>8.3f}s{n / elapsed / 1e6:>10.1f} M items/s")
+        return elapsed
+
+    def per_item(write):
+        for value in values:
+            write(pack(value))
+
+    def chunks(write, source=None):
+        for chunk in source if source is not None else values.iter_chunks():
+            write(chunk)  # one buffer per chunk, no per-item work
+
+    def slow_consumer(source):
+        def consume(write):
+            for chunk in source():
+                time.sleep(0.001)  # the consumer does some work per chunk too
+                write(chunk)
+        return consume
+
+    results = {
+        "per item": timed("per item", per_item),
+        "chunks": timed("chunks", chunks),
+        "slow producer": timed("slow producer", slow_consumer(lambda: slow_chunks(values))),
+        "slow producer + prefetch": timed("slow producer + prefetch",
+                                          slow_consumer(lambda: prefetch(slow_chunks(values)))),
+    }
+    if load_numpy() is not None:
+        results["numpy chunks"] = timed("numpy chunks", lambda write: chunks(write, values.iter_chunks(numpy=True)))
+    return results
+
+
+# if __name__ == "__main__":
+#     print(list(MyRange(5)))  # ✅ [1, 2, 3, 4, 5], storage allocated once thanks to __len__
+#     print(sum(int(chunk.sum()) for chunk in MyRange(10**8).iter_chunks(numpy=True)))  # ✅ 5000000050000000
+#     benchmark_consumption()
+
+"""
+5️⃣ Random Access: MyRange as a Lazy Sequence
+Like range, MyRange never stores its values, yet supports the whole read-only sequence protocol:
+✅ len(r), r[i], r[-1] → O(1), computed from the index
+✅ r[a:b:c] → O(1) view sharing the same function (no copy), views of views are fine
+✅ x in r, r.index(x) → O(1) arithmetic for plain ranges, O(1) with an `inverse` function
+✅ reversed(r) → O(1) reversed view
+✅ MyRange(n, func=f) → the same machinery for any index → value function, r[i] == f(i + 1)
+✅ cache_size → memoizes an expensive func with lru_cache (None = unbounded, 0 = off)
+❌ Without `inverse`, `x in r` on a func-backed sequence falls back to a linear scan
+"""
+import sys
+
+
+def benchmark_random_access(n=10_000_000, lookups=100_000):
+    import random
+
+    positions = [random.randrange(n) for _ in range(lookups)]
+    lazy = MyRange(n)
+
+    def timed(name, run):
+        start_time = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start_time
+        print(f"{name:<34}{elapsed * 1e3:>9.2f} ms")
+        return elapsed
+
+    results = {"materialize list": timed("materialize list", lambda: list(range(1, n + 1)))}
+    values = list(range(1, n + 1))
+    print(f"{'memory: list / MyRange':<34}{sys.getsizeof(values) / 1e6:>9.1f} MB / {sys.getsizeof(lazy)} B")
+    results["list[i]"] = timed("list[i]", lambda: [values[i] for i in positions])
+    results["MyRange[i]"] = timed("MyRange[i]", lambda: [lazy[i] for i in positions])
+    results["x in list (last 100)"] = timed("x in list (last 100)", lambda: [n - k in values for k in range(100)])
+    results["x in MyRange (last 100)"] = timed("x in MyRange (last 100)", lambda: [n - k in lazy for k in range(100)])
+    results["MyRange[::-2][1000:2000]"] = timed("MyRange[::-2][1000:2000]", lambda: lazy[::-2][1000:2000])
+
+    def expensive(num):
+        return sum(range(num % 1000))  # stands in for a costly per-index computation
+
+    hot = [random.randrange(1000) for _ in range(lookups)]  # a small hot set of indexes
+    plain, memo = MyRange(n, func=expensive), MyRange(n, func=expensive, cache_size=4096)
+    results["func lookups"] = timed("func lookups", lambda: [plain[i] for i in hot])
+    results["func lookups, cache_size=4096"] = timed("func lookups, cache_size=4096", lambda: [memo[i] for i in hot])
+    return results
+
+
+# if __name__ == "__main__":
+#     r = MyRange(10)
+#     print(len(r), r[0], r[-1], r[2:8:2], list(reversed(r[2:8:2])))  # ✅ 10 1 10 MyRange(range(3, 9, 2)) [7, 5, 3]
+#     import math
+#     squares = MyRange(10**12, func=lambda i: i * i, inverse=lambda v: math.isqrt(v))
+#     print(squares[-1], 144 in squares, 145 in squares, squares.index(144))  # ✅ 1000000000000000000000000 True False 11
+#     benchmark_random_access()
+
 """
 🚀 Summary
 Approach	Description	Best Use Case
@@ -36,3 +36,1109 @@ arr = [1, 3, 4, 7, 9]
 index = bisect.bisect_left(arr, 4)  # ✅ Finds position of 4
 # Use bisect when working with sorted lists to speed up searches.
 
+
+"""
+2️⃣ Sorting Without cmp_to_key
+cmp_to_key calls a Python comparator about 2·n·log n times; a key function is called exactly n times
+(sorted() computes every key once and keeps it next to its item: decorate-sort-undecorate).
+✅ sort_records(items, key=...) → one key per item, several fields as a tuple of key functions
+✅ reverse=(False, True) → one direction per field (stable passes, last field first)
+✅ sort_records(items, cmp=...) → first tries to turn the comparator into a key (identity, a tuple
+   index or an attribute, ascending or descending), checked on a sample and then on every adjacent
+   pair of the result (n comparator calls), falling back to cmp_to_key only when no key matches;
+   reverse=True works there too, and stays stable like sorted(..., reverse=True)
+✅ Several numeric key fields on large inputs → NumPy lexsort (stable) when NumPy is installed; a
+   sample of the keys is checked first, so tuples or strings go straight to sorted() (NumPy is imported
+   lazily). A single key is no faster with NumPy, use_numpy=True still forces argsort.
+❌ A comparator that is not a consistent ordering gives undefined results either way
+"""
+import functools
+import math
+import operator
+import random
+import time
+
+NUMPY_MIN_ITEMS = 10_000
+NUMPY_SAMPLE = 64  # keys looked at before paying for a full NumPy conversion
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    # Imported on first use: NumPy takes longer to import than this whole file
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional, sort_records() and ColumnStore fall back to pure Python
+        return None
+    return numpy
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def _candidate_keys(first):
+    yield None  # the items themselves
+    if isinstance(first, (tuple, list)):
+        for i in range(len(first)):
+            yield operator.itemgetter(i)
+    for name in getattr(type(first), "__dataclass_fields__", None) or getattr(first, "__dict__", {}):
+        yield operator.attrgetter(name)
+
+
+def _matches(ordered, cmp, key, descending=False):
+    # ordered is sorted by key: cmp must agree on every adjacent pair, ties included
+    keys = ordered if key is None else list(map(key, ordered))
+    step = 1 if descending else -1
+    for i in range(len(ordered) - 1):
+        expected = 0 if keys[i] == keys[i + 1] else step
+        if _sign(cmp(ordered[i], ordered[i + 1])) != expected:
+            return False
+    return True
+
+
+def key_from_cmp(cmp, items, sample_size=256):
+    # Returns (key, reverse) that sorts `items` exactly like cmp_to_key(cmp) would, or None
+    if not items:
+        return None
+    sample = random.sample(items, min(sample_size, len(items)))
+    for key in _candidate_keys(items[0]):
+        for reverse in (False, True):
+            try:
+                if _matches(sorted(sample, key=key, reverse=reverse), cmp, key):
+                    return key, reverse
+            except TypeError:  # keys that do not compare with each other
+                break
+    return None
+
+
+def _fields(key):
+    if key is None:
+        return [None]
+    return list(key) if isinstance(key, (tuple, list)) else [key]
+
+
+def _numeric_sample(items, fields, np):
+    # A few evenly spaced keys, so tuples or strings are turned away before any array is built
+    sample = items[::max(1, len(items) // NUMPY_SAMPLE)]
+    numeric = (int, float, np.number)
+    return all(isinstance(value, numeric)
+               for field in fields for value in (sample if field is None else map(field, sample)))
+
+
+def _numpy_order(items, fields, reverse):
+    np = load_numpy()
+    if not _numeric_sample(items, fields, np):
+        return None
+    columns = []
+    for field, descending in zip(fields, reverse):
+        values = items if field is None else list(map(field, items))
+        column = np.asarray(values)
+        if column.ndim != 1 or column.dtype.kind not in "biuf":
+            return None
+        if column.dtype.kind == "f" and not all(issubclass(kind, float) for kind in set(map(type, values))):
+            return None  # ints mixed into float64 lose precision above 2**53: let sorted() compare them exactly
+        if descending:
+            # ranks instead of -column: no overflow at int64 min, works for unsigned and bool too
+            column = -np.unique(column, return_inverse=True)[1] if column.dtype.kind != "f" else -column
+        columns.append(column)
+    if len(columns) == 1:
+        return np.argsort(columns[0], kind="stable")
+    return np.lexsort(columns[::-1])  # lexsort's primary key is the last one
+
+
+def sort_records(items, key=None, cmp=None, reverse=False, use_numpy=None):
+    items = list(items)
+    if cmp is not None:
+        if key is not None:
+            raise TypeError("sort_records() takes either key or cmp, not both")
+        if not isinstance(reverse, bool):
+            raise TypeError("sort_records(cmp=...) takes a single reverse=True/False")
+        found = key_from_cmp(cmp, items)
+        if found is not None:
+            ordered = sorted(items, key=found[0], reverse=found[1] != reverse)
+            if _matches(ordered, cmp, found[0], descending=reverse):  # O(n) check on the whole input
+                return ordered
+        return sorted(items, key=functools.cmp_to_key(cmp), reverse=reverse)
+
+    fields = _fields(key)
+    directions = list(reverse) if isinstance(reverse, (tuple, list)) else [reverse] * len(fields)
+    if len(directions) != len(fields):
+        raise ValueError(f"got {len(directions)} reverse flags for {len(fields)} key fields")
+
+    if use_numpy is None:
+        # Measured: one key is sorted as fast by sorted(); NumPy wins when sorted() would build tuple keys
+        use_numpy = len(fields) > 1 and len(items) >= NUMPY_MIN_ITEMS and load_numpy() is not None
+    if use_numpy:
+        if load_numpy() is None:
+            raise ImportError("sort_records(use_numpy=True) requires NumPy to be installed")
+        order = _numpy_order(items, fields, directions)
+        if order is not None:
+            return [items[i] for i in order.tolist()]
+
+    if len(set(directions)) == 1:
+        if len(fields) == 1:
+            return sorted(items, key=fields[0], reverse=directions[0])
+        return sorted(items, key=lambda item: tuple(field(item) for field in fields), reverse=directions[0])
+    for field, descending in reversed(list(zip(fields, directions))):
+        items.sort(key=field, reverse=descending)  # stable: earlier fields win
+    return items
+
+
+def by_score_then_age(a, b):
+    # (id, score, age) records: score descending, then age ascending
+    return _sign(b[1] - a[1]) or _sign(a[2] - b[2])
+
+
+def benchmark_sort(sizes=(1_000_000, 10_000_000)):
+    results = {}
+    for n in sizes:
+        rng = random.Random(n)
+        records = [(i, rng.randrange(1000), rng.randrange(18, 90)) for i in range(n)]
+        ints = [rng.randrange(n) for _ in range(n)]
+        cases = {
+            "cmp_to_key(custom_sort)": lambda: sorted(ints, key=functools.cmp_to_key(custom_sort)),
+            "sort_records(cmp=custom_sort)": lambda: sort_records(ints, cmp=custom_sort),
+            "cmp_to_key(by_score_then_age)": lambda: sorted(records, key=functools.cmp_to_key(by_score_then_age)),
+            "sort_records(key, reverse)": lambda: sort_records(records, key=(operator.itemgetter(1), operator.itemgetter(2)),
+                                                               reverse=(True, False), use_numpy=False),
+        }
+        if load_numpy() is not None:
+            cases["sort_records(..., NumPy lexsort)"] = lambda: sort_records(
+                records, key=(operator.itemgetter(1), operator.itemgetter(2)), reverse=(True, False), use_numpy=True)
+        expected = {}
+        for name, run in cases.items():
+            start_time = time.perf_counter()
+            out = run()
+            elapsed = time.perf_counter() - start_time
+            group = "ints" if "custom_sort" in name else "records"
+            assert expected.setdefault(group, out) == out, name
+            results[(n, name)] = elapsed
+            print(f"n={n:<11,}{name:<36}{elapsed:>8.2f}s")
+    return results
+
+
+# if __name__ == "__main__":
+#     print(sort_records([5, 2, 8, 1], cmp=custom_sort))  # ✅ [1, 2, 5, 8], 4 comparator calls instead of ~8
+#     print(sort_records([("b", 2), ("a", 2), ("c", 1)], key=(operator.itemgetter(1), operator.itemgetter(0)),
+#                        reverse=(True, False)))  # ✅ [('a', 2), ('b', 2), ('c', 1)]
+#     benchmark_sort()
+
+"""
+3️⃣ Indexed Heap: update_priority() and remove() Without Tombstones
+heapq can only push and pop: changing or cancelling an entry means an O(n) scan, or pushing a new
+copy and skipping the stale one later (tombstones that pile up in the heap).
+IndexedHeap keeps, for every entry, a handle → slot index, so any entry can be found in O(1).
+✅ push(priority, value) → handle, O(log n)
+✅ pop() / peek() → (priority, value) with the smallest priority
+✅ pushpop(priority, value) → ((priority, value) popped, handle of the new entry), in a single sift;
+   the handle is None when the new entry comes straight back out (nothing smaller in the heap)
+✅ update_priority(handle, priority) / remove(handle) → O(log n), no stale copies left behind
+✅ extend(pairs) → their handles, O(n) bulk load (bottom-up heapify); IndexedHeap(pairs) does the same
+   when the handles are not needed
+✅ arity=4 → shallower tree: fewer moves on push / decrease-key, a few more comparisons per pop
+✅ Parallel lists (priorities, handles, values) instead of one tuple per entry
+✅ Handles are never reused: once its entry is popped or removed, a handle raises KeyError
+   (storage is recycled, a generation number in the handle tells old and new entries apart)
+❌ Entries with equal priorities come out in no particular order
+❌ Pure Python: each operation costs a few times heapq's C code, pick it for what heapq cannot do
+"""
+
+
+ENTRY_BITS = 32  # handle = generation << ENTRY_BITS | entry
+ENTRY_MASK = (1 << ENTRY_BITS) - 1
+
+
+class IndexedHeap:
+    def __init__(self, pairs=(), arity=2):
+        if arity < 2:
+            raise ValueError("arity must be at least 2")
+        self.arity = arity
+        self._prio = []     # heap slot → priority
+        self._handle = []   # heap slot → entry
+        self._slot = []     # entry → heap slot, -1 when free
+        self._value = []    # entry → value
+        self._gen = []      # entry → generation, bumped every time the entry is freed
+        self._free = []     # recycled entries
+        self.extend(pairs)
+
+    def extend(self, pairs):
+        # Append everything, then heapify bottom-up: O(n + k) instead of k sifts of O(log n)
+        first = len(self._value)
+        for priority, value in pairs:  # fresh entries, generation 0: the handle is the entry
+            self._prio.append(priority)
+            self._handle.append(len(self._value))
+            self._slot.append(len(self._prio) - 1)
+            self._value.append(value)
+            self._gen.append(0)
+        for pos in reversed(range((len(self._prio) - 2) // self.arity + 1)):
+            self._sift_down(pos)
+        return list(range(first, len(self._value)))
+
+    def __len__(self):
+        return len(self._prio)
+
+    def __bool__(self):
+        return bool(self._prio)
+
+    def __contains__(self, handle):
+        entry = handle & ENTRY_MASK
+        return (entry < len(self._slot) and self._slot[entry] >= 0
+                and handle >> ENTRY_BITS == self._gen[entry])
+
+    def _sift_up(self, pos):
+        prio, handles, slot, arity = self._prio, self._handle, self._slot, self.arity
+        priority, handle = prio[pos], handles[pos]
+        while pos:
+            parent = (pos - 1) // arity
+            if not priority < prio[parent]:
+                break
+            prio[pos] = prio[parent]
+            moved = handles[pos] = handles[parent]
+            slot[moved] = pos
+            pos = parent
+        prio[pos] = priority
+        handles[pos] = handle
+        slot[handle] = pos
+
+    def _sift_down(self, pos):
+        prio, handles, slot, arity = self._prio, self._handle, self._slot, self.arity
+        n = len(prio)
+        priority, handle = prio[pos], handles[pos]
+        while (first := arity * pos + 1) < n:
+            if arity == 2:
+                best, best_priority = first, prio[first]
+                if first + 1 < n and prio[first + 1] < best_priority:
+                    best, best_priority = first + 1, prio[first + 1]
+            else:  # min() over the children runs in C
+                children = prio[first:first + arity]
+                best_priority = min(children)
+                best = first + children.index(best_priority)
+            if not best_priority < priority:
+                break
+            prio[pos] = best_priority
+            moved = handles[pos] = handles[best]
+            slot[moved] = pos
+            pos = best
+        prio[pos] = priority
+        handles[pos] = handle
+        slot[handle] = pos
+
+    def push(self, priority, value=None):
+        if self._free:
+            entry = self._free.pop()
+            self._value[entry] = value
+        else:
+            entry = len(self._value)
+            self._value.append(value)
+            self._slot.append(-1)
+            self._gen.append(0)
+        self._prio.append(priority)
+        self._handle.append(entry)
+        self._sift_up(len(self._prio) - 1)
+        return self._gen[entry] << ENTRY_BITS | entry
+
+    def peek(self):
+        if not self._prio:
+            raise IndexError("peek from an empty heap")
+        return self._prio[0], self._value[self._handle[0]]
+
+    def _take(self, pos):
+        # Detach the entry in `pos`, fill the hole with the last entry and restore the heap
+        prio, handles = self._prio, self._handle
+        handle, priority = handles[pos], prio[pos]
+        last_priority, last_handle = prio.pop(), handles.pop()
+        if pos < len(prio):
+            prio[pos], handles[pos] = last_priority, last_handle
+            if pos and last_priority < prio[(pos - 1) // self.arity]:
+                self._sift_up(pos)
+            else:
+                self._sift_down(pos)
+        value = self._value[handle]
+        self._value[handle] = None
+        self._slot[handle] = -1
+        self._gen[handle] += 1  # outstanding handles to this entry go stale
+        self._free.append(handle)
+        return priority, value
+
+    def pop(self):
+        if not self._prio:
+            raise IndexError("pop from an empty heap")
+        return self._take(0)
+
+    def pushpop(self, priority, value=None):
+        # push then pop in a single sift, like heapq.heappushpop (the popped entry is reused)
+        if not self._prio or not self._prio[0] < priority:
+            return (priority, value), None  # never stored, so no handle
+        entry = self._handle[0]
+        popped = self._prio[0], self._value[entry]
+        self._prio[0], self._value[entry] = priority, value
+        self._gen[entry] += 1  # the popped entry's handle goes stale, the new one gets the next generation
+        self._sift_down(0)
+        return popped, self._gen[entry] << ENTRY_BITS | entry
+
+    def _position(self, handle):
+        if handle not in self:
+            raise KeyError(f"no entry with handle {handle!r}")
+        return self._slot[handle & ENTRY_MASK]
+
+    def priority(self, handle):
+        return self._prio[self._position(handle)]
+
+    def value(self, handle):
+        self._position(handle)
+        return self._value[handle & ENTRY_MASK]
+
+    def update_priority(self, handle, priority):
+        pos = self._position(handle)
+        old, self._prio[pos] = self._prio[pos], priority
+        if priority < old:
+            self._sift_up(pos)
+        elif old < priority:
+            self._sift_down(pos)
+
+    def remove(self, handle):
+        return self._take(self._position(handle))
+
+
+def random_graph(vertices, degree, seed=0):
+    rng = random.Random(seed)
+    graph = [[] for _ in range(vertices)]
+    for u in range(vertices):
+        for v in rng.sample(range(vertices), degree):
+            graph[u].append((v, rng.random()))
+    return graph
+
+
+def dijkstra_heapq(graph, source=0):
+    # Lazy deletion: every improvement pushes a new entry, stale ones are skipped when popped
+    dist = [math.inf] * len(graph)
+    dist[source] = 0.0
+    heap, peak = [(0.0, source)], 1
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue  # tombstone
+        for v, w in graph[u]:
+            if d + w < dist[v]:
+                dist[v] = d + w
+                heapq.heappush(heap, (d + w, v))
+        peak = max(peak, len(heap))
+    return dist, peak
+
+
+def dijkstra_indexed(graph, source=0, arity=2):
+    dist = [math.inf] * len(graph)
+    dist[source] = 0.0
+    heap, handles, peak = IndexedHeap(arity=arity), {}, 1
+    handles[source] = heap.push(0.0, source)
+    while heap:
+        d, u = heap.pop()
+        del handles[u]
+        for v, w in graph[u]:
+            if d + w < dist[v]:
+                dist[v] = d + w
+                if v in handles:
+                    heap.update_priority(handles[v], d + w)  # decrease-key, nothing left behind
+                else:
+                    handles[v] = heap.push(d + w, v)
+        peak = max(peak, len(heap))
+    return dist, peak
+
+
+def benchmark_heaps(n=200_000, vertices=50_000, degree=8, k=100):
+    rng = random.Random(42)
+    priorities = [rng.random() for _ in range(n)]
+    results = {}
+
+    def timed(name, run):
+        start_time = time.perf_counter()
+        out = run()
+        results[name] = time.perf_counter() - start_time
+        print(f"{name:<40}{results[name]:>8.3f}s")
+        return out
+
+    def mix_heapq():
+        heap = []
+        for i, priority in enumerate(priorities):
+            heapq.heappush(heap, (priority, i))
+            if i % 3 == 2:  # 2 pushes for every pop
+                heapq.heappop(heap)
+        return [heapq.heappop(heap)[0] for _ in range(len(heap))]
+
+    def mix_indexed(arity):
+        heap = IndexedHeap(arity=arity)
+        for i, priority in enumerate(priorities):
+            heap.push(priority, i)
+            if i % 3 == 2:
+                heap.pop()
+        return [heap.pop()[0] for _ in range(len(heap))]
+
+    print("push/pop mix")
+    expected = timed("  heapq (tuples)", mix_heapq)
+    for arity in (2, 4):
+        assert timed(f"  IndexedHeap(arity={arity})", lambda: mix_indexed(arity)) == expected
+    timed("  heapq.heapify (bulk load)", lambda: heapq.heapify([(p, i) for i, p in enumerate(priorities)]))
+    timed("  IndexedHeap(pairs) (bulk load)", lambda: IndexedHeap((p, i) for i, p in enumerate(priorities)))
+
+    print(f"Dijkstra, {vertices:,} vertices x {degree} edges")
+    graph = random_graph(vertices, degree)
+    dist, peak = timed("  heapq + lazy deletion", lambda: dijkstra_heapq(graph))
+    print(f"  {'peak heap size (with tombstones)':<38}{peak:>9,}")
+    for arity in (2, 4):
+        other, peak = timed(f"  IndexedHeap(arity={arity}) decrease-key", lambda: dijkstra_indexed(graph, arity=arity))
+        assert other == dist
+    print(f"  {'peak heap size':<38}{peak:>9,}")
+
+    print(f"top-{k} of a {n:,} item stream")
+    top = timed("  heapq.nlargest", lambda: heapq.nlargest(k, priorities))
+
+    def top_heapq():
+        heap = []
+        for priority in priorities:
+            if len(heap) < k:
+                heapq.heappush(heap, priority)
+            else:
+                heapq.heappushpop(heap, priority)
+        return sorted(heap, reverse=True)
+
+    def top_indexed():
+        heap = IndexedHeap(arity=4)
+        for priority in priorities:
+            if len(heap) < k:
+                heap.push(priority)
+            else:
+                heap.pushpop(priority)
+        return sorted((heap.pop()[0] for _ in range(len(heap))), reverse=True)
+
+    assert timed("  heapq.heappushpop", top_heapq) == top
+    assert timed("  IndexedHeap.pushpop", top_indexed) == top
+    return results
+
+
+# if __name__ == "__main__":
+#     tasks = IndexedHeap()
+#     backup, email, report = tasks.extend([(3, "backup"), (1, "email"), (2, "report")])
+#     tasks.update_priority(backup, 2.5)
+#     urgent = tasks.push(5, "deploy")
+#     tasks.update_priority(urgent, 0)  # ✅ now first in line
+#     tasks.remove(tasks.push(4, "cancelled"))  # ✅ gone, nothing left in the heap
+#     print([tasks.pop() for _ in range(len(tasks))])  # ✅ [(0, 'deploy'), (1, 'email'), (2, 'report'), (2.5, 'backup')]
+#     benchmark_heaps()
+
+"""
+4️⃣ Sorted Containers: SortedList and SortedDict
+bisect.insort keeps a plain list sorted, but every insert shifts everything after it: O(n) per insert,
+hours of memmove at 10^7 elements. SortedList splits the values into sublists of at most 2·LOAD items
+(plus the max of each one), so an insert only shifts within one small sublist.
+✅ add / remove / discard / `x in s` → bisect on the maxes, then bisect inside one sublist
+✅ s[i], s.index(x), s.bisect_left(x) → rank / select through a positional index (a Fenwick tree
+   over the sublist lengths), rebuilt lazily only when sublists are split or merged
+✅ irange(lo, hi, inclusive=(True, True), reverse=False) → iterate a value range without copying
+✅ update(values) → a large batch is merged in linear time (Timsort finds the two sorted runs)
+✅ SortedDict → a dict for O(1) lookups plus a SortedList of its keys for ordered iteration
+❌ Values must be mutually comparable, and must not change their order while stored
+"""
+from collections.abc import MutableMapping
+from itertools import chain, islice
+
+
+class SortedList:
+    LOAD = 1000
+
+    def __init__(self, iterable=()):
+        self._lists = []
+        self._maxes = []
+        self._index = None  # Fenwick tree over len(sublist), None until needed
+        self._len = 0
+        self.update(iterable)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._lists)
+
+    def __reversed__(self):
+        return chain.from_iterable(map(reversed, reversed(self._lists)))
+
+    def __repr__(self):
+        return f"SortedList({list(self)!r})"
+
+    def __contains__(self, value):
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return False
+        sublist = self._lists[pos]
+        idx = bisect.bisect_left(sublist, value)
+        return sublist[idx] == value
+
+    # positional index
+
+    def _build_index(self):
+        tree = [0] + [len(sublist) for sublist in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._index = tree
+
+    def _index_add(self, pos, delta):
+        tree = self._index
+        if tree is None:
+            return
+        i = pos + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, pos):
+        # Number of values in the sublists before `pos`
+        if self._index is None:
+            self._build_index()
+        tree, total = self._index, 0
+        while pos:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def _locate(self, index):
+        # index → (sublist, position inside it), by walking down the Fenwick tree
+        if self._index is None:
+            self._build_index()
+        tree, pos = self._index, 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                pos = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return pos, index
+
+    # updates
+
+    def add(self, value):
+        maxes, lists = self._maxes, self._lists
+        if not maxes:
+            lists.append([value])
+            maxes.append(value)
+            self._index = None
+        else:
+            pos = bisect.bisect_right(maxes, value)
+            if pos == len(maxes):
+                pos -= 1
+                lists[pos].append(value)
+                maxes[pos] = value
+            else:
+                bisect.insort(lists[pos], value)
+            self._index_add(pos, 1)
+            if len(lists[pos]) > 2 * self.LOAD:
+                self._split(pos)
+        self._len += 1
+
+    def _split(self, pos):
+        sublist = self._lists[pos]
+        half = sublist[self.LOAD:]
+        del sublist[self.LOAD:]
+        self._maxes[pos] = sublist[-1]
+        self._lists.insert(pos + 1, half)
+        self._maxes.insert(pos + 1, half[-1])
+        self._index = None
+
+    def _delete(self, pos, idx):
+        lists, maxes = self._lists, self._maxes
+        sublist = lists[pos]
+        del sublist[idx]
+        self._len -= 1
+        self._index_add(pos, -1)
+        if not sublist:
+            del lists[pos], maxes[pos]
+            self._index = None
+            return
+        maxes[pos] = sublist[-1]
+        if len(sublist) < self.LOAD // 2 and len(lists) > 1:
+            # Too small: merge with a neighbour (and split again if that makes it too big)
+            left = pos - 1 if pos else pos
+            lists[left].extend(lists[left + 1])
+            maxes[left] = lists[left][-1]
+            del lists[left + 1], maxes[left + 1]
+            self._index = None
+            if len(lists[left]) > 2 * self.LOAD:
+                self._split(left)
+
+    def discard(self, value):
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos < len(self._maxes):
+            idx = bisect.bisect_left(self._lists[pos], value)
+            if self._lists[pos][idx] == value:
+                self._delete(pos, idx)
+                return True
+        return False
+
+    def remove(self, value):
+        if not self.discard(value):
+            raise ValueError(f"{value!r} not in SortedList")
+
+    def update(self, iterable):
+        values = sorted(iterable)  # linear when the input is already sorted
+        if not values:
+            return
+        if len(values) * 4 >= self._len:
+            if self._len:
+                merged = list(self)
+                merged.extend(values)
+                merged.sort()  # two sorted runs: Timsort merges them in linear time
+                values = merged
+            load = self.LOAD
+            self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+            self._maxes = [sublist[-1] for sublist in self._lists]
+            self._len = len(values)
+            self._index = None
+        else:
+            for value in values:
+                self.add(value)
+
+    def clear(self):
+        self._lists, self._maxes, self._index, self._len = [], [], None, 0
+
+    # rank / select
+
+    def _normalize(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("SortedList index out of range")
+        return index
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step == 1 and start < stop:
+                return list(islice(self._iter_from(start), stop - start))
+            return [self[i] for i in range(start, stop, step)]
+        pos, idx = self._locate(self._normalize(index))
+        return self._lists[pos][idx]
+
+    def __delitem__(self, index):
+        pos, idx = self._locate(self._normalize(index))
+        self._delete(pos, idx)
+
+    def pop(self, index=-1):
+        pos, idx = self._locate(self._normalize(index))
+        value = self._lists[pos][idx]
+        self._delete(pos, idx)
+        return value
+
+    def bisect_left(self, value):
+        pos = bisect.bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect.bisect_left(self._lists[pos], value)
+
+    def bisect_right(self, value):
+        pos = bisect.bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect.bisect_right(self._lists[pos], value)
+
+    rank = bisect_left  # how many values are smaller
+
+    def index(self, value):
+        i = self.bisect_left(value)
+        if i == self._len or self[i] != value:
+            raise ValueError(f"{value!r} not in SortedList")
+        return i
+
+    def count(self, value):
+        return self.bisect_right(value) - self.bisect_left(value)
+
+    # ranges
+
+    def _iter_from(self, index):
+        if index >= self._len:
+            return iter(())
+        pos, idx = self._locate(index)
+        return chain(islice(self._lists[pos], idx, None), chain.from_iterable(self._lists[pos + 1:]))
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        start = 0 if lo is None else (self.bisect_left(lo) if inclusive[0] else self.bisect_right(lo))
+        stop = self._len if hi is None else (self.bisect_right(hi) if inclusive[1] else self.bisect_left(hi))
+        if start >= stop:
+            return iter(())
+        if reverse:
+            return (self[i] for i in range(stop - 1, start - 1, -1))
+        return islice(self._iter_from(start), stop - start)
+
+
+class SortedDict(MutableMapping):
+    def __init__(self, *args, **kwargs):
+        self._data = {}
+        self._keys = SortedList()
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if key not in self._data:
+            self._keys.add(key)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._keys.remove(key)
+
+    def __contains__(self, key):
+        return key in self._data  # a hash lookup, not a bisect
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __reversed__(self):
+        return reversed(self._keys)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"SortedDict({dict(self.items())!r})"
+
+    def update(self, *args, **kwargs):
+        incoming = dict(*args, **kwargs)
+        new_keys = [key for key in incoming if key not in self._data]
+        self._data.update(incoming)
+        self._keys.update(new_keys)  # one bulk merge instead of one add per key
+
+    def index(self, key):
+        return self._keys.index(key)
+
+    def peekitem(self, index=-1):
+        key = self._keys[index]
+        return key, self._data[key]
+
+    def popitem(self, index=-1):
+        key = self._keys.pop(index)
+        return key, self._data.pop(key)
+
+    def irange(self, lo=None, hi=None, inclusive=(True, True), reverse=False):
+        return self._keys.irange(lo, hi, inclusive, reverse)
+
+
+def benchmark_sorted(sizes=(10**4, 10**5, 10**6, 10**7), inserts=10_000):
+    # Cost of `inserts` random adds into a container that already holds n values
+    results = {}
+    for n in sizes:
+        rng = random.Random(n)
+        base = sorted(rng.random() for _ in range(n))
+        extra = [rng.random() for _ in range(inserts)]
+
+        plain = list(base)
+        start_time = time.perf_counter()
+        for value in extra:
+            bisect.insort(plain, value)
+        insort = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        sorted_list = SortedList(base)
+        build = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        for value in extra:
+            sorted_list.add(value)
+        add = time.perf_counter() - start_time
+        assert list(sorted_list) == plain
+
+        probes = [rng.randrange(len(plain)) for _ in range(inserts)]
+        start_time = time.perf_counter()
+        for i in probes:
+            sorted_list.rank(sorted_list[i])
+        select_rank = time.perf_counter() - start_time
+
+        results[n] = {"insort": insort, "add": add, "build": build, "select+rank": select_rank}
+        print(f"n={n:<12,}insort {insort / inserts * 1e6:>8.2f} us/op   SortedList.add {add / inserts * 1e6:>6.2f} us/op"
+              f"   select+rank {select_rank / inserts * 1e6:>6.2f} us/op   build {build:.3f}s")
+    return results
+
+
+# if __name__ == "__main__":
+#     scores = SortedList([50, 10, 40])
+#     scores.add(30)
+#     print(list(scores), scores[1], scores.rank(40), list(scores.irange(20, 45)))  # ✅ [10, 30, 40, 50] 30 2 [30, 40]
+#     prices = SortedDict({"pear": 3, "apple": 1})
+#     prices["fig"] = 2
+#     print(list(prices), prices.peekitem(0))  # ✅ ['apple', 'fig', 'pear'] ('apple', 1)
+#     benchmark_sorted()
+
+"""
+5️⃣ Columnar Records: ColumnStore
+A million (int, float, int, str) tuples cost well over 100 bytes per record: one tuple object plus a
+boxed int / float object per field. A dataclass instance adds a __dict__ on top.
+ColumnStore keeps one typed column per field instead: 8 bytes per int64 / float64 value, and string
+columns store a 4-byte code per row plus each distinct string once (dictionary encoding / interning).
+✅ append(row) / extend(rows) → values go straight into array.array columns
+✅ where(column, op, value, within=None) → matching row numbers, the comparison runs in C: map() over
+   the column (about as fast as a loop over tuples) or a NumPy mask (an order of magnitude faster);
+   chain conditions with within=, most selective first
+✅ between(lo, hi) → bisect on the sorted_by column: O(log n) range query, returns a range of rows
+✅ top_k(column, k) → heapq.nlargest over row numbers (np.partition with NumPy, same order and ties)
+✅ row(i) / rows(selection) → tuples only when you ask for them
+❌ column(name, numpy=True) is a zero-copy view: while it is alive the column cannot grow (BufferError)
+"""
+import array
+import sys
+from dataclasses import dataclass
+from itertools import compress, islice
+
+_SWAPPED = {"==": operator.eq, "!=": operator.ne, "<": operator.gt,
+            "<=": operator.ge, ">": operator.lt, ">=": operator.le}  # x < v ⇔ v > x
+
+
+class StringColumn:
+    def __init__(self):
+        self.codes = array.array("I")
+        self.values = []  # code → string
+        self._lookup = {}  # string → code
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def code(self, value):
+        return self._lookup.get(value, -1)
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            if not isinstance(value, str):
+                raise TypeError(f"string column got {type(value).__name__}: {value!r}")
+            code = self._lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.append(code)
+
+    def extend(self, values):
+        lookup = self._lookup
+        fresh = [value for value in dict.fromkeys(values) if value not in lookup]  # first seen, first coded
+        if not all(isinstance(value, str) for value in fresh):
+            raise TypeError("string column got a value that is not a str")
+        for value in fresh:
+            lookup[value] = len(self.values)
+            self.values.append(sys.intern(value))
+        self.codes.extend(map(lookup.__getitem__, values))
+
+    @property
+    def nbytes(self):
+        return (self.codes.itemsize * len(self.codes) + sys.getsizeof(self.values) + sys.getsizeof(self._lookup)
+                + sum(sys.getsizeof(value) for value in self.values))
+
+
+class ColumnStore:
+    def __init__(self, schema, sorted_by=None, use_numpy=None):
+        # schema: {"name": typecode}, typecodes as in array.array ("q", "d", "i", ...) or "str"
+        self.schema = dict(schema)
+        self.names = list(self.schema)
+        self.columns = {name: StringColumn() if typecode == "str" else array.array(typecode)
+                        for name, typecode in self.schema.items()}
+        if sorted_by is not None and self.schema[sorted_by] == "str":
+            raise ValueError("sorted_by must be a numeric column")
+        self.sorted_by = sorted_by
+        self._sort_pos = None if sorted_by is None else self.names.index(sorted_by)
+        self.use_numpy = load_numpy() is not None if use_numpy is None else use_numpy
+        if self.use_numpy and load_numpy() is None:
+            raise ImportError("ColumnStore(use_numpy=True) requires NumPy to be installed")
+        self._appenders = [self.columns[name].append for name in self.names]
+
+    def __len__(self):
+        return len(self.columns[self.names[0]])
+
+    def _check_order(self, first, values):
+        key = self.columns[self.sorted_by]
+        if key and first < key[-1] or not all(map(operator.le, values, islice(values, 1, None))):
+            raise ValueError(f"rows must arrive in {self.sorted_by!r} order")
+
+    def _truncate(self, length):
+        # Undo a partial append / extend: every column goes back to `length` rows
+        for column in self.columns.values():
+            del (column.codes if isinstance(column, StringColumn) else column)[length:]
+
+    def append(self, row):
+        if len(row) != len(self.names):
+            raise ValueError(f"expected {len(self.names)} fields {self.names}, got {len(row)}")
+        if self._sort_pos is not None:
+            self._check_order(row[self._sort_pos], ())
+        length = len(self)
+        try:
+            for append, value in zip(self._appenders, row):
+                append(value)  # array.array raises TypeError / OverflowError for a bad value
+        except BaseException:
+            self._truncate(length)
+            raise
+
+    def extend(self, rows, batch_size=65_536):
+        # Transpose a batch of rows at a time, then extend each column in one call; all or nothing
+        rows = iter(rows)
+        length = len(self)
+        try:
+            while batch := list(islice(rows, batch_size)):
+                if set(map(len, batch)) != {len(self.names)}:
+                    raise ValueError(f"every row needs {len(self.names)} fields {self.names}")
+                values = list(zip(*batch))
+                if self._sort_pos is not None:
+                    self._check_order(values[self._sort_pos][0], values[self._sort_pos])
+                for name, column_values in zip(self.names, values):
+                    self.columns[name].extend(column_values)
+        except BaseException:
+            self._truncate(length)
+            raise
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes if isinstance(column, StringColumn) else column.itemsize * len(column)
+                   for column in self.columns.values())
+
+    def column(self, name, numpy=False):
+        column = self.columns[name]
+        data = column.codes if isinstance(column, StringColumn) else column
+        return load_numpy().frombuffer(data, dtype=data.typecode) if numpy else data
+
+    def row(self, index):
+        return tuple(self.columns[name][index] for name in self.names)
+
+    def rows(self, selection):
+        return [self.row(i) for i in selection]
+
+    def where(self, name, op, value, within=None):
+        compare = _SWAPPED[op]
+        column = self.columns[name]
+        if isinstance(column, StringColumn):
+            if op not in ("==", "!="):
+                raise ValueError(f"string columns only support == and !=, not {op!r}")
+            value = column.code(value)  # compare 4-byte codes, never the strings
+        if self.use_numpy:
+            np = load_numpy()
+            data = self.column(name, numpy=True)
+            if within is None:
+                return np.flatnonzero(compare(value, data))
+            within = np.asarray(within, dtype=np.int64)
+            return within[compare(value, data[within])]
+        data = self.column(name)
+        test = functools.partial(compare, value)
+        if within is None:
+            return array.array("q", compress(range(len(data)), map(test, data)))
+        return array.array("q", compress(within, map(test, map(data.__getitem__, within))))
+
+    def between(self, lo, hi):
+        # Rows with lo <= sorted_by <= hi
+        if self.sorted_by is None:
+            raise ValueError("between() needs a ColumnStore created with sorted_by=")
+        key = self.columns[self.sorted_by]
+        return range(bisect.bisect_left(key, lo), bisect.bisect_right(key, hi))
+
+    def top_k(self, name, k, largest=True, within=None):
+        data = self.columns[name]
+        if isinstance(data, StringColumn):
+            raise ValueError("top_k() needs a numeric column")
+        candidates = range(len(data)) if within is None else within
+        if self.use_numpy:
+            np = load_numpy()
+            values = self.column(name, numpy=True)
+            candidates = np.asarray(candidates, dtype=np.int64)
+            picked = values[candidates]  # never negated: -x wraps around for unsigned typecodes
+            k = min(k, len(candidates))
+            if k == 0:
+                return []
+            pos = len(picked) - k if largest else k - 1
+            kth = np.partition(picked, pos)[pos]
+            better = np.flatnonzero(picked > kth if largest else picked < kth)
+            ties = np.flatnonzero(picked == kth)[:k - len(better)]  # the first ones, as heapq picks them
+            best = np.sort(np.concatenate((better, ties)))
+            if largest:  # stable descending: sort the reversed run ascending, then reverse it back
+                best = best[::-1][np.argsort(picked[best[::-1]], kind="stable")][::-1]
+            else:
+                best = best[np.argsort(picked[best], kind="stable")]
+            return candidates[best].tolist()
+        pick = heapq.nlargest if largest else heapq.nsmallest
+        return pick(k, candidates, key=data.__getitem__)
+
+    def sum(self, name, selection=None):
+        data = self.columns[name]
+        if self.use_numpy:
+            np = load_numpy()
+            values = self.column(name, numpy=True)
+            return (values.sum() if selection is None else values[np.asarray(selection, dtype=np.int64)].sum()).item()
+        return sum(data if selection is None else map(data.__getitem__, selection))
+
+
+@dataclass
+class Trade:
+    id: int
+    price: float
+    qty: int
+    symbol: str
+
+
+def benchmark_columns(n=1_000_000):
+    import tracemalloc
+
+    symbols = [f"SYM{i:03d}" for i in range(100)]
+    schema = {"id": "q", "price": "d", "qty": "q", "symbol": "str"}
+
+    def records():
+        rng = random.Random(7)  # the same records every time, but fresh objects for every build
+        return ((i, rng.uniform(1, 500), rng.randrange(1, 100), rng.choice(symbols)) for i in range(n))
+
+    def build_tuples():
+        return list(records())
+
+    def build_dataclasses():
+        return [Trade(*row) for row in records()]
+
+    def build_store(use_numpy):
+        def build():
+            store = ColumnStore(schema, sorted_by="id", use_numpy=use_numpy)
+            store.extend(records())
+            return store
+        return build
+
+    def measured(build):
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        built = build()
+        elapsed = time.perf_counter() - start_time
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return built, size, elapsed
+
+    # sum(price) where qty > 50 and symbol == "SYM042"
+    scans = {
+        "list of tuples": (build_tuples,
+                           lambda rows: sum(r[1] for r in rows if r[2] > 50 and r[3] == "SYM042")),
+        "list of dataclasses": (build_dataclasses,
+                                lambda rows: sum(r.price for r in rows if r.qty > 50 and r.symbol == "SYM042")),
+        "ColumnStore": (build_store(False),
+                        lambda s: s.sum("price", s.where("qty", ">", 50, within=s.where("symbol", "==", "SYM042")))),
+    }
+    if load_numpy() is not None:
+        scans["ColumnStore + NumPy"] = (build_store(True), scans["ColumnStore"][1])
+
+    results, expected = {}, None
+    print(f"{n:,} records{'bytes/record':>26}{'build':>10}{'scan':>10}{'M rows/s':>10}")
+    for name, (build, scan) in scans.items():
+        built, size, build_time = measured(build)
+        start_time = time.perf_counter()
+        total = scan(built)
+        scan_time = time.perf_counter() - start_time
+        expected = total if expected is None else expected
+        assert math.isclose(total, expected), name
+        results[name] = {"bytes_per_record": size / n, "build": build_time, "scan": scan_time}
+        print(f"{name:<24}{size / n:>12.1f}{build_time:>9.2f}s{scan_time:>9.3f}s{n / scan_time / 1e6:>10.1f}")
+        del built
+    return results
+
+
+# if __name__ == "__main__":
+#     trades = ColumnStore({"id": "q", "price": "d", "qty": "q", "symbol": "str"}, sorted_by="id")
+#     trades.extend([(1, 10.5, 3, "ABC"), (2, 99.0, 7, "XYZ"), (3, 42.0, 9, "ABC")])
+#     abc = trades.where("symbol", "==", "ABC")
+#     print(trades.rows(abc), trades.between(2, 3), trades.top_k("price", 2))  # ✅ ids 1 and 3, range(1, 3), [1, 2]
+#     benchmark_columns()
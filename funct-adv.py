@@ -84,6 +84,372 @@ def fib(n):
 
 print(fib(5))
 
+"""
+🔹 Beyond lru_cache: memoize()
+@lru_cache(maxsize=None) grows forever, never expires anything, and when 32 threads miss the same key
+at once all 32 compute it (a cache stampede). memoize() covers those cases:
+✅ maxsize + policy="lru" | "lfu" | "tinylfu" → bounded, evicts the least recent / least frequent entry;
+   tinylfu only admits a new key if a frequency sketch says it is hotter than the entry it would evict
+   (a one-off scan cannot flush the hot set)
+✅ ttl=seconds → entries expire, the next call recomputes
+✅ Single flight: concurrent misses on one key compute it once, the other callers wait for that result
+✅ async def functions → the same cache, concurrent awaits share one task
+✅ f.cache_info() → hits, misses, coalesced (waited on another caller), expired, evictions, rejections
+✅ f.cache_clear() → empties the cache and resets every counter (and the tinylfu sketch)
+❌ Pure Python with a lock: a hit costs ~1 µs against lru_cache's ~0.1 µs, use it where misses are expensive
+"""
+import asyncio
+import inspect
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import wraps
+
+CacheInfo = namedtuple("CacheInfo", "hits misses coalesced expired evictions rejections maxsize currsize")
+
+_KWARGS = object()  # separates positional from keyword arguments in a key
+
+
+def make_key(args, kwargs, typed=False):
+    key = args
+    if kwargs:
+        key += (_KWARGS,) + tuple(kwargs.items())
+    if typed:
+        key += tuple(type(arg) for arg in args) + tuple(type(value) for value in kwargs.values())
+    elif len(key) == 1 and type(key[0]) in (int, str):
+        return key[0]  # like lru_cache: no tuple to hash for the common single-argument call
+    return key
+
+
+class LRUPolicy:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.evictions = self.rejections = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            self.data.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.data[key] = entry
+        self.data.move_to_end(key)
+        if self.maxsize is not None and len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key):
+        self.data.pop(key, None)
+
+    def clear(self):
+        self.data.clear()
+        self.evictions = self.rejections = 0
+
+
+class LFUPolicy:
+    # O(1) LFU: one bucket of keys per use count, least recently used first inside a bucket
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = {}
+        self.uses = {}
+        self.buckets = defaultdict(OrderedDict)
+        self.min_uses = 0
+        self.evictions = self.rejections = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def _unlink(self, key):
+        uses = self.uses.pop(key)
+        bucket = self.buckets[uses]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[uses]
+        return uses
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            uses = self._unlink(key) + 1
+            self.uses[key] = uses
+            self.buckets[uses][key] = None
+            if self.min_uses not in self.buckets:
+                self.min_uses = uses
+        return entry
+
+    def put(self, key, entry):
+        if key in self.data:
+            self.data[key] = entry
+            self.get(key)
+            return
+        if self.maxsize is not None and len(self.data) >= self.maxsize:
+            if self.min_uses not in self.buckets:  # stale after pop()
+                self.min_uses = min(self.buckets)
+            victim = next(iter(self.buckets[self.min_uses]))
+            self._unlink(victim)
+            del self.data[victim]
+            self.evictions += 1
+        self.data[key] = entry
+        self.uses[key] = 1
+        self.buckets[1][key] = None
+        self.min_uses = 1
+
+    def pop(self, key):
+        if self.data.pop(key, None) is not None:
+            self._unlink(key)
+
+    def clear(self):
+        self.data.clear()
+        self.uses.clear()
+        self.buckets.clear()
+        self.evictions = self.rejections = 0
+
+
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class CountMinSketch:
+    # Approximate use counts in 4 bytearrays; all counts are halved every `sample` additions (aging)
+    SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5)
+
+    def __init__(self, width, sample):
+        self.mask = (1 << max(4, (width - 1).bit_length())) - 1
+        self.rows = [bytearray(self.mask + 1) for _ in self.SEEDS]
+        self.sample = sample
+        self.additions = 0
+
+    def _slots(self, key):
+        h = hash(key)
+        return [((h ^ seed) * 0xFF51AFD7ED558CCD >> 29) & self.mask for seed in self.SEEDS]
+
+    def add(self, key):
+        for row, slot in zip(self.rows, self._slots(key)):
+            if row[slot] < 255:
+                row[slot] += 1
+        self.additions += 1
+        if self.additions >= self.sample:
+            for row in self.rows:
+                row[:] = row.translate(_HALVE)
+            self.additions //= 2
+
+    def estimate(self, key):
+        return min(row[slot] for row, slot in zip(self.rows, self._slots(key)))
+
+
+class TinyLFUPolicy(LRUPolicy):
+    # TinyLFU admission in front of an LRU: a new key must be used more often than the LRU victim
+    def __init__(self, maxsize):
+        if maxsize is None:
+            raise ValueError("policy='tinylfu' needs a maxsize")
+        super().__init__(maxsize)
+        self.sketch = CountMinSketch(4 * maxsize, sample=10 * maxsize)
+
+    def clear(self):
+        super().clear()
+        self.sketch = CountMinSketch(4 * self.maxsize, sample=10 * self.maxsize)  # forget the old counts too
+
+    def get(self, key):
+        self.sketch.add(key)  # every access counts, hits and misses
+        return super().get(key)
+
+    def put(self, key, entry):
+        if key not in self.data and len(self.data) >= self.maxsize:
+            victim = next(iter(self.data))
+            if self.sketch.estimate(key) <= self.sketch.estimate(victim):
+                self.rejections += 1
+                return
+        super().put(key, entry)
+
+
+POLICIES = {"lru": LRUPolicy, "lfu": LFUPolicy, "tinylfu": TinyLFUPolicy}
+
+
+class _Call:
+    # One in-flight computation that other threads can wait on
+    __slots__ = ("owner", "done", "value", "error")
+
+    def __init__(self):
+        self.owner = threading.get_ident()
+        self.done = threading.Event()
+        self.value = self.error = None
+
+    def result(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def memoize(func=None, *, maxsize=128, policy="lru", ttl=None, typed=False, clock=time.monotonic):
+    if func is None:
+        return lambda f: memoize(f, maxsize=maxsize, policy=policy, ttl=ttl, typed=typed, clock=clock)
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy {policy!r}, expected one of {sorted(POLICIES)}")
+    cache = POLICIES[policy](maxsize)
+    lock = threading.Lock()
+    inflight = {}
+    counts = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0}
+
+    def lookup(key):
+        # Called with the lock held
+        entry = cache.get(key)
+        if entry is not None:
+            if entry[1] is None or clock() < entry[1]:
+                counts["hits"] += 1
+                return True, entry[0]
+            cache.pop(key)
+            counts["expired"] += 1
+        return False, None
+
+    def store(key, value):
+        if maxsize != 0:
+            cache.put(key, (value, None if ttl is None else clock() + ttl))
+
+    if inspect.iscoroutinefunction(func):
+        async def fill(key, args, kwargs):
+            try:
+                value = await func(*args, **kwargs)
+                with lock:
+                    store(key, value)
+                return value
+            finally:
+                with lock:
+                    if inflight.get(key) is asyncio.current_task():
+                        del inflight[key]
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs, typed)
+            loop = asyncio.get_running_loop()
+            with lock:
+                found, value = lookup(key)
+                if found:
+                    return value
+                task = inflight.get(key)
+                if task is None or task.get_loop() is not loop:
+                    counts["misses"] += 1
+                    task = inflight[key] = loop.create_task(fill(key, args, kwargs))
+                else:
+                    counts["coalesced"] += 1
+            return await asyncio.shield(task)  # one caller giving up does not cancel the others
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs, typed)
+            with lock:
+                found, value = lookup(key)
+                if found:
+                    return value
+                call = inflight.get(key)
+                waiting = call is not None and call.owner != threading.get_ident()
+                if waiting:
+                    counts["coalesced"] += 1
+                else:  # recursion on the same key computes again instead of waiting on itself
+                    counts["misses"] += 1
+                    call = inflight[key] = _Call()
+            if waiting:
+                return call.result()
+            try:
+                value = func(*args, **kwargs)
+            except BaseException as exc:
+                call.error = exc
+                raise
+            else:
+                call.value = value
+                with lock:
+                    store(key, value)
+                return value
+            finally:
+                with lock:
+                    if inflight.get(key) is call:
+                        del inflight[key]
+                call.done.set()
+
+    def cache_info():
+        with lock:
+            return CacheInfo(counts["hits"], counts["misses"], counts["coalesced"], counts["expired"],
+                             cache.evictions, cache.rejections, maxsize, len(cache))
+
+    def cache_clear():
+        with lock:
+            cache.clear()
+            counts.update(dict.fromkeys(counts, 0))
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
+def benchmark_memoize(threads=(1, 8, 32), calls=200_000, keys=50_000, maxsize=1_000, miss_cost=2_000):
+    import random
+
+    rng = random.Random(0)
+    # Skewed traffic (a few hot keys) with one-off scan keys mixed in, like a real lookup cache
+    stream = [int(keys * rng.random() ** 4) if rng.random() < 0.8 else keys + i for i in range(calls)]
+
+    def work(x):
+        return sum(range(miss_cost)) + x  # what a miss costs
+
+    caches = {
+        "lru_cache": lambda: lru_cache(maxsize=maxsize)(work),
+        "memoize lru": lambda: memoize(work, maxsize=maxsize),
+        "memoize lfu": lambda: memoize(work, maxsize=maxsize, policy="lfu"),
+        "memoize tinylfu": lambda: memoize(work, maxsize=maxsize, policy="tinylfu"),
+    }
+    results = {}
+    print(f"{'':<18}" + "".join(f"{f'{n} threads':>14}" for n in threads) + f"{'hit ratio':>12}")
+    for name, make in caches.items():
+        row = []
+        for n in threads:
+            cached = make()
+            parts = [stream[i::n] for i in range(n)]
+            workers = [threading.Thread(target=lambda part=part: [cached(x) for x in part]) for part in parts]
+            start_time = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start_time
+            info = cached.cache_info()
+            results[(name, n)] = calls / elapsed
+            row.append(calls / elapsed)
+        print(f"{name:<18}" + "".join(f"{ops / 1e3:>11.0f}k/s" for ops in row) + f"{info.hits / calls:>12.1%}")
+
+    # Stampede: 32 threads miss the same slow key at the same time
+    for name, wrap in (("lru_cache", lru_cache(maxsize=maxsize)), ("memoize", memoize(maxsize=maxsize))):
+        computed = []
+
+        @wrap
+        def slow(key):
+            computed.append(key)
+            time.sleep(0.05)
+            return key
+
+        crowd = [threading.Thread(target=slow, args=("report",)) for _ in range(32)]
+        for worker in crowd:
+            worker.start()
+        for worker in crowd:
+            worker.join()
+        results[(name, "stampede")] = len(computed)
+        print(f"stampede, {name:<10} computed {len(computed)} time(s) for 32 concurrent misses")
+    return results
+
+
+# if __name__ == "__main__":
+#     @memoize(maxsize=10_000, policy="tinylfu", ttl=60)
+#     def exchange_rate(currency):
+#         time.sleep(0.1)  # a remote call
+#         return 1.0
+#
+#     exchange_rate("EUR"), exchange_rate("EUR")
+#     print(exchange_rate.cache_info())  # ✅ hits=1 misses=1 ...
+#     benchmark_memoize()
+
 # 5️⃣ String Interning (sys.intern())
 # Python reuses immutable strings to save memory (interning).
 import sys
@@ -42,13 +42,13 @@ They pause execution at yield and resume when next() is called.
 ✅ Lazy Evaluation: Computes values only when needed.
 
 """
-if __name__ == "__main__":
-    def my_generator():
-        yield 1
-        yield 2
-        yield 3
+def my_generator():
+    yield 1
+    yield 2
+    yield 3
 
 
+if __name__ == "__main__":
     gen = my_generator()  # Create generator
 
     print(next(gen))  # 1
@@ -56,4 +56,203 @@ if __name__ == "__main__":
     print(next(gen))  # 3
     # print(next(gen))  # Raises StopIteration
 
+"""
+4️⃣ Composing Generators: a Lazy Stream
+Long hand-written generator chains are hard to read and harder to profile. Stream wraps any iterable
+(my_generator() included) and chains lazy stages; nothing runs until the result is iterated.
+✅ map / filter / take / batch(size) / window(size, step) / groupby(key) / dedupe(key, window)
+✅ merge_sorted(*others) → k-way merge of already sorted streams (heapq.merge)
+✅ parallel_map(func, executor) → order-preserving, at most `ahead` calls in flight
+✅ Memory stays O(window / batch / ahead): no stage ever holds the whole input
+✅ Stream(..., profile=True) → every stage counts items and the time spent producing them;
+   report() prints inclusive time and self time (inclusive minus the upstream stages)
+❌ A Stream is an iterator: it can be consumed once, like the generator it wraps
+❌ groupby only groups consecutive items (sort first), and each group is built as a list
+"""
+import heapq
+import itertools
+import time
+from collections import deque
+
+
+class StageStats:
+    __slots__ = ("name", "upstream", "items", "seconds")
+
+    def __init__(self, name, upstream=()):
+        self.name = name
+        self.upstream = upstream
+        self.items = 0
+        self.seconds = 0.0  # inclusive: time spent inside this stage and everything upstream of it
+
+    @property
+    def self_seconds(self):
+        return self.seconds - sum(stats.seconds for stats in self.upstream)
+
+    def as_dict(self):
+        return {"stage": self.name, "items": self.items,
+                "seconds": self.seconds, "self_seconds": self.self_seconds}
+
+
+def profiled(iterator, stats):
+    # Only the time spent in next() is counted: while paused at `yield`, downstream work is not ours
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.seconds += clock() - start
+            return
+        stats.seconds += clock() - start
+        stats.items += 1
+        yield item
+
+
+class Stream:
+    def __init__(self, iterable, name="source", profile=False, upstream=()):
+        self.profile = profile
+        self.stats = StageStats(name, tuple(stream.stats for stream in upstream))
+        self._upstream = upstream
+        iterator = iter(iterable)
+        self._iterator = profiled(iterator, self.stats) if profile else iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def _then(self, name, iterable, *others):
+        return Stream(iterable, name, self.profile, (self, *others))
+
+    def map(self, func):
+        return self._then("map", map(func, self._iterator))
+
+    def filter(self, predicate):
+        return self._then("filter", filter(predicate, self._iterator))
 
+    def take(self, n):
+        return self._then("take", itertools.islice(self._iterator, n))
+
+    def batch(self, size):
+        def batches(iterator):
+            while chunk := list(itertools.islice(iterator, size)):
+                yield chunk
+        return self._then("batch", batches(self._iterator))
+
+    def window(self, size, step=1):
+        def windows(iterator):
+            current = deque(itertools.islice(iterator, size), maxlen=size)
+            if len(current) < size:
+                return
+            yield tuple(current)
+            while True:
+                fresh = list(itertools.islice(iterator, step))
+                current.extend(fresh)  # maxlen drops the oldest items
+                if len(fresh) < step:
+                    return
+                yield tuple(current)
+        return self._then("window", windows(self._iterator))
+
+    def groupby(self, key=None):
+        groups = ((k, list(group)) for k, group in itertools.groupby(self._iterator, key))
+        return self._then("groupby", groups)
+
+    def dedupe(self, key=None, window=1):
+        # window=1 drops consecutive repeats, window=N remembers the last N keys, window=None remembers all
+        def unique(iterator):
+            recent, seen = deque(), set()
+            for item in iterator:
+                k = item if key is None else key(item)
+                if k in seen:
+                    continue
+                yield item
+                seen.add(k)
+                if window is not None:
+                    recent.append(k)
+                    if len(recent) > window:
+                        seen.discard(recent.popleft())
+        return self._then("dedupe", unique(self._iterator))
+
+    def merge_sorted(self, *others, key=None, reverse=False):
+        others = [other if isinstance(other, Stream) else Stream(other, profile=self.profile) for other in others]
+        merged = heapq.merge(self._iterator, *(other._iterator for other in others), key=key, reverse=reverse)
+        return self._then("merge_sorted", merged, *others)
+
+    def parallel_map(self, func, executor, ahead=None):
+        if ahead is None:
+            ahead = 2 * getattr(executor, "_max_workers", 4)
+
+        def ordered(iterator):
+            pending = deque()
+            for item in iterator:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= ahead:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        return self._then("parallel_map", ordered(self._iterator))
+
+    def to_list(self):
+        return list(self)
+
+    def stages(self):
+        # Every stage feeding this one, sources first (each listed once)
+        order, seen = [], set()
+
+        def visit(stream):
+            if id(stream) in seen:
+                return
+            seen.add(id(stream))
+            for upstream in stream._upstream:
+                visit(upstream)
+            order.append(stream.stats)
+        visit(self)
+        return order
+
+    def report(self):
+        rows = [stats.as_dict() for stats in self.stages()]
+        if not self.profile:
+            print("profiling is off: build the stream with Stream(..., profile=True)")
+            return rows
+        print(f"{'stage':<14}{'items':>12}{'inclusive':>12}{'self':>12}")
+        for row in rows:
+            print(f"{row['stage']:<14}{row['items']:>12}{row['seconds'] * 1e3:>10.1f}ms{row['self_seconds'] * 1e3:>10.1f}ms")
+        return rows
+
+
+def benchmark_stream(n=1_000_000):
+    def by_hand():
+        squares = (x * x for x in range(n))
+        evens = (x for x in squares if x % 2 == 0)
+        return sum(a + b for a, b in zip(evens, evens))  # consecutive pairs, like batch(2)
+
+    def chained(profile):
+        stream = Stream(range(n), profile=profile).map(lambda x: x * x).filter(lambda x: x % 2 == 0).batch(2)
+        total = sum(sum(pair) for pair in stream if len(pair) == 2)
+        return total, stream
+
+    results = {}
+    for name, run in (("generators by hand", by_hand),
+                      ("Stream", lambda: chained(False)[0]),
+                      ("Stream, profile=True", lambda: chained(True))):
+        start_time = time.perf_counter()
+        out = run()
+        results[name] = time.perf_counter() - start_time
+        if name == "generators by hand":
+            expected = out
+        print(f"{name:<24}{results[name]:>8.3f}s")
+    assert out[0] == expected
+    out[1].report()  # self times include the profiler's own per-item cost
+    return results
+
+
+# if __name__ == "__main__":
+#     print(Stream(my_generator()).map(lambda x: x * 10).to_list())  # ✅ [10, 20, 30]
+#     print(Stream(range(10)).window(3, step=2).to_list())  # ✅ [(0, 1, 2), (2, 3, 4), (4, 5, 6), (6, 7, 8)]
+#     print(Stream("aaabccdd").groupby().map(lambda g: (g[0], len(g[1]))).to_list())  # ✅ [('a', 3), ('b', 1), ...]
+#     print(Stream([1, 4, 9]).merge_sorted([2, 3], [5]).dedupe().take(4).to_list())  # ✅ [1, 2, 3, 4]
+#     from concurrent.futures import ThreadPoolExecutor
+#     with ThreadPoolExecutor(8) as pool:
+#         print(Stream(range(5)).parallel_map(lambda x: x + 1, pool).to_list())  # ✅ [1, 2, 3, 4, 5]
+#     benchmark_stream()
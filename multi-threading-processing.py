@@ -46,7 +46,10 @@ def run_threads(num_threads=4, iterations=10_000_000):
 
     for t in threads:
         t.join()
-        print(f"Execution Time: {time.time() - start_time:.2f} seconds")
+
+    elapsed = time.time() - start_time
+    print(f"Execution Time: {elapsed:.2f} seconds")  # ✅ once, after every thread has finished
+    return elapsed
 
 
 # Run the test
@@ -64,32 +67,554 @@ import multiprocessing
 import time
 
 
-def cpu_task(n):
-    total = 0
-    for i in range(n):
-        total += i * i
-    return total
+# cpu_task() is the same function defined above
 
 
-def run_processes(num_processes=4, iterations=10_000_000):
+def run_processes(num_processes=4, iterations=10_000_000, pool=None):
     processes = []
     start_time = time.time()
 
-    for _ in range(num_processes):
-        p = multiprocessing.Process(target=cpu_task, args=(iterations,))
-        p.start()  # it runs independently of the main program.
-        processes.append(p)
+    if pool is not None:  # reuse warm workers (see WarmPool below) instead of spawning new ones
+        list(pool.map(cpu_task, [iterations] * num_processes))
+    else:
+        for _ in range(num_processes):
+            p = multiprocessing.Process(target=cpu_task, args=(iterations,))
+            p.start()  # it runs independently of the main program.
+            processes.append(p)
 
     for p in processes:
         # blocks the main program until the thread finishes execution.
         p.join()  # is a method used in Python threading to ensure that the main program waits for a thread to complete before moving forward.
 
-    print(f"Execution Time: {time.time() - start_time:.2f} seconds")
+    elapsed = time.time() - start_time
+    print(f"Execution Time: {elapsed:.2f} seconds")
+    return elapsed
 
 
-if __name__ == "__main__":
-    print("Testing Multiprocessing Performance")
-    run_processes()
+# if __name__ == "__main__":
+#     print("Testing Multiprocessing Performance")
+#     run_processes()  # ✅ or: python multi-threading-processing.py bench processes
+
+"""
+🔹 Making cpu_task Fast: Chunked Parallel Engine
+cpu_task() spends all of its time in the interpreter loop. There are three ways to compute the same total:
+✅ "loop"   → the original pure-Python loop (the baseline)
+✅ "numpy"  → a vectorized NumPy kernel (only when NumPy is installed)
+✅ "closed" → the sum-of-squares formula: 0² + 1² + ... + (n-1)² = (n-1)·n·(2n-1) / 6
+
+"loop" and "numpy" split range(n) into chunks and run the chunks across a process pool,
+"closed" is O(1) and needs no pool at all.
+"""
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    # Imported on first use: NumPy alone takes longer to import than the rest of this module
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional, the "numpy" backend is simply unavailable
+        return None
+    return numpy
+
+BACKENDS = ("loop", "numpy", "closed")
+INT64_MAX = 2 ** 63 - 1
+
+
+def squares_loop(start, stop):
+    total = 0
+    for i in range(start, stop):
+        total += i * i
+    return total
+
+
+def squares_numpy(start, stop):
+    if stop <= start:
+        return 0
+    largest = (stop - 1) ** 2
+    if largest > INT64_MAX:
+        return squares_loop(start, stop)  # a single square would overflow int64
+
+    # Work in blocks small enough that a block's sum can never overflow int64,
+    # then add the blocks up as Python ints so the total stays exact.
+    block = max(1, INT64_MAX // max(1, largest))
+    np = load_numpy()
+    total = 0
+    for lo in range(start, stop, block):
+        values = np.arange(lo, min(lo + block, stop), dtype=np.int64)
+        total += int(np.dot(values, values))
+    return total
+
+
+def squares_closed(start, stop):
+    def upto(n):  # sum of i * i for i in range(n)
+        return (n - 1) * n * (2 * n - 1) // 6
+
+    return upto(stop) - upto(start) if stop > start else 0
+
+
+KERNELS = {"loop": squares_loop, "numpy": squares_numpy, "closed": squares_closed}
+
+
+def chunk_bounds(n, chunks):
+    step = max(1, -(-n // chunks))  # ceil(n / chunks)
+    return [(lo, min(lo + step, n)) for lo in range(0, n, step)]
+
+
+def run_chunk(backend, start, stop):
+    return KERNELS[backend](start, stop)
+
+
+def resolve_backend(backend="auto", exact=False):
+    if exact:
+        return "closed"  # the exact total never needs a loop
+    if backend == "auto":
+        return "numpy" if load_numpy() is not None else "loop"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected 'auto' or one of {BACKENDS}")
+    if backend == "numpy" and load_numpy() is None:
+        raise ImportError("backend='numpy' requires NumPy to be installed")
+    return backend
+
+
+def cpu_task_fast(n, backend="auto", workers=None, chunks=None, exact=False, pool=None):
+    backend = resolve_backend(backend, exact)
+    workers = workers or (pool.processes if pool else os.cpu_count()) or 1
+
+    # Process startup costs more than the work itself for the closed form, small n or one worker
+    if backend == "closed" or workers == 1 or n < 100_000:
+        return KERNELS[backend](0, n)
+
+    bounds = chunk_bounds(n, chunks or workers * 4)
+    starts, stops = zip(*bounds)
+    if pool is not None:
+        return sum(pool.map(run_chunk, [backend] * len(bounds), starts, stops))
+    from concurrent.futures import ProcessPoolExecutor  # loads concurrent.futures.process: only when used
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(run_chunk, [backend] * len(bounds), starts, stops))
+
+
+def compare_backends(n=10_000_000, workers=None):
+    start_time = time.perf_counter()
+    expected = cpu_task(n)  # the original loop is the baseline
+    baseline = time.perf_counter() - start_time
+    timings = {"cpu_task": baseline}
+    print(f"{'backend':<10}{'seconds':>10}{'speedup':>10}")
+    print(f"{'cpu_task':<10}{baseline:>10.4f}{1.0:>9.1f}x")
+
+    for backend in BACKENDS:
+        if backend == "numpy" and load_numpy() is None:
+            print(f"{backend:<10}{'skipped (NumPy not installed)':>30}")
+            continue
+        start_time = time.perf_counter()
+        total = cpu_task_fast(n, backend=backend, workers=workers)
+        elapsed = time.perf_counter() - start_time
+        assert total == expected, f"{backend} returned a different total"
+        timings[backend] = elapsed
+        print(f"{backend:<10}{elapsed:>10.4f}{baseline / elapsed:>9.1f}x")
+    return timings
+
+
+# if __name__ == "__main__":
+#     print(cpu_task_fast(10_000_000, exact=True))  # ✅ 333333283333335000000, instantly
+#     compare_backends()  # ✅ per-backend timings and speedup over cpu_task()
+
+"""
+🔹 Benchmark Harness: Threads vs Processes vs Pools (GIL and Free-Threaded Builds)
+Timing a single run tells us very little. The harness below:
+✅ Splits the same total work (size iterations of cpu_task) across 1, 2, 4, ... workers
+✅ Runs it on threads, processes, ThreadPoolExecutor, ProcessPoolExecutor and multiprocessing.Pool
+✅ Repeats every configuration and reports min / median / p95
+✅ Speedup = serial time / parallel time, Efficiency = speedup / workers
+✅ Records whether the interpreter runs with the GIL or is a free-threaded (3.13t) build
+
+On a GIL build thread speedup stays around 1.0x, on a free-threaded build it should track the processes.
+"""
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+def gil_status():
+    import platform
+    import sysconfig
+
+    free_threaded_build = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    # A free-threaded build can still re-enable the GIL (PYTHON_GIL=1 or an incompatible extension)
+    gil_enabled = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "free_threaded_build": free_threaded_build,
+        "gil_enabled": gil_enabled,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def median(values):
+    ordered = sorted(values)  # statistics.median, without importing statistics (and fractions, decimal)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))  # nearest-rank method
+    return ordered[max(rank, 1) - 1]
+
+
+def bench_threads(workers, size):
+    threads = [threading.Thread(target=cpu_task, args=(size // workers,)) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def bench_processes(workers, size):
+    processes = [multiprocessing.Process(target=cpu_task, args=(size // workers,)) for _ in range(workers)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+
+def bench_thread_pool(workers, size):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(cpu_task, [size // workers] * workers))
+
+
+def bench_process_pool(workers, size):
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(cpu_task, [size // workers] * workers))
+
+
+def bench_mp_pool(workers, size):
+    with multiprocessing.Pool(processes=workers) as pool:
+        pool.map(cpu_task, [size // workers] * workers)
+
+
+BENCHMARKS = {
+    "threads": bench_threads,
+    "processes": bench_processes,
+    "thread_pool": bench_thread_pool,
+    "process_pool": bench_process_pool,
+    "mp_pool": bench_mp_pool,
+}
+
+
+def time_runs(func, args, repeats):
+    samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+
+def run_benchmarks(worker_counts=(1, 2, 4), sizes=(1_000_000, 10_000_000), repeats=5,
+                   backends=tuple(BENCHMARKS), json_path=None):
+    results = []
+    for size in sizes:
+        serial = min(time_runs(cpu_task, (size,), repeats))  # single thread, no pool: the baseline
+        for backend in backends:
+            for workers in worker_counts:
+                samples = time_runs(BENCHMARKS[backend], (workers, size), repeats)
+                best = min(samples)
+                results.append({
+                    "backend": backend,
+                    "workers": workers,
+                    "size": size,
+                    "repeats": repeats,
+                    "min": best,
+                    "median": median(samples),
+                    "p95": percentile(samples, 95),
+                    "serial": serial,
+                    "speedup": serial / best,
+                    "efficiency": serial / best / workers,
+                })
+
+    report = {"interpreter": gil_status(), "results": results}
+    if json_path:
+        import json
+
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def print_report(report):
+    info = report["interpreter"]
+    build = "free-threaded" if info["free_threaded_build"] else "GIL"
+    print(f"Python {info['python']} ({build} build, GIL {'on' if info['gil_enabled'] else 'off'}, "
+          f"{info['cpu_count']} CPUs)")
+    print(f"{'backend':<14}{'workers':>8}{'size':>12}{'min':>9}{'median':>9}{'p95':>9}{'speedup':>9}{'eff':>7}")
+    for r in report["results"]:
+        print(f"{r['backend']:<14}{r['workers']:>8}{r['size']:>12,}{r['min']:>9.3f}{r['median']:>9.3f}"
+              f"{r['p95']:>9.3f}{r['speedup']:>8.2f}x{r['efficiency']:>7.0%}")
+
+
+# if __name__ == "__main__":
+#     report = run_benchmarks(json_path="bench_results.json")
+#     print_report(report)  # ✅ one row per backend / workers / size
+
+"""
+🔹 Warm Worker Pool (Start Once, Reuse Everywhere)
+Starting a process costs milliseconds, so for small n run_processes() and Pool(processes=3)
+spend more time spawning workers than computing.
+WarmPool starts its workers once and keeps them alive between calls:
+✅ It is a concurrent.futures.Executor → submit(), map() and shutdown() work as usual
+✅ Workers are recycled after max_tasks_per_worker tasks or once they pass max_memory_mb
+✅ get_pool() returns one shared pool, shut down automatically at exit
+✅ A worker that crashes (segfault, os._exit, OOM killer) is replaced, and the task it was running fails
+   with BrokenExecutor instead of leaving its future pending forever
+✅ metrics() reports startup cost and per-task dispatch overhead
+"""
+import atexit
+import pickle
+import queue
+from concurrent.futures import BrokenExecutor, Executor, Future
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module, memory recycling is disabled there
+    resource = None
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0  # KB on Linux
+
+
+def warm_worker(tasks, results, max_tasks, max_memory_kb, running, slot):
+    results.put(pickle.dumps(("ready", os.getpid(), None, None, 0.0)))
+    done = 0
+    while True:
+        payload = tasks.get()
+        if payload is None:  # shutdown sentinel
+            results.put(pickle.dumps(("exit", os.getpid(), None, None, 0.0)))
+            return
+
+        task_id, fn, args, kwargs = pickle.loads(payload)
+        running[slot] = task_id  # shared memory, visible at once: the parent knows what died with us
+        start_time = time.perf_counter()
+        try:
+            ok, value = True, fn(*args, **kwargs)
+        except Exception as exc:
+            ok, value = False, exc
+        elapsed = time.perf_counter() - start_time
+
+        try:
+            message = pickle.dumps(("done", task_id, ok, value, elapsed))
+        except Exception as exc:  # the result (or the exception) could not be pickled
+            message = pickle.dumps(("done", task_id, False, RuntimeError(f"Unpicklable result: {exc!r}"), elapsed))
+        results.put(message)
+
+        done += 1
+        if (max_tasks and done >= max_tasks) or (max_memory_kb and peak_rss_kb() > max_memory_kb):
+            results.put(pickle.dumps(("retire", os.getpid(), None, None, 0.0)))
+            return
+
+
+class WarmPool(Executor):
+    def __init__(self, processes=None, max_tasks_per_worker=None, max_memory_mb=None):
+        self.processes = processes or os.cpu_count() or 1
+        self._max_tasks = max_tasks_per_worker
+        self._max_memory_kb = max_memory_mb * 1024 if max_memory_mb else None
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._tasks = None
+        self._results = None
+        self._workers = {}  # pid -> Process
+        self._slots = {}  # pid -> index into _running
+        self._running = None  # slot -> id of the task its worker took last
+        self._pending = {}  # task_id -> (Future, submit time)
+        self._next_id = 0
+        self._booting = 0
+        self._collector = None
+        self._started = False
+        self._shutdown = False
+        self._stats = {"startup_seconds": 0.0, "tasks": 0, "recycled": 0, "run_seconds": 0.0,
+                       "overhead_seconds": 0.0}
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            if self._shutdown:
+                raise RuntimeError("cannot start a pool after shutdown")
+            self._started = True
+            start_time = time.perf_counter()
+            if os.name == "posix":
+                from multiprocessing import resource_tracker
+
+                # Forked workers inherit it: a SharedArray they attach to stays tracked once, by its creator
+                resource_tracker.ensure_running()
+            self._tasks = multiprocessing.Queue()
+            self._results = multiprocessing.Queue()
+            self._running = multiprocessing.RawArray("q", [-1] * self.processes)
+            self._booting = self.processes
+            for _ in range(self.processes):
+                self._spawn()
+            self._collector = threading.Thread(target=self._collect, name="WarmPool-collector", daemon=True)
+            self._collector.start()
+            self._ready.wait_for(lambda: self._booting == 0)
+            self._stats["startup_seconds"] = time.perf_counter() - start_time
+        return self
+
+    def _spawn(self):  # called with the lock held
+        slot = min(set(range(self.processes)) - set(self._slots.values()))
+        self._running[slot] = -1
+        p = multiprocessing.Process(target=warm_worker, daemon=True,
+                                    args=(self._tasks, self._results, self._max_tasks, self._max_memory_kb,
+                                          self._running, slot))
+        p.start()
+        self._workers[p.pid] = p
+        self._slots[p.pid] = slot
+
+    def _forget(self, pid):  # called with the lock held
+        self._workers.pop(pid).join()
+        del self._slots[pid]
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.start()
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            task_id = self._next_id
+            self._next_id += 1
+            payload = pickle.dumps((task_id, fn, args, kwargs))  # fail here, in the caller, if fn is not picklable
+            self._pending[task_id] = (future, time.perf_counter())
+        self._tasks.put(payload)
+        return future
+
+    def _collect(self):
+        while True:
+            try:
+                kind, key, ok, value, elapsed = pickle.loads(self._results.get(timeout=0.5))
+            except queue.Empty:
+                self._reap_dead_workers()
+                with self._lock:
+                    if self._shutdown and not self._workers:
+                        return
+                continue
+
+            if kind == "done":
+                with self._lock:
+                    future, submitted = self._pending.pop(key)
+                    self._stats["tasks"] += 1
+                    self._stats["run_seconds"] += elapsed
+                    self._stats["overhead_seconds"] += time.perf_counter() - submitted - elapsed
+                if future.set_running_or_notify_cancel():  # False → cancelled, the result is dropped
+                    future.set_result(value) if ok else future.set_exception(value)
+                continue
+
+            with self._lock:
+                if kind == "ready":
+                    self._booting = max(0, self._booting - 1)
+                    self._ready.notify_all()
+                elif kind == "retire":
+                    if key in self._workers:
+                        self._forget(key)
+                    self._stats["recycled"] += 1
+                    if not self._shutdown or self._pending:
+                        self._spawn()
+                        if self._shutdown:
+                            self._tasks.put(None)  # the replacement needs its own sentinel
+                elif kind == "exit" and key in self._workers:
+                    self._forget(key)
+                if self._shutdown and not self._workers:
+                    return
+
+    def _reap_dead_workers(self):
+        # A worker that crashed (segfault, os._exit, OOM killer) never says goodbye; replace it.
+        # Called once the results queue is empty, so a task it finished has been delivered already.
+        broken = []
+        with self._lock:
+            for pid, p in list(self._workers.items()):
+                if not p.is_alive():
+                    task_id = self._running[self._slots[pid]]
+                    if task_id in self._pending:
+                        future, _ = self._pending.pop(task_id)
+                        broken.append((future, BrokenExecutor(
+                            f"worker {pid} died (exit code {p.exitcode}) while running this task")))
+                    self._forget(pid)
+                    if not self._shutdown:
+                        self._spawn()
+        for future, error in broken:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            if not self._started:
+                return
+            if cancel_futures:
+                for future, _ in self._pending.values():
+                    future.cancel()
+            workers = len(self._workers)
+        for _ in range(workers):
+            self._tasks.put(None)  # queued behind any pending tasks, so they still finish
+        if wait:
+            self._collector.join()
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["workers"] = len(self._workers)
+            stats["pending"] = len(self._pending)
+        tasks = max(1, stats["tasks"])
+        stats["mean_run_seconds"] = stats["run_seconds"] / tasks
+        stats["mean_dispatch_overhead"] = stats["overhead_seconds"] / tasks  # time outside fn()
+        return stats
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = WarmPool()
+            atexit.register(_default_pool.shutdown)
+        return _default_pool
+
+
+def compare_cold_vs_warm(n=10_000, tasks=4, rounds=5):
+    cold = []
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        with multiprocessing.Pool(processes=tasks) as pool:  # what square() does today
+            pool.map(cpu_task, [n] * tasks)
+        cold.append(time.perf_counter() - start_time)
+
+    pool = get_pool().start()
+    warm = []
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        list(pool.map(cpu_task, [n] * tasks))
+        warm.append(time.perf_counter() - start_time)
+
+    metrics = pool.metrics()
+    print(f"Cold Pool per call : {median(cold) * 1000:.2f} ms")
+    print(f"Warm pool per call : {median(warm) * 1000:.2f} ms")
+    print(f"Warm pool startup  : {metrics['startup_seconds'] * 1000:.2f} ms (paid once)")
+    print(f"Dispatch overhead  : {metrics['mean_dispatch_overhead'] * 1e6:.0f} µs per task")
+    return {"cold": cold, "warm": warm, "metrics": metrics}
+
+
+# if __name__ == "__main__":
+#     run_processes(pool=get_pool())  # ✅ same work, no process startup after the first call
+#     compare_cold_vs_warm()
 
 """
 1️⃣ Multitasking
@@ -160,12 +685,15 @@ def task(n):
     return n * 2
 
 
-# Create a thread pool with 3 workers
-with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-    results = executor.map(task, range(5))  # Run tasks concurrently
+def thread_pool_demo():
+    # Create a thread pool with 3 workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        results = executor.map(task, range(5))  # Run tasks concurrently
+    return list(results)
+
 
 # if __name__ == "__main__":
-#     print(list(results))  # Output: [0, 2, 4, 6, 8]
+#     print(thread_pool_demo())  # Output: [0, 2, 4, 6, 8]
 
 """
 🔹 Using ProcessPoolExecutor (For CPU-bound tasks)
@@ -180,33 +708,141 @@ import queue
 import threading
 import time
 
-# Create a shared queue
-q = queue.Queue()
-
-
-def producer():
+def producer(q):
     for i in range(5):
         time.sleep(1)
         q.put(i)
         print(f"Produced: {i}")
+    q.put(None)  # ✅ Sentinel: tells the consumer nothing more is coming
 
 
-def consumer():
-    while not q.empty():
-        item = q.get()
+def consumer(q):
+    # q.empty() is a race once both threads run at the same time, so wait for the sentinel instead
+    while (item := q.get()) is not None:
         print(f"Consumed: {item}")
         time.sleep(1)
 
 
-# Start producer and consumer threads
-t1 = threading.Thread(target=producer)
-t2 = threading.Thread(target=consumer)
+def queue_demo():
+    # Create a shared queue
+    q = queue.Queue()
+
+    # Start producer and consumer threads (they run concurrently)
+    t1 = threading.Thread(target=producer, args=(q,))
+    t2 = threading.Thread(target=consumer, args=(q,))
+
+    t1.start()
+    t2.start()
+
+    t1.join()
+    t2.join()
 
-t1.start()
-t1.join()  # Ensure producer finishes before consumer starts
+"""
+🔹 Bounded Producer/Consumer Pipeline (N Producers, M Consumers)
+queue.Queue takes a lock for every put() and get(). At millions of small items that lock traffic
+is the bottleneck, so BatchQueue moves whole batches per lock:
+✅ Bounded: put_many() blocks when the queue is full (backpressure); maxsize <= 0 means unbounded,
+   like queue.Queue
+✅ put_many() / get_many() transfer a batch under one lock acquisition
+✅ Shutdown with a sentinel (STOP) that each consumer passes on to the next
+✅ Counters: items in/out, max depth and how often producers had to wait
+"""
+import itertools
+from collections import deque
+
+STOP = object()
+
+
+class BatchQueue:
+    def __init__(self, maxsize=65_536):
+        self.maxsize = maxsize
+        self._limit = maxsize if maxsize > 0 else sys.maxsize
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self.stats = {"put": 0, "got": 0, "max_depth": 0, "full_waits": 0}
+
+    def put(self, item):
+        self.put_many((item,))
+
+    def put_many(self, items):
+        items = items if isinstance(items, (list, tuple)) else list(items)
+        sent = 0
+        with self._not_full:
+            while sent < len(items):
+                while len(self._items) >= self._limit:
+                    self.stats["full_waits"] += 1
+                    self._not_full.wait()
+                room = self._limit - len(self._items)
+                self._items.extend(items[sent:sent + room])
+                sent += room
+                self.stats["max_depth"] = max(self.stats["max_depth"], len(self._items))
+                self._not_empty.notify_all()
+            self.stats["put"] += len(items)
+
+    def get(self):
+        return self.get_many(1)[0]
+
+    def get_many(self, max_items=1024, timeout=None):
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._items, timeout):
+                return []  # timed out
+            if len(self._items) <= max_items:
+                batch = list(self._items)  # take everything, no per-item popleft()
+                self._items.clear()
+            else:
+                batch = [self._items.popleft() for _ in range(max_items)]
+            self.stats["got"] += len(batch)
+            self._not_full.notify_all()
+            return batch
+
+    def qsize(self):
+        return len(self._items)
+
+
+def run_pipeline(sources, handle_batch, consumers=2, batch_size=1024, maxsize=65_536):
+    work = BatchQueue(maxsize)
+    handled = [0] * consumers
+
+    def produce(source):
+        it = iter(source)
+        while batch := list(itertools.islice(it, batch_size)):
+            work.put_many(batch)
+
+    def consume(index):
+        while True:
+            batch = work.get_many(batch_size)
+            if batch[-1] is STOP:  # STOP is always the last item ever put
+                work.put(STOP)  # pass it on to the next consumer
+                batch.pop()
+                if batch:
+                    handle_batch(batch)
+                    handled[index] += len(batch)
+                return
+            handle_batch(batch)
+            handled[index] += len(batch)
+
+    start_time = time.perf_counter()
+    producer_threads = [threading.Thread(target=produce, args=(source,)) for source in sources]
+    consumer_threads = [threading.Thread(target=consume, args=(i,)) for i in range(consumers)]
+    for t in producer_threads + consumer_threads:
+        t.start()
+    for t in producer_threads:
+        t.join()
+    work.put(STOP)  # every producer is done
+    for t in consumer_threads:
+        t.join()
+    elapsed = time.perf_counter() - start_time
+
+    items = sum(handled)
+    return {"items": items, "seconds": elapsed, "items_per_second": items / elapsed if elapsed else 0.0,
+            "per_consumer": handled, "max_depth": work.stats["max_depth"], "full_waits": work.stats["full_waits"]}
 
-t2.start()
-t2.join()
+
+# if __name__ == "__main__":
+#     stats = run_pipeline([range(2_000_000)] * 4, handle_batch=len, consumers=4)
+#     print(f"{stats['items_per_second']:,.0f} items/s, max depth {stats['max_depth']}")
 
 """
 🚀 When to Use What?
@@ -239,7 +875,7 @@ def square(n):
     return n ** 2
 
 
-if __name__ == "__main__":
+def pool_demo():
     numbers = [1, 2, 3, 4, 5]
 
     # Create a pool with 3 worker processes
@@ -247,3 +883,731 @@ if __name__ == "__main__":
         result = pool.map(square, numbers)  # Apply `square` function to each number
 
     print(result)  # Output: [1, 4, 9, 16, 25]
+
+    # The same call on the shared warm pool: no new processes after the first use
+    print(list(get_pool().map(square, numbers)))  # Output: [1, 4, 9, 16, 25]
+
+"""
+🔹 Adaptive Batching for Large Inputs
+pool.map(square, numbers) pickles and ships every item separately unless you pick a chunksize,
+and it builds one big result list. adaptive_imap() fixes both:
+✅ Times func on a small sample and sizes chunks so each takes about target_seconds
+✅ Streams results back in input order (like imap), with a bounded number of chunks in flight
+✅ array.array and NumPy inputs travel as whole buffers, NumPy chunks are passed to func as arrays
+   (so func must work element-wise on an ndarray, like square() does)
+"""
+import array
+import itertools
+from collections import deque
+
+
+def is_ndarray(data):
+    np = load_numpy() if "numpy" in sys.modules else None  # an ndarray means NumPy is already imported
+    return np is not None and isinstance(data, np.ndarray)
+
+
+def apply_chunk(func, chunk, typecode=None):
+    if is_ndarray(chunk):
+        return func(chunk)  # one vectorized call for the whole chunk
+    if isinstance(chunk, array.array):
+        return array.array(typecode or chunk.typecode, map(func, chunk))
+    return [func(item) for item in chunk]
+
+
+def iter_chunks(data, size):
+    if isinstance(data, (array.array, list)) or is_ndarray(data):
+        for start in range(0, len(data), size):
+            yield data[start:start + size]  # a slice of a buffer pickles as one block of bytes
+    else:
+        it = iter(data)
+        while chunk := list(itertools.islice(it, size)):
+            yield chunk
+
+
+def adaptive_imap(func, data, pool=None, typecode=None, sample_size=1_000, target_seconds=0.05,
+                  max_in_flight=None, chunks=False):
+    pool = pool or get_pool()
+    max_in_flight = max_in_flight or pool.processes * 2
+
+    # Measure: run the first sample locally, those results are the first ones we yield anyway
+    chunk_iter = iter_chunks(data, sample_size)
+    sample = next(chunk_iter, None)
+    if sample is None:
+        return
+    start_time = time.perf_counter()
+    first = apply_chunk(func, sample, typecode)
+    per_item = (time.perf_counter() - start_time) / len(sample)
+
+    chunksize = int(target_seconds / per_item) if per_item else sample_size
+    if hasattr(data, "__len__"):
+        chunksize = min(chunksize, -(-len(data) // (pool.processes * 4)))  # keep every worker busy
+    chunksize = max(1, chunksize)
+    if hasattr(data, "__getitem__") and hasattr(data, "__len__"):
+        rest = data[len(sample):]
+    else:
+        rest = itertools.chain.from_iterable(chunk_iter)  # an iterator: carry on where the sample stopped
+
+    pending = deque()
+    try:
+        yield from ([first] if chunks else first)
+        for chunk in iter_chunks(rest, chunksize):
+            pending.append(pool.submit(apply_chunk, func, chunk, typecode))
+            if len(pending) >= max_in_flight:  # backpressure: never hold more than max_in_flight chunks
+                result = pending.popleft().result()
+                yield from ([result] if chunks else result)
+        while pending:
+            result = pending.popleft().result()
+            yield from ([result] if chunks else result)
+    finally:
+        for future in pending:  # the consumer stopped early
+            future.cancel()
+
+
+# if __name__ == "__main__":
+#     numbers = array.array("q", range(10_000_000))
+#     for block in adaptive_imap(square, numbers, chunks=True):
+#         pass  # ✅ array.array blocks of squares, in order, never one giant list
+
+"""
+🔹 Shared-Memory Results (No Pickling on the Way Back)
+Every value a worker returns is pickled, pushed through a pipe and unpickled in the parent.
+For big outputs (arrays of partial sums, histograms) that copy dominates.
+With multiprocessing.shared_memory the parent allocates one block, workers write straight into it
+and the parent reads it in place:
+✅ SharedArray is a typed array (array.array typecodes) on top of a SharedMemory block
+✅ Only its handle (name, typecode, length) is pickled, never the data
+✅ Only the creator registers the block with the resource tracker (and unregisters it on unlink):
+   attaching uses track=False on Python 3.13+. Before 3.13 attaching always registers, which is harmless
+   as long as the worker shares the creator's tracker: spawn and forkserver children always do,
+   WarmPool starts the tracker before it forks its workers.
+✅ .numpy() gives a zero-copy NumPy view when NumPy is installed
+"""
+class SharedArray:
+    def __init__(self, typecode, length, name=None):
+        from multiprocessing import shared_memory  # loaded on first use, like NumPy
+
+        itemsize = array.array(typecode).itemsize
+        self.typecode = typecode
+        self.length = length
+        self._owner = name is None  # only the creator unlinks the block
+        options = {"track": self._owner} if sys.version_info >= (3, 13) else {}
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=max(1, length * itemsize),
+                                               **options)
+        self.view = self._shm.buf[:length * itemsize].cast(typecode)
+
+    @property
+    def handle(self):
+        return self._shm.name, self.typecode, self.length
+
+    @classmethod
+    def attach(cls, handle):
+        name, typecode, length = handle
+        return cls(typecode, length, name=name)
+
+    def numpy(self):
+        np = load_numpy()
+        if np is None:
+            raise ImportError("SharedArray.numpy() requires NumPy to be installed")
+        return np.frombuffer(self._shm.buf, dtype=np.dtype(self.typecode), count=self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    def __setitem__(self, index, value):
+        self.view[index] = value
+
+    def close(self):
+        self.view.release()  # NumPy views from .numpy() must be dropped before this
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def int64_blocks(n):
+    # Split range(n) so that each block's sum of squares fits in an int64 slot
+    block = max(1, INT64_MAX // max(1, (n - 1) ** 2))
+    return [(lo, min(lo + block, n)) for lo in range(0, n, block)]
+
+
+def write_partial_sums(handle, first_slot, n):
+    with SharedArray.attach(handle) as out:
+        for slot, (lo, hi) in enumerate(int64_blocks(n), start=first_slot):
+            out[slot] = squares_loop(lo, hi)  # the same work cpu_task(n) does, block by block
+
+
+def run_processes_shared(num_processes=4, iterations=10_000_000):
+    blocks = len(int64_blocks(iterations))
+    start_time = time.time()
+
+    with SharedArray("q", num_processes * blocks) as partials:
+        processes = []
+        for i in range(num_processes):
+            p = multiprocessing.Process(target=write_partial_sums, args=(partials.handle, i * blocks, iterations))
+            p.start()
+            processes.append(p)
+        for p in processes:
+            p.join()
+
+        # Sum as Python ints, so the totals stay exact even past int64
+        totals = [sum(partials[i * blocks:(i + 1) * blocks].tolist()) for i in range(num_processes)]
+
+    print(f"Execution Time: {time.time() - start_time:.2f} seconds")
+    return totals
+
+
+def make_result(count):
+    return array.array("d", [1.0]) * count
+
+
+def write_result(handle, count):
+    with SharedArray.attach(handle) as out:
+        out[:] = make_result(count)
+
+
+def compare_result_transfer(sizes_mb=(1, 100, 1024), pool=None):
+    pool = pool or get_pool()
+    itemsize = array.array("d").itemsize
+    print(f"{'size':>8}{'pickled':>12}{'shared':>12}")
+    timings = {}
+    for mb in sizes_mb:
+        count = mb * 1024 * 1024 // itemsize
+
+        start_time = time.perf_counter()
+        pickled = pool.submit(make_result, count).result()  # worker → pickle → pipe → unpickle
+        pickled_seconds = time.perf_counter() - start_time
+        del pickled
+
+        start_time = time.perf_counter()
+        with SharedArray("d", count) as shared:
+            pool.submit(write_result, shared.handle, count).result()  # only the handle crosses the pipe
+            shared_seconds = time.perf_counter() - start_time
+
+        timings[mb] = {"pickled": pickled_seconds, "shared": shared_seconds}
+        print(f"{mb:>6}MB{pickled_seconds:>11.3f}s{shared_seconds:>11.3f}s")
+    return timings
+
+
+# if __name__ == "__main__":
+#     print(run_processes_shared())  # ✅ exact cpu_task totals, returned without pickling
+#     compare_result_transfer()
+
+"""
+🔹 Multi-Stage Pipelines: read (I/O) → parse (CPU) → write (I/O)
+Real jobs chain the tools above: threads for I/O, processes for CPU work, asyncio for many
+concurrent waits. Pipeline connects them with bounded BatchQueues so items stream end to end:
+✅ stage(func, kind="thread" | "process" | "async", workers=n)
+✅ Adjacent stages of the same kind are fused into one (one hand-off less per item)
+✅ report() gives per-stage latency, utilization and the bottleneck stage
+Output order is not preserved once a stage has more than one worker.
+"""
+from collections import namedtuple
+
+Stage = namedtuple("Stage", ["name", "func", "kind", "workers"])
+
+
+class Chain:  # picklable composition, so fused process stages can still be sent to workers
+    def __init__(self, funcs):
+        self.funcs = tuple(funcs)
+
+    def __call__(self, item):
+        for func in self.funcs:
+            item = func(item)
+        return item
+
+
+class AsyncChain:
+    def __init__(self, funcs):
+        self.funcs = tuple(funcs)
+
+    async def __call__(self, item):
+        for func in self.funcs:
+            item = await func(item)
+        return item
+
+
+class Pipeline:
+    KINDS = ("thread", "process", "async")
+
+    def __init__(self, batch_size=64, maxsize=1024, fuse=True, pool=None):
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.fuse = fuse
+        self.pool = pool
+        self.stages = []
+        self._stats = []
+        self._wall = 0.0
+        self._errors = []
+        self._stopping = threading.Event()
+
+    def stage(self, func, kind="thread", workers=1, name=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown stage kind {kind!r}, expected one of {self.KINDS}")
+        self.stages.append(Stage(name or func.__name__, func, kind, workers))
+        return self  # allows Pipeline().stage(...).stage(...)
+
+    def plan(self):
+        planned = []
+        for stage in self.stages:
+            previous = planned[-1] if planned else None
+            if self.fuse and previous and previous.kind == stage.kind:
+                chain = AsyncChain if stage.kind == "async" else Chain
+                planned[-1] = Stage(f"{previous.name}+{stage.name}", chain([previous.func, stage.func]),
+                                    stage.kind, max(previous.workers, stage.workers))
+            else:
+                planned.append(stage)
+        return planned
+
+    def run(self, source):
+        import asyncio  # only needed here, and asyncio is slow to import
+
+        stages = self.plan()
+        queues = [BatchQueue(self.maxsize) for _ in range(len(stages) + 1)]
+        self._stats = [{"name": s.name, "kind": s.kind, "workers": s.workers, "items": 0, "busy": 0.0}
+                       for s in stages]
+        self._errors = []
+        self._stopping = threading.Event()
+
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0]), daemon=True)]
+        for stage, stats, inq, outq in zip(stages, self._stats, queues, queues[1:]):
+            if stage.kind == "async":
+                threads.append(threading.Thread(target=self._async_thread, daemon=True,
+                                                args=(stage, stats, inq, outq)))
+            else:
+                threads += self._worker_threads(stage, stats, inq, outq)
+
+        start_time = time.perf_counter()
+        for t in threads:
+            t.start()
+        done = False
+        try:
+            while not done:
+                batch = queues[-1].get_many(self.batch_size)
+                if batch[-1] is STOP:
+                    batch.pop()
+                    done = True
+                yield from batch
+            if self._errors:
+                raise self._errors[0]  # the first stage failure, after every stage has stopped
+        finally:
+            if not done:
+                self._stopping.set()  # the consumer stopped early: stop reading the source
+            while not done:  # and drain so every stage can finish
+                done = queues[-1].get_many(max(self.maxsize, self.batch_size))[-1] is STOP
+            for t in threads:
+                t.join()
+            self._wall = time.perf_counter() - start_time
+
+    def _fail(self, exc):
+        self._errors.append(exc)
+        self._stopping.set()  # stop feeding, the stages only drain from now on
+
+    def _feed(self, source, outq):
+        try:
+            it = iter(source)
+            while not self._stopping.is_set() and (batch := list(itertools.islice(it, self.batch_size))):
+                outq.put_many(batch)
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            outq.put(STOP)
+
+    def _worker_threads(self, stage, stats, inq, outq):
+        lock = threading.Lock()
+        remaining = [stage.workers]
+        if stage.kind == "process":
+            pool = self.pool or get_pool()
+            apply = lambda batch: pool.submit(apply_chunk, stage.func, batch).result()  # noqa: E731
+        else:
+            apply = lambda batch: [stage.func(item) for item in batch]  # noqa: E731
+
+        def worker():
+            items, busy = 0, 0.0
+            try:
+                while True:
+                    batch = inq.get_many(self.batch_size)
+                    stop = batch[-1] is STOP
+                    if stop:
+                        batch.pop()
+                    if batch and not self._stopping.is_set():  # after a failure or an early close: drain only
+                        start_time = time.perf_counter()
+                        try:
+                            results = apply(batch)
+                        except BaseException as exc:
+                            self._fail(exc)
+                        else:
+                            busy += time.perf_counter() - start_time
+                            items += len(batch)
+                            outq.put_many(results)
+                    if stop:
+                        inq.put(STOP)  # let the sibling workers see it too
+                        return
+            except BaseException as exc:
+                self._fail(exc)
+            finally:
+                with lock:
+                    stats["items"] += items
+                    stats["busy"] += busy
+                    remaining[0] -= 1
+                    if remaining[0] == 0:
+                        outq.put(STOP)  # the last worker out closes the next stage
+
+        return [threading.Thread(target=worker, daemon=True) for _ in range(stage.workers)]
+
+    def _async_thread(self, stage, stats, inq, outq):
+        import asyncio
+
+        closed = []
+        try:
+            asyncio.run(self._async_stage(stage, stats, inq, outq, closed))
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            if not closed:
+                outq.put(STOP)
+
+    async def _async_stage(self, stage, stats, inq, outq, closed):
+        import asyncio
+
+        todo = asyncio.Queue(maxsize=stage.workers * 2)
+        done = asyncio.Queue(maxsize=stage.workers * 2)
+
+        async def reader():  # one thread does the blocking get_many() for the whole stage
+            while True:
+                for item in await asyncio.to_thread(inq.get_many, self.batch_size):
+                    if item is STOP:
+                        for _ in range(stage.workers):
+                            await todo.put(STOP)
+                        return
+                    await todo.put(item)
+
+        async def worker():
+            while (item := await todo.get()) is not STOP:
+                if self._stopping.is_set():
+                    continue  # drain only
+                start_time = time.perf_counter()
+                try:
+                    result = await stage.func(item)
+                except Exception as exc:
+                    self._fail(exc)
+                    continue
+                stats["busy"] += time.perf_counter() - start_time  # wall time of each await
+                stats["items"] += 1
+                await done.put(result)
+
+        async def writer():
+            while True:
+                batch = [await done.get()]
+                while not done.empty() and len(batch) < self.batch_size:
+                    batch.append(done.get_nowait())
+                await asyncio.to_thread(outq.put_many, batch)
+                if batch[-1] is STOP:
+                    closed.append(True)
+                    return
+
+        writing = asyncio.create_task(writer())
+        await asyncio.gather(reader(), *(worker() for _ in range(stage.workers)))
+        await done.put(STOP)
+        await writing
+
+    def report(self):
+        stages = []
+        for s in self._stats:
+            stages.append({**s,
+                           "latency": s["busy"] / s["items"] if s["items"] else 0.0,
+                           "utilization": s["busy"] / (self._wall * s["workers"]) if self._wall else 0.0})
+        bottleneck = max(stages, key=lambda s: s["utilization"])["name"] if stages else None
+        return {"seconds": self._wall, "stages": stages, "bottleneck": bottleneck}
+
+
+def read_record(n):
+    time.sleep(0.001)  # simulated I/O
+    return n
+
+
+def parse_record(n):
+    return cpu_task(n)
+
+
+async def write_record(total):
+    import asyncio
+
+    await asyncio.sleep(0.001)  # simulated async I/O
+    return total
+
+
+# if __name__ == "__main__":
+#     pipeline = (Pipeline()
+#                 .stage(read_record, kind="thread", workers=8)
+#                 .stage(parse_record, kind="process", workers=4)
+#                 .stage(write_record, kind="async", workers=32))
+#     print(len(list(pipeline.run(range(2_000)))))  # ✅ 2000
+#     print(pipeline.report()["bottleneck"])
+
+"""
+🔹 Work-Stealing Scheduler (For Uneven Task Sizes)
+run_threads() and run_processes() hand every worker the same amount of work. When tasks are skewed
+one straggler keeps running while the other cores sit idle.
+With work stealing every worker owns a deque:
+✅ The owner pushes and pops at the head (newest, smallest pieces first)
+✅ An idle worker steals from the tail of someone else's deque (oldest, biggest pieces)
+✅ Range tasks split themselves in half until they are smaller than grain, so big ranges get shared
+Threads only run Python code in parallel on a free-threaded build, but tasks that release the GIL
+(sleep, I/O, NumPy) benefit on any build.
+"""
+import random
+
+
+class RangeJob:
+    def __init__(self, kernel, start, stop, grain, workers):
+        self.kernel = kernel
+        self.grain = grain
+        self.result = 0
+        self.error = None  # the first exception raised by the kernel
+        self.remaining = max(0, stop - start)
+        self.started = time.perf_counter()
+        self.finished_at = [None] * workers  # when each worker last completed a piece of this job
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.remaining:
+            self._done.set()
+
+    def finish(self, index, size, value=0, error=None):
+        with self._lock:
+            self.result += value
+            if error is not None and self.error is None:
+                self.error = error
+            self.remaining -= size  # a failed piece still counts as done, so the job always ends
+            self.finished_at[index] = time.perf_counter()
+            if not self.remaining:
+                self._done.set()
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"range job still has {self.remaining} items left after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class WorkStealingScheduler:
+    def __init__(self, workers=None, grain=10_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.grain = grain
+        self.stats = [{"tasks": 0, "steals": 0, "busy": 0.0} for _ in range(self.workers)]
+        self._deques = [deque() for _ in range(self.workers)]
+        self._idle = threading.Condition()
+        self._pushes = 0  # bumped on every push, so idle workers sleep until there is new work
+        self._local = threading.local()
+        self._round_robin = itertools.count()
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._work, args=(i,), daemon=True, name=f"stealer-{i}")
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def _push(self, index, task):
+        self._deques[index].append(task)
+        with self._idle:
+            self._pushes += 1
+            self._idle.notify()
+
+    def _home(self):
+        index = getattr(self._local, "index", None)  # tasks submitted from a worker stay on its deque
+        return next(self._round_robin) % self.workers if index is None else index
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        self._push(self._home(), (self._run_call, future, fn, args, kwargs))
+        return future
+
+    def run_range(self, kernel, start, stop, grain=None):
+        job = RangeJob(kernel, start, stop, grain or self.grain, self.workers)
+        if job.remaining:
+            self._push(self._home(), (self._run_range, job, start, stop))
+        return job
+
+    def map_range(self, kernel, start, stop, grain=None):
+        return self.run_range(kernel, start, stop, grain).wait()
+
+    def _run_call(self, index, future, fn, args, kwargs):
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+
+    def _run_range(self, index, job, lo, hi):
+        while hi - lo > job.grain:  # keep the front half, publish the back half for thieves
+            mid = (lo + hi) // 2
+            self._push(index, (self._run_range, job, mid, hi))
+            hi = mid
+        try:
+            value = job.kernel(lo, hi)
+        except Exception as exc:
+            job.finish(index, hi - lo, error=exc)
+        else:
+            job.finish(index, hi - lo, value)
+
+    def _steal(self, index):
+        offset = random.randrange(self.workers)
+        for i in range(self.workers):
+            victim = (offset + i) % self.workers
+            if victim != index:
+                try:
+                    return self._deques[victim].popleft()  # the tail: oldest and biggest task
+                except IndexError:
+                    pass
+        return None
+
+    def _work(self, index):
+        self._local.index = index
+        own = self._deques[index]
+        stats = self.stats[index]
+        while not self._shutdown:
+            seen = self._pushes  # read before looking, so a push that races with the search is not missed
+            try:
+                task = own.pop()
+            except IndexError:
+                task = self._steal(index)
+                if task is None:
+                    with self._idle:
+                        while self._pushes == seen and not self._shutdown:
+                            self._idle.wait()
+                    continue
+                stats["steals"] += 1
+            start_time = time.perf_counter()
+            task[0](index, *task[1:])
+            stats["busy"] += time.perf_counter() - start_time
+            stats["tasks"] += 1
+
+    def shutdown(self):
+        self._shutdown = True
+        with self._idle:
+            self._idle.notify_all()
+        for t in self._threads:
+            t.join()
+
+
+def cpu_task_stealing(n, scheduler, grain=None):
+    return scheduler.map_range(squares_loop, 0, n, grain)  # same total as cpu_task(n)
+
+
+SKEW_SECONDS = 2e-7
+
+
+def skewed_sleep(lo, hi):
+    time.sleep(SKEW_SECONDS * sum(range(lo, hi)))  # item i costs i units and releases the GIL
+    return hi - lo
+
+
+def skewed_cpu(lo, hi):
+    return sum(squares_loop(0, 10 * i) for i in range(lo, hi))  # item i costs i units of pure Python
+
+
+def static_split(kernel, n, workers, grain):
+    step = -(-n // workers)
+    finished = [None] * workers
+    start_time = time.perf_counter()
+
+    def run(index):
+        lo, hi = index * step, min(n, (index + 1) * step)
+        for a in range(lo, hi, grain):
+            kernel(a, min(a + grain, hi))
+        finished[index] = time.perf_counter()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return start_time, finished
+
+
+def summarize_run(start_time, finished, busy, workers):
+    ends = [t - start_time for t in finished if t is not None]
+    makespan = max(ends)
+    return {"makespan": makespan,
+            "idle_gap": makespan - min(ends) if len(ends) == workers else makespan,  # time the first idle core waited
+            "utilization": sum(busy) / (makespan * workers)}
+
+
+def compare_stealing(n=2_000, workers=4, grain=16, kernel=skewed_sleep):
+    start_time, finished = static_split(kernel, n, workers, grain)
+    static = summarize_run(start_time, finished, [t - start_time for t in finished], workers)
+
+    scheduler = WorkStealingScheduler(workers, grain)
+    busy_before = [s["busy"] for s in scheduler.stats]
+    job = scheduler.run_range(kernel, 0, n)
+    job.wait()
+    busy = [s["busy"] - b for s, b in zip(scheduler.stats, busy_before)]
+    stealing = summarize_run(job.started, job.finished_at, busy, workers)
+    stealing["steals"] = sum(s["steals"] for s in scheduler.stats)
+    scheduler.shutdown()
+
+    print(f"{'':<10}{'makespan':>10}{'idle gap':>10}{'util':>7}")
+    for name, row in (("static", static), ("stealing", stealing)):
+        print(f"{name:<10}{row['makespan']:>9.3f}s{row['idle_gap']:>9.3f}s{row['utilization']:>7.0%}")
+    return {"static": static, "stealing": stealing}
+
+
+# if __name__ == "__main__":
+#     scheduler = WorkStealingScheduler(workers=4)
+#     print(cpu_task_stealing(10_000_000, scheduler) == cpu_task(10_000_000))  # ✅ True
+#     print(scheduler.submit(task, 3).result())  # ✅ 6
+#     scheduler.shutdown()
+#     compare_stealing()  # ✅ the static split waits on its last (heaviest) quarter
+
+"""
+🔹 Command Line
+Importing this file does no work: no demos run, no pools start and NumPy/asyncio load on first use.
+Everything runs from the command line instead (the dashes in the file name rule out `python -m`):
+    python multi-threading-processing.py demo executor|queue|pool
+    python multi-threading-processing.py bench threads|processes|pool|queue|sweep
+tests/test_multi_threading_processing.py holds the import to a budget: a few ms for the file's own code,
+on top of the stdlib it needs at import time (concurrent.futures and multiprocessing, ~30 ms cold).
+"""
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Threading vs multiprocessing demos and benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    demo = commands.add_parser("demo", help="run one of the tutorial examples")
+    demo.add_argument("name", choices=("executor", "queue", "pool"))
+    bench = commands.add_parser("bench", help="run a benchmark")
+    bench.add_argument("name", choices=("threads", "processes", "pool", "queue", "sweep"))
+    bench.add_argument("--workers", type=int, default=4)
+    bench.add_argument("--iterations", type=int, default=10_000_000)
+    bench.add_argument("--json", help="where `sweep` writes its results")
+    args = parser.parse_args(argv)
+
+    if args.command == "demo":
+        {"executor": lambda: print(thread_pool_demo()), "queue": queue_demo, "pool": pool_demo}[args.name]()
+    elif args.name == "threads":
+        run_threads(args.workers, args.iterations)
+    elif args.name == "processes":
+        run_processes(args.workers, args.iterations)
+    elif args.name == "pool":
+        compare_cold_vs_warm(tasks=args.workers)
+    elif args.name == "queue":
+        stats = run_pipeline([range(args.iterations // args.workers)] * args.workers, handle_batch=len,
+                             consumers=args.workers)
+        print(f"{stats['items_per_second']:,.0f} items/s, max queue depth {stats['max_depth']}")
+    elif args.name == "sweep":
+        print_report(run_benchmarks(worker_counts=sorted({1, 2, args.workers}), sizes=(args.iterations,),
+                                    json_path=args.json))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+import asyncio
+import contextlib
+import functools
+import importlib.util
+import itertools
+import json
+import time
+
+import pytest
+
+from conftest import load_script
+
+ae = load_script("asynchronous-execution.py")
+
+
+# Rate limiting (user-010)
+
+def test_token_bucket_below_one_per_second():
+    async def two_tokens():
+        bucket = ae.TokenBucket(4)
+        slow = ae.TokenBucket(0.5)
+        await bucket.acquire()
+        await asyncio.wait_for(slow.acquire(), 1)  # starts with one whole token
+        return slow.capacity
+
+    assert asyncio.run(two_tokens()) == 1.0
+
+
+@pytest.mark.parametrize("rate, burst", [(0, None), (-1, None), (5, 0.5)])
+def test_token_bucket_rejects_bad_settings(rate, burst):
+    with pytest.raises(ValueError):
+        ae.TokenBucket(rate, burst)
+
+
+def test_token_bucket_limits_rate():
+    async def take(n):
+        bucket = ae.TokenBucket(50, burst=1)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(take(6)) >= 0.09
+
+
+def test_run_bounded_with_slow_rate_finishes():
+    async def job():
+        return 1
+
+    async def collect():
+        return [item async for item in ae.run_bounded([job], limit=2, rate=0.5)]
+
+    assert asyncio.run(asyncio.wait_for(collect(), 2)) == [(0, 1)]
+
+
+def collect_bounded(jobs, **options):
+    async def collect():
+        return [item async for item in ae.run_bounded(jobs, **options)]
+
+    return asyncio.run(asyncio.wait_for(collect(), 10))
+
+
+def test_run_bounded_caps_jobs_in_flight():
+    in_flight = peak = 0
+
+    async def job(i):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001 * (i % 3))
+        in_flight -= 1
+        return i
+
+    results = collect_bounded((job(i) for i in range(50)), limit=5)
+    assert peak == 5 and sorted(results) == [(i, i) for i in range(50)]
+
+
+def test_run_bounded_times_out_each_attempt():
+    results = dict(collect_bounded([asyncio.sleep(1, "slow"), asyncio.sleep(0, "fast")], timeout=0.05))
+    assert isinstance(results[0], asyncio.TimeoutError) and results[1] == "fast"
+
+
+def test_run_bounded_retries_callables_with_jitter(monkeypatch):
+    attempts = []
+    jitter = []
+    uniform = ae.random.uniform
+    monkeypatch.setattr(ae.random, "uniform", lambda a, b: jitter.append((a, b)) or uniform(a, b))
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise ConnectionError("try again")
+        return "ok"
+
+    assert collect_bounded([flaky], retries=2, backoff=0.01) == [(0, "ok")]
+    assert len(attempts) == 3 and jitter == [(0.5, 1.5)] * 2
+    assert attempts[2] - attempts[1] >= 0.01  # the second backoff is twice the first, at least 0.02 * 0.5
+
+
+def test_run_bounded_gives_up_after_the_last_retry():
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    [(index, error)] = collect_bounded([broken], retries=2, backoff=0.001)
+    assert index == 0 and isinstance(error, ConnectionError) and len(calls) == 3
+
+
+def test_run_bounded_raises_and_cancels_the_rest_without_return_exceptions():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def broken():
+        raise ValueError("bad job")
+
+    async def collect():
+        with pytest.raises(ValueError, match="bad job"):
+            async for _ in ae.run_bounded([slow(), broken(), slow()], return_exceptions=False):
+                pass
+        await asyncio.sleep(0)  # let the cancellations land
+
+    asyncio.run(asyncio.wait_for(collect(), 5))
+    assert len(cancelled) == 2
+
+
+def test_run_bounded_pulls_jobs_lazily():
+    pulled = []
+
+    def jobs():  # endless: run_bounded must never try to read it all
+        for i in itertools.count():
+            pulled.append(i)
+            yield functools.partial(asyncio.sleep, 0, i)
+
+    async def first(n):
+        taken = []
+        async with contextlib.aclosing(ae.run_bounded(jobs(), limit=10)) as results:
+            async for item in results:
+                taken.append(item)
+                if len(taken) == n:
+                    break
+        return taken
+
+    assert len(asyncio.run(asyncio.wait_for(first(25), 5))) == 25
+    assert len(pulled) <= 25 + 2 * 10  # consumed, plus the window refilled before each batch is handed out
+
+
+# Offloading CPU work (user-011)
+
+def offloaded(scenario):
+    async def main():
+        offloader = ae.Offloader(processes=1, batch_window=0.01)
+        try:
+            return await asyncio.wait_for(scenario(offloader), 10)
+        finally:
+            offloader.close()
+
+    return asyncio.run(main())
+
+
+def test_offloader_runs_cpu_io_and_small_calls():
+    async def scenario(offloader):
+        return await asyncio.gather(
+            offloader.run_cpu(ae.cpu_task, 1_000),
+            offloader.run_io(sum, [1, 2, 3]),
+            *(offloader.run_small(abs, -i) for i in range(100)),
+        )
+
+    assert offloaded(scenario) == [ae.cpu_task(1_000), 6, *range(100)]
+
+
+def test_run_small_delivers_errors_per_call():
+    async def scenario(offloader):
+        return await asyncio.gather(offloader.run_small(int, "1"), offloader.run_small(int, "x"),
+                                    return_exceptions=True)
+
+    ok, error = offloaded(scenario)
+    assert ok == 1 and isinstance(error, ValueError)
+
+
+def test_cancelling_run_cpu_stops_the_worker():
+    async def scenario(offloader):
+        task = asyncio.ensure_future(offloader.run_cpu(ae.cancellable_cpu_task, 10**10))
+        await asyncio.sleep(0.5)  # running in the only worker by now
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await offloader.run_cpu(ae.cpu_task, 10)  # the worker is free again
+
+    assert offloaded(scenario) == ae.cpu_task(10)
+
+
+# Event-loop health (user-012)
+
+async def blocker():
+    await asyncio.sleep(0)
+    time.sleep(0.05)  # blocks the loop
+    await asyncio.sleep(0)
+
+
+async def well_behaved():
+    for _ in range(3):
+        await asyncio.sleep(0.01)
+
+
+def test_loop_monitor_reports_slow_steps_and_exports_a_trace(tmp_path):
+    slow = []
+    monitor = ae.LoopMonitor(slow_step=0.02, on_slow_step=lambda name, seconds: slow.append((name, seconds)))
+
+    async def workload():
+        await asyncio.gather(blocker(), well_behaved())
+
+    asyncio.run(ae.monitored(workload(), monitor))
+    assert [name for name, _ in slow] == ["blocker"] and slow[0][1] >= 0.05
+    tasks = {task["name"]: task for task in monitor.summary()["tasks"]}
+    assert tasks["blocker"]["finished"] and tasks["blocker"]["longest_step"] >= 0.05
+    assert tasks["well_behaved"]["steps"] == 4 and tasks["well_behaved"]["blocking"] < 0.02
+
+    path = tmp_path / "trace.json"
+    monitor.export_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+    assert sum(event["ph"] == "X" for event in events) == sum(len(timed.steps) for timed in monitor.traced)
+
+
+def test_loop_monitor_memory_is_bounded():
+    monitor = ae.LoopMonitor(max_tasks=10, max_steps=5)
+
+    async def chatty():
+        for _ in range(50):
+            await asyncio.sleep(0)
+
+    async def workload():
+        await asyncio.gather(*(well_behaved() for _ in range(100)), chatty())
+
+    asyncio.run(ae.monitored(workload(), monitor))
+    assert len(monitor.traced) == 10  # the 10 most recent tasks only
+    tasks = {task["name"]: task for task in monitor.summary()["tasks"]}
+    assert len(monitor.traced[-1].steps) == 5 and tasks["test_loop_monitor_memory_is_bounded.<locals>.chatty"]["steps"] == 51  # totals still count every step
+
+
+def test_loop_monitor_keeps_and_restores_an_existing_task_factory():
+    created = []
+
+    def factory(loop, coro, **kwargs):
+        created.append(coro)
+        return asyncio.Task(coro, loop=loop, **kwargs)
+
+    async def two_tasks():
+        await asyncio.gather(well_behaved(), well_behaved())
+
+    async def workload():
+        loop = asyncio.get_running_loop()
+        loop.set_task_factory(factory)
+        monitor = ae.LoopMonitor()
+        await ae.monitored(two_tasks(), monitor)
+        return monitor, loop.get_task_factory()
+
+    monitor, restored = asyncio.run(workload())
+    assert restored is factory
+    timed = [coro for coro in created if isinstance(coro, ae.TimedCoroutine)]  # the sampler is not timed
+    assert timed == list(monitor.traced) and len(timed) == 2
+
+
+def test_monitor_off_installs_nothing():
+    async def factory_during_run():
+        await ae.monitored(asyncio.sleep(0))
+        return asyncio.get_running_loop().get_task_factory()
+
+    assert asyncio.run(factory_during_run()) is None
+
+
+# Loop setups (user-013)
+
+def test_loop_factories_list_what_is_installed():
+    factories = ae.loop_factories()
+    assert factories["default"] is asyncio.new_event_loop
+    assert ("uvloop" in factories) == (importlib.util.find_spec("uvloop") is not None)
+
+
+def test_run_uses_the_given_loop_factory():
+    loops = []
+
+    def factory():
+        loops.append(asyncio.new_event_loop())
+        return loops[-1]
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert ae.run(current_loop(), loop_factory=factory) is loops[0]
+    assert loops[0].is_closed()
+
+
+def test_benchmark_loops_covers_every_setup_and_variant():
+    rows = ae.benchmark_loops(n=200, repeats=1)
+    setups = {row["setup"] for row in rows}
+    assert set(ae.loop_factories()) <= setups
+    assert {row["variant"] for row in rows} >= {"create_task", "gather", "creation", "switch"}
+    assert len(rows) == len(setups) * len({row["variant"] for row in rows})
+    assert all(row["us_per_task"] > 0 for row in rows)
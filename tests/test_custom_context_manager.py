@@ -0,0 +1,252 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+
+ccm = load_script("custom-context-manager.py")
+
+
+class Resource:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def eventually(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+# Resource pools (user-014)
+
+def test_pool_reuses_and_bounds_resources():
+    with ccm.ResourcePool(Resource, max_size=1) as pool:
+        with pool.checkout() as first:
+            with pytest.raises(TimeoutError):
+                pool.acquire(timeout=0.05)
+        with pool.checkout() as second:
+            assert second is first
+        assert pool.stats.created == 1 and pool.stats.reused == 1
+    assert first.closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_pool_replaces_resources_that_fail_the_health_check():
+    with ccm.ResourcePool(Resource, health_check=lambda r: not r.closed) as pool:
+        with pool.checkout() as resource:
+            resource.closed = True
+        with pool.checkout() as replacement:
+            assert replacement is not resource
+        assert pool.stats.failed_checks == 1
+
+
+def broken_check(resource):
+    raise ConnectionError("ping failed")
+
+
+def test_pool_treats_a_raising_health_check_as_failed():
+    with ccm.ResourcePool(Resource, max_size=1, health_check=broken_check) as pool:
+        with pool.checkout() as resource:
+            pass
+        with pool.checkout(timeout=0.5) as replacement:
+            assert replacement is not resource
+        assert resource.closed and pool.stats.failed_checks == 1
+
+
+def test_async_pool_treats_a_raising_health_check_as_failed():
+    async def create():
+        return Resource()
+
+    async def check(resource):
+        broken_check(resource)
+
+    async def scenario():
+        async with ccm.AsyncResourcePool(create, max_size=1, health_check=check) as pool:
+            async with pool.acheckout() as resource:
+                pass
+            async with pool.acheckout(timeout=0.5) as replacement:
+                assert replacement is not resource
+            assert pool.stats.failed_checks == 1
+        return resource
+
+    assert asyncio.run(scenario()).closed
+
+
+def test_pool_reaper_evicts_idle_resources_without_checkouts():
+    with ccm.ResourcePool(Resource, max_idle=0.05) as pool:
+        with pool.checkout() as resource:
+            pass
+        assert eventually(lambda: resource.closed)
+        assert pool.stats.evicted == 1
+    assert not any(t.name == "pool-reaper" for t in threading.enumerate())
+
+
+def test_async_pool_is_async_only():
+    pool = ccm.AsyncResourcePool(Resource)
+    for sync_api in ("checkout", "close", "__enter__", "__exit__"):
+        assert not hasattr(pool, sync_api)
+
+
+def test_async_pool_checkout_close_and_reaper():
+    closed = []
+
+    async def create():
+        return Resource()
+
+    async def close(resource):
+        resource.close()
+        closed.append(resource)
+
+    async def scenario():
+        async with ccm.AsyncResourcePool(create, max_size=1, max_idle=0.05, close=close) as pool:
+            async with pool.acheckout() as first:
+                with pytest.raises(TimeoutError):
+                    await pool.acquire(timeout=0.05)
+            await asyncio.sleep(0.2)  # the reaper task evicts it
+            assert first.closed and pool.stats.evicted == 1
+            async with pool.acheckout() as second:
+                assert second is not first
+        return second
+
+    second = asyncio.run(scenario())
+    assert second.closed and closed == [closed[0], second]
+
+
+# Batched writer (user-015)
+
+class FlakyFile:
+    # Fails the first `failures` writes, then behaves like the real file
+    def __init__(self, file, failures):
+        self.file = file
+        self.failures = failures
+
+    def write(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        return self.file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+def test_batch_writer_writes_everything(tmp_path):
+    path = tmp_path / "data.txt"
+    with ccm.BatchWriter(path, buffer_size=100, fsync="always") as writer:
+        for i in range(1_000):
+            writer.write(f"record {i}\n")
+    assert path.read_text().splitlines() == [f"record {i}" for i in range(1_000)]
+
+
+def test_failed_write_keeps_the_batch(tmp_path):
+    path = tmp_path / "data.txt"
+    with ccm.BatchWriter(path, flush_interval=0, fsync="never") as writer:
+        writer._file = FlakyFile(writer._file, failures=1)
+        writer.write("a\n")
+        with pytest.raises(OSError):
+            writer.flush()
+        writer.write("b\n")
+    assert path.read_text() == "a\nb\n"
+
+
+def test_background_failure_is_reraised_and_nothing_is_lost(tmp_path):
+    path = tmp_path / "data.txt"
+    writer = ccm.BatchWriter(path, flush_interval=0.01, fsync="never")
+    with pytest.raises(OSError, match="disk full"):
+        with writer:
+            writer._file = FlakyFile(writer._file, failures=1)
+            writer.write("a\n")
+            assert eventually(lambda: writer._error is not None)
+            writer.write("b\n")  # raises the background error
+    assert path.read_text() == "a\n"
+
+
+# Memory-mapped reader (user-016)
+
+def test_mapped_records_lines_and_fixed(tmp_path):
+    path = tmp_path / "records.txt"
+    path.write_bytes(b"alpha\nbeta\ngamma")
+    with ccm.MappedRecords(path) as records:
+        assert len(records) == 16
+        assert [bytes(line) for line in records.lines()] == [b"alpha", b"beta", b"gamma"]
+        assert [bytes(line) for line in records.lines(keepends=True)] == [b"alpha\n", b"beta\n", b"gamma"]
+        assert [bytes(record) for record in records.fixed(6)] == [b"alpha\n", b"beta\ng", b"amma"]
+
+
+def test_mapped_records_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    with ccm.MappedRecords(path) as records:
+        assert len(records) == 0 and list(records.lines()) == [] and list(records.fixed(4)) == []
+
+
+def test_mapped_records_release_cursors_on_exit(tmp_path):
+    path = tmp_path / "records.txt"
+    path.write_bytes(b"a\nb\nc\n")
+    with ccm.MappedRecords(path) as records:
+        lines = records.lines()
+        first = next(lines)  # left open, holding a view of the mapping
+        kept = bytes(first)
+    assert kept == b"a"
+    with pytest.raises(ValueError):
+        first.tobytes()  # released, not dangling
+
+
+def test_mapped_records_refuse_to_close_under_a_live_slice(tmp_path):
+    path = tmp_path / "records.txt"
+    path.write_bytes(b"abc\n")
+    records = ccm.MappedRecords(path)
+    with pytest.raises(BufferError, match="bytes"):
+        with records:
+            lines = records.lines()
+            piece = next(lines)[0:2]  # a slice outlives its record
+    piece.release()
+    records._map.close()
+
+
+# Timing histograms (user-017)
+
+@pytest.mark.parametrize("value", [0, 1, 63, 64, 1_000, 123_456_789, 2**40 + 12345])
+def test_histogram_buckets_stay_within_a_few_percent(value):
+    assert abs(ccm.bucket_value(ccm.bucket_index(value)) - value) <= value * 0.035
+
+
+def test_histogram_percentiles():
+    histogram = ccm.Histogram()
+    for value in range(1, 10_001):
+        histogram.add(value * 1_000)
+    assert histogram.percentile(50) == pytest.approx(5_000_000, rel=0.035)
+    assert histogram.percentile(99) == pytest.approx(9_900_000, rel=0.035)
+    assert histogram.percentile(100) <= histogram.max == 10_000_000
+
+
+def test_timed_merges_threads_and_processes():
+    @ccm.timed("test.decorated")
+    def work():
+        time.sleep(0.001)
+
+    def run():
+        for _ in range(50):
+            work()
+            with ccm.timed("test.block"):
+                pass
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = ccm.percentiles("test.decorated")["test.decorated"]
+    assert stats["count"] == 200 and stats["p50"] >= 1_000_000
+    assert ccm.percentiles("test.block")["test.block"]["count"] == 200
+
+    ccm.merge_snapshot({"test.decorated": ccm.snapshot()["test.decorated"]})  # as a worker would send it
+    assert ccm.percentiles("test.decorated")["test.decorated"]["count"] == 400
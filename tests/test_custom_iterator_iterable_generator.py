@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+
+cig = load_script("custom-iterator-iterable-generator.py")
+
+
+def wait_for_threads(count, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while threading.active_count() > count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return threading.active_count()
+
+
+# Chunks and prefetching (user-018)
+
+def test_iter_chunks_cover_the_range():
+    chunks = list(cig.MyRange(10).iter_chunks(4))
+    assert [list(chunk) for chunk in chunks] == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert all(chunk.typecode == "q" for chunk in chunks)
+
+
+def test_numpy_is_imported_lazily():
+    code = "import runpy, sys; runpy.run_path(sys.argv[1]); sys.exit('numpy' in sys.modules)"
+    subprocess.run([sys.executable, "-c", code, cig.__spec__.origin], check=True)
+
+
+def test_prefetch_yields_everything_in_order():
+    assert list(cig.prefetch(range(1_000), depth=3)) == list(range(1_000))
+
+
+def test_prefetch_passes_exception_items_through():
+    items = [ValueError("data"), 1]
+    assert list(cig.prefetch(items)) == items
+
+
+def test_prefetch_reraises_producer_errors():
+    def broken():
+        yield 1
+        raise OSError("producer")
+
+    with pytest.raises(OSError, match="producer"):
+        list(cig.prefetch(broken()))
+
+
+def test_prefetch_does_not_leak_threads_when_consumer_stops_early():
+    before = threading.active_count()
+    stream = cig.prefetch(range(3), depth=1)
+    assert next(stream) == 0
+    time.sleep(0.05)  # the producer has finished and is blocked on the full queue
+    stream.close()
+    assert wait_for_threads(before) == before
+
+
+# Lazy sequence (user-019)
+
+def test_my_range_is_a_lazy_sequence():
+    r = cig.MyRange(10)
+    assert len(r) == 10 and r[0] == 1 and r[-1] == 10
+    assert list(r[2:8:2]) == [3, 5, 7] and list(reversed(r[2:8:2])) == [7, 5, 3]
+    assert 10 in r and 11 not in r and r.index(4) == 3 and r.count(4) == 1
+    with pytest.raises(IndexError):
+        r[10]
+
+
+@pytest.mark.parametrize("index, expected", [
+    (slice(2, 5), 5), (slice(None, None, -1), 10), (slice(8, 2, -2), 9), (slice(5, 5), 0),
+])
+def test_views_recompute_max(index, expected):
+    view = cig.MyRange(10)[index]
+    assert view.max == expected == max(view, default=0)
+
+
+def test_func_backed_sequence():
+    squares = cig.MyRange(10**12, func=lambda i: i * i, inverse=lambda v: int(v ** 0.5))
+    assert squares[-1] == 10**24 and 144 in squares and 145 not in squares and squares.index(144) == 11
+    assert list(squares[:3]) == [1, 4, 9]
+
+
+@pytest.mark.parametrize("func, typecode", [(lambda i: i * i, "q"), (lambda i: i / 2, "d")])
+def test_func_chunks_are_arrays_too(func, typecode):
+    chunks = list(cig.MyRange(10, func=func).iter_chunks(4))
+    assert all(isinstance(chunk, cig.array.array) and chunk.typecode == typecode for chunk in chunks)
+    assert [value for chunk in chunks for value in chunk] == list(cig.MyRange(10, func=func))
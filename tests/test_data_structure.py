@@ -0,0 +1,320 @@
+import bisect
+import random
+import subprocess
+import sys
+
+import pytest
+
+from conftest import load_script
+
+ds = load_script("data-structure.py")
+
+SCHEMA = {"id": "q", "price": "d", "qty": "q", "symbol": "str"}
+
+
+def column_lengths(store):
+    return {name: len(column) for name, column in store.columns.items()}
+
+
+# Sorted containers (user-023)
+
+class SmallSortedList(ds.SortedList):
+    LOAD = 4  # tiny sublists: every few operations split or merge one
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_sorted_list_matches_a_sorted_python_list(seed):
+    rng = random.Random(seed)
+    values, reference = SmallSortedList(), []
+    for _ in range(1_500):
+        op = rng.random()
+        value = rng.randrange(200)
+        if op < 0.4:
+            values.add(value)
+            reference.append(value)
+            reference.sort()
+        elif op < 0.5:
+            batch = [rng.randrange(200) for _ in range(rng.randrange(60))]
+            values.update(batch)
+            reference = sorted(reference + batch)
+        elif op < 0.65:
+            values.discard(value)
+            if value in reference:
+                reference.remove(value)
+        elif op < 0.75 and reference:
+            index = rng.randrange(-len(reference), len(reference))
+            assert values.pop(index) == reference.pop(index)
+        elif op < 0.85 and reference:
+            index = rng.randrange(len(reference))
+            del values[index]
+            del reference[index]
+        else:
+            assert (value in values) == (value in reference)
+            assert values.count(value) == reference.count(value)
+            assert values.bisect_left(value) == bisect.bisect_left(reference, value)
+            assert values.bisect_right(value) == bisect.bisect_right(reference, value)
+            if reference:
+                index = rng.randrange(len(reference))
+                assert values[index] == reference[index] and values[-1] == reference[-1]
+            lo, hi = sorted((value, rng.randrange(200)))
+            assert list(values.irange(lo, hi)) == [v for v in reference if lo <= v <= hi]
+            assert list(values.irange(lo, hi, (False, False), reverse=True)) == [
+                v for v in reversed(reference) if lo < v < hi]
+        assert len(values) == len(reference)
+    assert list(values) == reference and list(reversed(values)) == reference[::-1]
+
+
+def test_sorted_list_errors():
+    values = ds.SortedList([3, 1, 2])
+    assert values.index(2) == 1
+    with pytest.raises(ValueError):
+        values.index(5)
+    with pytest.raises(ValueError):
+        values.remove(5)
+    with pytest.raises(IndexError):
+        values[3]
+
+
+def test_sorted_dict_keeps_keys_ordered():
+    d = ds.SortedDict({"b": 2, "c": 3}, a=1)
+    d["d"] = 4
+    d["b"] = 20  # overwriting keeps a single key
+    del d["c"]
+    assert list(d) == ["a", "b", "d"] and list(d.items()) == [("a", 1), ("b", 20), ("d", 4)]
+    assert d.peekitem(0) == ("a", 1) and d.index("d") == 2 and list(d.irange("b", "z")) == ["b", "d"]
+    assert d.popitem() == ("d", 4) and len(d) == 2
+
+
+# ColumnStore (user-024)
+
+@pytest.fixture(params=[False] + ([True] if ds.load_numpy() is not None else []), ids=lambda numpy: "numpy" if numpy else "python")
+def trades(request):
+    store = ds.ColumnStore(SCHEMA, sorted_by="id", use_numpy=request.param)
+    store.extend([(1, 10.5, 3, "ABC"), (2, 99.0, 7, "XYZ")])
+    store.append((3, 42.0, 9, "ABC"))
+    return store
+
+
+def test_column_store_queries(trades):
+    abc = trades.where("symbol", "==", "ABC")
+    assert trades.rows(abc) == [(1, 10.5, 3, "ABC"), (3, 42.0, 9, "ABC")]
+    assert list(trades.where("qty", ">=", 7, within=abc)) == [2]
+    assert list(trades.where("symbol", "==", "missing")) == []
+    assert trades.between(2, 3) == range(1, 3)
+    assert trades.top_k("price", 2) == [1, 2]
+    assert trades.sum("price", abc) == 52.5
+
+
+@pytest.mark.parametrize("numpy", [False] + ([True] if ds.load_numpy() is not None else []))
+def test_top_k_on_unsigned_columns(numpy):
+    store = ds.ColumnStore({"id": "q", "size": "Q"}, use_numpy=numpy)
+    store.extend([(0, 5), (1, 0), (2, 2**64 - 1), (3, 5), (4, 1)])
+    assert store.top_k("size", 2, largest=False) == [1, 4]
+    assert store.top_k("size", 3) == [2, 0, 3]  # ties in row order, as heapq.nlargest
+    assert store.top_k("size", 2, largest=False, within=[0, 2, 3]) == [0, 3]
+
+
+def test_column_store_keeps_sort_order(trades):
+    with pytest.raises(ValueError):
+        trades.append((0, 1.0, 1, "A"))
+    with pytest.raises(ValueError):
+        trades.extend([(5, 1.0, 1, "A"), (4, 1.0, 1, "A")])
+    assert set(column_lengths(trades).values()) == {3}
+
+
+@pytest.mark.parametrize("row", [
+    (4, 1.0, 2),             # too short
+    (4, 1.0, 2, "s", 5),     # too long
+    (4, 1.0, "x", "s"),      # bad int, after two fields went in
+    (4, 1.0, 2, 7),          # bad string
+    (4, "p", 1, "s"),
+])
+def test_bad_append_leaves_columns_aligned(trades, row):
+    with pytest.raises((TypeError, ValueError)):
+        trades.append(row)
+    assert column_lengths(trades) == dict.fromkeys(SCHEMA, 3)
+
+
+@pytest.mark.parametrize("rows", [
+    [(4, 1.0, 1, "a"), (5,)],
+    [(4, 1.0, 1, "a"), (5, 2.0, "z", "b")],
+    [(4, 1.0, 1, "a")] * 70_000 + [(4, 1.0, 1, 3)],  # fails in the second batch
+])
+def test_bad_extend_is_all_or_nothing(rows):
+    store = ds.ColumnStore(SCHEMA)
+    store.append((0, 0.0, 0, "x"))
+    with pytest.raises((TypeError, ValueError)):
+        store.extend(rows)
+    assert column_lengths(store) == dict.fromkeys(SCHEMA, 1)
+    assert store.row(0) == (0, 0.0, 0, "x")
+
+
+# sort_records (user-021)
+
+needs_numpy = pytest.mark.skipif(ds.load_numpy() is None, reason="NumPy is not installed")
+
+
+@needs_numpy
+@pytest.mark.parametrize("values", [
+    [2**53 + 1, 2**53, 0.5] * 5000,  # mixed int/float: float64 would tie the two big ints
+    [2**63 - 1, -2**63, 0] * 5000,
+    [0.25, -1.5, 3.0] * 5000,
+    [True, 2, False, -1] * 5000,
+    [2**70, 1, -2**70] * 5000,  # beyond int64
+])
+def test_sort_records_numpy_matches_sorted(values):
+    for reverse in (False, True):
+        result = ds.sort_records(values, reverse=reverse, use_numpy=True)
+        expected = sorted(values, reverse=reverse)
+        assert result == expected
+        assert list(map(type, result)) == list(map(type, expected))  # stable, items untouched
+
+
+@needs_numpy
+def test_sort_records_numpy_multiple_keys():
+    records = [(i % 7, 2**53 + i % 3, -i) for i in range(10_000)]
+    keys = (lambda r: r[0], lambda r: r[1], lambda r: r[2])
+    expected = sorted(records, key=lambda r: (-r[0], r[1], r[2]))
+    assert ds.sort_records(records, key=keys, reverse=(True, False, False), use_numpy=True) == expected
+
+
+# IndexedHeap (user-022)
+
+@pytest.mark.parametrize("arity", [2, 4])
+def test_indexed_heap_matches_a_reference(arity):
+    rng = random.Random(arity)
+    heap, live = ds.IndexedHeap(arity=arity), {}  # live: handle → (priority, value)
+    dead = []
+    for step in range(20_000):
+        op = rng.random()
+        if op < 0.4 or not live:
+            priority = rng.randrange(1000)
+            handle = heap.push(priority, step)
+            assert handle not in live and handle not in dead
+            live[handle] = priority, step
+        elif op < 0.6:
+            priority, value = heap.pop()
+            assert priority == min(p for p, _ in live.values())
+            handle = next(h for h, entry in live.items() if entry == (priority, value))
+            dead.append(handle)
+            del live[handle]
+        elif op < 0.8:
+            handle = rng.choice(list(live))
+            priority = rng.randrange(1000)
+            heap.update_priority(handle, priority)
+            live[handle] = priority, live[handle][1]
+        elif op < 0.9:
+            handle = rng.choice(list(live))
+            assert heap.remove(handle) == live.pop(handle)
+            dead.append(handle)
+        else:
+            priority = rng.randrange(1000)
+            smallest = min(live.values())[0]
+            (popped, value), handle = heap.pushpop(priority, step)
+            if handle is None:
+                assert (popped, value) == (priority, step) and priority <= smallest
+            else:
+                assert popped == smallest < priority and handle not in live and handle not in dead
+                old = next(h for h, entry in live.items() if entry == (popped, value))
+                dead.append(old)
+                del live[old]
+                live[handle] = priority, step
+        assert len(heap) == len(live)
+    for handle, (priority, value) in live.items():
+        assert heap.priority(handle) == priority and heap.value(handle) == value
+    for handle in dead[-100:]:
+        assert handle not in heap
+
+
+def test_stale_handles_raise_even_after_reuse():
+    heap = ds.IndexedHeap()
+    backup, email = heap.extend([(3, "backup"), (1, "email")])
+    assert heap.pop() == (1, "email")
+    report = heap.push(2, "report")  # reuses the storage of "email"
+    for stale in (lambda: heap.priority(email), lambda: heap.value(email),
+                  lambda: heap.update_priority(email, 0), lambda: heap.remove(email)):
+        with pytest.raises(KeyError):
+            stale()
+    assert heap.peek() == (2, "report") and heap.value(report) == "report"
+
+    top = heap.peek()
+    popped, cleanup = heap.pushpop(5, "cleanup")  # reuses the storage of "report"
+    assert popped == top and heap.value(cleanup) == "cleanup"
+    with pytest.raises(KeyError):
+        heap.remove(report)
+    heap.update_priority(cleanup, 1)
+    assert heap.pop() == (1, "cleanup") and heap.value(backup) == "backup"
+
+
+def test_pushpop_of_the_smallest_entry_stores_nothing():
+    heap = ds.IndexedHeap([(3, "backup")])
+    assert heap.pushpop(1, "email") == ((1, "email"), None)
+    assert ds.IndexedHeap().pushpop(1, "email") == ((1, "email"), None)
+    assert len(heap) == 1 and heap.peek() == (3, "backup")
+
+
+@pytest.mark.parametrize("arity", [2, 4])
+def test_extend_returns_handles_and_keeps_the_heap(arity):
+    rng = random.Random(arity)
+    heap = ds.IndexedHeap(arity=arity)
+    handles = {heap.push(rng.random(), "pushed"): None for _ in range(50)}
+    heap.pop()  # leaves a free entry behind
+    pairs = [(rng.random(), i) for i in range(500)]
+    loaded = heap.extend(pairs)
+    assert len(loaded) == len(set(loaded)) == 500 and not set(loaded) & set(handles)
+    for handle, (priority, value) in zip(loaded, pairs):
+        assert heap.priority(handle) == priority and heap.value(handle) == value
+    popped = [heap.pop()[0] for _ in range(len(heap))]
+    assert popped == sorted(popped) and len(popped) == 549
+
+
+# Comparator to key (user-021)
+
+def by_value(a, b):
+    return (a > b) - (a < b)
+
+
+def by_score_desc(a, b):  # (name, score) pairs, highest score first
+    return (a[1] < b[1]) - (a[1] > b[1])
+
+
+def by_length_then_text(a, b):  # no single field matches: cmp_to_key fallback
+    return by_value(len(a), len(b)) or by_value(a, b)
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("items, cmp", [
+    ([5, 2, 8, 1, 2, 9, 0], by_value),
+    ([("a", 2), ("b", 3), ("c", 2), ("d", 1), ("e", 3)], by_score_desc),  # ties keep their input order
+    (["ccc", "a", "bb", "ab", "b", "aaa"], by_length_then_text),
+])
+def test_sort_records_cmp_matches_cmp_to_key(items, cmp, reverse):
+    expected = sorted(items, key=ds.cmp_to_key(cmp), reverse=reverse)
+    assert ds.sort_records(items, cmp=cmp, reverse=reverse) == expected
+
+
+def test_key_from_cmp_finds_a_field():
+    records = [("a", 2), ("b", 3), ("c", 1)]
+    key, descending = ds.key_from_cmp(by_score_desc, records)
+    assert key(records[0]) == 2 and descending
+
+
+def test_sort_records_cmp_argument_errors():
+    with pytest.raises(TypeError):
+        ds.sort_records([1], key=abs, cmp=by_value)
+    with pytest.raises(TypeError):
+        ds.sort_records([1], cmp=by_value, reverse=(True,))
+
+
+def test_default_path_skips_numpy_for_non_numeric_keys(monkeypatch):
+    monkeypatch.setattr(ds, "NUMPY_MIN_ITEMS", 10)
+    words = [str(i) for i in range(1_000, 0, -1)]
+    pairs = [(len(word), word) for word in words]
+    assert ds.sort_records(pairs, key=(ds.operator.itemgetter(0), ds.operator.itemgetter(1))) == sorted(pairs)
+    if ds.load_numpy() is not None:
+        assert ds._numpy_order(words, [None], [False]) is None
+
+
+def test_numpy_is_imported_lazily():
+    code = "import runpy, sys; runpy.run_path(sys.argv[1]); sys.exit('numpy' in sys.modules)"
+    subprocess.run([sys.executable, "-c", code, ds.__spec__.origin], check=True)
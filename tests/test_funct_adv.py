@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+
+fa = load_script("funct-adv.py")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# Memoization (user-025)
+
+def test_lru_evicts_the_least_recently_used():
+    calls = []
+
+    @fa.memoize(maxsize=2)
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(1), square(2), square(1), square(3), square(2)] == [1, 4, 1, 9, 4]
+    assert calls == [1, 2, 3, 2]  # 2 was evicted by 3, 1 was used more recently
+    info = square.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.currsize) == (1, 4, 2, 2)
+
+
+def test_lfu_keeps_the_most_used():
+    calls = []
+
+    @fa.memoize(maxsize=2, policy="lfu")
+    def ident(x):
+        calls.append(x)
+        return x
+
+    for x in (1, 1, 1, 2, 3, 1, 2):
+        ident(x)
+    assert calls == [1, 2, 3, 2]  # 2 (one use) went before 3, 1 was never evicted
+
+
+def test_ttl_expires_entries():
+    clock, calls = FakeClock(), []
+
+    @fa.memoize(ttl=10, clock=clock)
+    def load(key):
+        calls.append(key)
+        return len(calls)
+
+    assert load("a") == 1 and load("a") == 1
+    clock.now = 10
+    assert load("a") == 2 and load.cache_info().expired == 1
+
+
+def test_keys_types_and_bad_settings():
+    typed = fa.memoize(typed=True)(lambda x: type(x).__name__)
+    assert typed(1) == "int" and typed(1.0) == "float"
+    untyped = fa.memoize(lambda x, y=0: (x, y))
+    assert untyped(1, y=2) == (1, 2) and untyped(1) == (1, 0)
+    uncached = fa.memoize(maxsize=0)(lambda x: x)
+    uncached(1)
+    assert uncached.cache_info().currsize == 0
+    with pytest.raises(ValueError):
+        fa.memoize(policy="fifo")(len)
+    with pytest.raises(ValueError):
+        fa.memoize(maxsize=None, policy="tinylfu")(len)
+
+
+@pytest.mark.parametrize("policy", ["lru", "tinylfu"])
+def test_tinylfu_resists_a_scan(policy):
+    calls = []
+
+    @fa.memoize(maxsize=10, policy=policy)
+    def fetch(key):
+        calls.append(key)
+        return key
+
+    hot = [f"hot{i}" for i in range(10)]
+    for _ in range(5):
+        for key in hot:
+            fetch(key)
+    calls.clear()
+    for i in range(500):  # a one-off scan (each key seen once) while the hot keys stay in use
+        fetch(f"scan{i}")
+        fetch(hot[i % 10])
+    hot_misses = sum(key.startswith("hot") for key in calls)
+    if policy == "lru":
+        assert hot_misses > 400  # every scanned key pushes a hot one out
+    else:
+        assert hot_misses == 0 and fetch.cache_info().rejections >= 490
+
+
+@pytest.mark.parametrize("policy", ["lru", "lfu", "tinylfu"])
+def test_cache_clear_resets_every_counter(policy):
+    @fa.memoize(maxsize=2, policy=policy)
+    def ident(x):
+        return x
+
+    for x in (1, 1, 1, 2, 2, 2, 3, 4, 3, 4, 5):
+        ident(x)
+    info = ident.cache_info()
+    assert info.evictions + info.rejections > 0
+    ident.cache_clear()
+    assert ident.cache_info() == fa.CacheInfo(0, 0, 0, 0, 0, 0, 2, 0)
+
+
+def test_errors_are_not_cached():
+    attempts = []
+
+    @fa.memoize
+    def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise OSError("first try")
+        return x
+
+    with pytest.raises(OSError):
+        flaky(1)
+    assert flaky(1) == 1 and flaky(1) == 1 and len(attempts) == 2
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_concurrent_misses_compute_once(fail):
+    computed, results = [], []
+
+    @fa.memoize
+    def slow(key):
+        computed.append(key)
+        time.sleep(0.05)
+        if fail:
+            raise KeyError(key)
+        return key.upper()
+
+    def call():
+        try:
+            results.append(slow("report"))
+        except KeyError as exc:
+            results.append(exc)
+
+    crowd = [threading.Thread(target=call) for _ in range(16)]
+    for worker in crowd:
+        worker.start()
+    for worker in crowd:
+        worker.join()
+    assert computed == ["report"] and len(results) == 16
+    if fail:
+        assert all(isinstance(result, KeyError) for result in results)
+    else:
+        assert results == ["REPORT"] * 16 and slow.cache_info().coalesced == 15
+
+
+def test_recursion_on_the_same_key_does_not_deadlock():
+    @fa.memoize
+    def depth(n, again=True):
+        return depth(n, again=False) if again else n
+
+    assert depth(3) == 3
+
+
+def test_async_single_flight():
+    computed = []
+
+    @fa.memoize
+    async def fetch(key):
+        computed.append(key)
+        await asyncio.sleep(0.02)
+        return key * 2
+
+    async def crowd():
+        first = await asyncio.gather(*(fetch(21) for _ in range(10)))
+        return first, await fetch(21)
+
+    assert asyncio.run(crowd()) == ([42] * 10, 42)
+    assert computed == [21]
@@ -0,0 +1,73 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import load_script
+
+le = load_script("lazy-evaluation.py")
+
+
+# Lazy stream (user-020)
+
+def test_stream_stages():
+    assert le.Stream(le.my_generator()).map(lambda x: x * 10).to_list() == [10, 20, 30]
+    assert le.Stream(range(10)).filter(lambda x: x % 3 == 0).to_list() == [0, 3, 6, 9]
+    assert le.Stream(range(7)).batch(3).to_list() == [[0, 1, 2], [3, 4, 5], [6]]
+    assert le.Stream("aaabccdd").groupby().map(lambda g: (g[0], len(g[1]))).to_list() == [
+        ("a", 3), ("b", 1), ("c", 2), ("d", 2)]
+
+
+@pytest.mark.parametrize("size, step, expected", [
+    (3, 2, [(0, 1, 2), (2, 3, 4), (4, 5, 6)]),
+    (2, 1, [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5), (5, 6)]),
+    (8, 1, []),
+])
+def test_window(size, step, expected):
+    assert le.Stream(range(7)).window(size, step).to_list() == expected
+
+
+@pytest.mark.parametrize("window, expected", [
+    (1, [1, 2, 1, 3, 2]), (2, [1, 2, 3]), (None, [1, 2, 3]),
+])
+def test_dedupe(window, expected):
+    assert le.Stream([1, 1, 2, 1, 3, 3, 2]).dedupe(window=window).to_list() == expected
+
+
+def test_merge_sorted():
+    assert le.Stream([1, 4, 9]).merge_sorted([2, 3], le.Stream([5])).dedupe().take(4).to_list() == [1, 2, 3, 4]
+    assert le.Stream([9, 4]).merge_sorted([5, 1], reverse=True).to_list() == [9, 5, 4, 1]
+
+
+def test_stream_is_lazy():
+    seen = []
+    source = le.Stream(itertools.count()).map(lambda x: seen.append(x) or x)
+    assert source.filter(lambda x: x % 2).take(3).to_list() == [1, 3, 5]
+    assert seen == list(range(6))  # an infinite source, only what take() needed
+
+
+def test_parallel_map_keeps_order_and_bounds_in_flight():
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow_increment(x):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        threading.Event().wait(0.001)
+        with lock:
+            running[0] -= 1
+        return x + 1
+
+    with ThreadPoolExecutor(8) as pool:
+        assert le.Stream(range(200)).parallel_map(slow_increment, pool, ahead=4).to_list() == list(range(1, 201))
+    assert peak[0] <= 4
+
+
+def test_profile_reports_every_stage():
+    stream = le.Stream(range(1_000), profile=True).map(lambda x: x * x).filter(lambda x: x % 2 == 0).batch(10)
+    assert len(stream.to_list()) == 50
+    rows = stream.report()
+    assert [row["stage"] for row in rows] == ["source", "map", "filter", "batch"]
+    assert [row["items"] for row in rows] == [1_000, 1_000, 500, 50]
+    assert all(row["seconds"] >= row["self_seconds"] for row in rows)
@@ -0,0 +1,367 @@
+import concurrent.futures
+import importlib.util
+import itertools
+import json
+import pathlib
+import py_compile
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import load_script
+
+mtp = load_script("multi-threading-processing.py")
+
+
+def fail_at(value, exc_type):
+    def func(x):
+        if x == value:
+            raise exc_type(x)
+        return x
+    return func
+
+
+def failing_source():
+    yield from range(100)
+    raise OSError("source")
+
+
+async def async_fail(x):
+    if x == 700:
+        raise KeyError(x)
+    return x
+
+
+def process_fail(x):
+    if x == 300:
+        raise RuntimeError(x)
+    return x
+
+
+# cpu_task engine (user-001)
+
+@pytest.mark.parametrize("start, stop", [(0, 0), (0, 1), (3, 1_000), (10**6, 10**6 + 5), (3 * 10**9, 3 * 10**9 + 10)])
+def test_square_kernels_agree(start, stop):
+    expected = mtp.squares_loop(start, stop)
+    assert mtp.squares_closed(start, stop) == expected
+    if mtp.load_numpy() is not None:
+        assert mtp.squares_numpy(start, stop) == expected  # exact even where int64 would overflow
+
+
+@pytest.mark.parametrize("backend", ["auto", "loop", "closed"])
+def test_cpu_task_fast_matches_cpu_task(backend):
+    assert mtp.cpu_task_fast(200_000, backend=backend, workers=2) == mtp.cpu_task(200_000)
+    assert mtp.cpu_task_fast(1_000, backend=backend) == mtp.cpu_task(1_000)
+
+
+def test_cpu_task_fast_exact_and_bad_backend():
+    assert mtp.cpu_task_fast(10**12, exact=True) == mtp.squares_closed(0, 10**12)
+    with pytest.raises(ValueError):
+        mtp.cpu_task_fast(10, backend="gpu")
+
+
+def test_chunk_bounds_cover_the_range():
+    bounds = mtp.chunk_bounds(10, 3)
+    assert bounds == [(0, 4), (4, 8), (8, 10)]
+    assert mtp.chunk_bounds(2, 8) == [(0, 1), (1, 2)]
+
+
+# Benchmark harness (user-002)
+
+def test_median_and_percentile():
+    assert mtp.median([3, 1, 2]) == 2 and mtp.median([4, 1, 2, 3]) == 2.5
+    assert mtp.percentile(list(range(1, 101)), 95) == 95
+    assert mtp.percentile([7], 95) == 7
+
+
+def test_run_benchmarks_reports_every_configuration(tmp_path):
+    path = tmp_path / "report.json"
+    report = mtp.run_benchmarks(worker_counts=(1, 2), sizes=(10_000,), repeats=2,
+                                backends=("threads", "thread_pool"), json_path=path)
+    assert {(row["backend"], row["workers"]) for row in report["results"]} == {
+        ("threads", 1), ("threads", 2), ("thread_pool", 1), ("thread_pool", 2)}
+    for row in report["results"]:
+        assert row["min"] <= row["median"] <= row["p95"]
+        assert row["efficiency"] == pytest.approx(row["speedup"] / row["workers"])
+    assert set(report["interpreter"]) >= {"free_threaded_build", "gil_enabled"}
+    assert json.loads(path.read_text()) == report
+
+
+# Warm worker pool (user-003)
+
+@pytest.fixture(scope="module")
+def warm_pool():
+    pool = mtp.WarmPool(processes=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_warm_pool_reuses_its_workers(warm_pool):
+    assert list(warm_pool.map(mtp.square, range(10))) == [n * n for n in range(10)]
+    pids = {warm_pool.submit(mtp.os.getpid).result() for _ in range(20)}
+    assert pids <= set(warm_pool._workers) and warm_pool.metrics()["tasks"] >= 30
+
+
+def test_warm_pool_returns_task_errors(warm_pool):
+    with pytest.raises(RuntimeError, match="300"):
+        warm_pool.submit(process_fail, 300).result(timeout=5)
+    assert warm_pool.submit(process_fail, 1).result(timeout=5) == 1
+
+
+def test_warm_pool_recycles_workers_after_max_tasks():
+    with mtp.WarmPool(processes=1, max_tasks_per_worker=2) as pool:
+        pids = [pool.submit(mtp.os.getpid).result(timeout=5) for _ in range(6)]
+        assert len(set(pids)) == 3 and pool.metrics()["recycled"] >= 2
+    with pytest.raises(RuntimeError):
+        pool.submit(mtp.square, 2)
+
+
+def crash(code):
+    mtp.os._exit(code)
+
+
+def test_warm_pool_fails_the_task_of_a_crashed_worker():
+    with mtp.WarmPool(processes=2) as pool:
+        doomed = pool.submit(crash, 3)
+        others = [pool.submit(mtp.square, n) for n in range(20)]
+        with pytest.raises(concurrent.futures.BrokenExecutor, match="exit code 3"):
+            doomed.result(timeout=5)
+        assert [future.result(timeout=5) for future in others] == [n * n for n in range(20)]
+        assert pool.submit(mtp.square, 7).result(timeout=5) == 49  # the worker was replaced
+        assert pool.metrics()["pending"] == 0 and pool.metrics()["workers"] == 2
+
+
+def test_run_processes_on_the_warm_pool(warm_pool):
+    assert mtp.run_processes(2, 1_000, pool=warm_pool) >= 0
+
+
+# Adaptive batching (user-004)
+
+def test_adaptive_imap_keeps_input_order(warm_pool):
+    numbers = list(range(5_000))
+    assert list(mtp.adaptive_imap(mtp.square, numbers, pool=warm_pool, sample_size=100)) == [n * n for n in numbers]
+    assert list(mtp.adaptive_imap(mtp.square, iter(numbers), pool=warm_pool, sample_size=100)) == [
+        n * n for n in numbers]  # a plain iterator continues where the sample stopped
+    assert list(mtp.adaptive_imap(mtp.square, [], pool=warm_pool)) == []
+
+
+def test_adaptive_imap_chunks_stay_arrays(warm_pool):
+    numbers = mtp.array.array("q", range(5_000))
+    blocks = list(mtp.adaptive_imap(mtp.square, numbers, pool=warm_pool, sample_size=100, chunks=True))
+    assert all(isinstance(block, mtp.array.array) and block.typecode == "q" for block in blocks)
+    assert [n for block in blocks for n in block] == [n * n for n in range(5_000)]
+
+
+def test_adaptive_imap_early_stop_leaves_the_pool_usable(warm_pool):
+    results = mtp.adaptive_imap(mtp.square, range(100_000), pool=warm_pool, sample_size=10, max_in_flight=2)
+    assert next(results) == 0
+    results.close()
+    assert warm_pool.submit(mtp.square, 3).result(timeout=5) == 9
+
+
+# Batched queue (user-006)
+
+def test_batch_queue_moves_batches_in_order():
+    q = mtp.BatchQueue(maxsize=8)
+    q.put_many(range(5))
+    q.put(5)
+    assert q.get_many(4) == [0, 1, 2, 3] and q.get_many() == [4, 5]
+    assert q.get_many(timeout=0.01) == []
+    assert q.stats["put"] == q.stats["got"] == 6
+
+
+def test_batch_queue_applies_backpressure():
+    q = mtp.BatchQueue(maxsize=4)
+    producer = threading.Thread(target=q.put_many, args=(range(10),))
+    producer.start()
+    time.sleep(0.05)
+    assert q.qsize() == 4 and producer.is_alive()
+    got = []
+    while len(got) < 10:
+        got += q.get_many(3)
+    producer.join(timeout=2)
+    assert got == list(range(10)) and q.stats["full_waits"] >= 1
+
+
+@pytest.mark.parametrize("maxsize", [0, -1])
+def test_batch_queue_maxsize_zero_is_unbounded(maxsize):
+    q = mtp.BatchQueue(maxsize)
+    producer = threading.Thread(target=q.put_many, args=(range(100_000),))
+    producer.start()
+    producer.join(timeout=2)
+    assert not producer.is_alive() and q.qsize() == 100_000
+
+
+def test_run_pipeline_handles_every_item():
+    stats = mtp.run_pipeline([range(10_000)] * 3, handle_batch=len, consumers=2, batch_size=100, maxsize=0)
+    assert stats["items"] == sum(stats["per_consumer"]) == 30_000
+    assert list(mtp.Pipeline(maxsize=0).stage(lambda x: x * 2).run(range(1_000))) == [x * 2 for x in range(1_000)]
+
+
+# Pipeline (user-007)
+
+def test_pipeline_runs_all_stage_kinds():
+    pipeline = (mtp.Pipeline()
+                .stage(lambda x: x + 1, workers=4)
+                .stage(mtp.cpu_task, kind="process", workers=2)
+                .stage(mtp.write_record, kind="async", workers=8))
+    assert sorted(pipeline.run(range(200))) == sorted(mtp.cpu_task(x + 1) for x in range(200))
+    assert pipeline.report()["bottleneck"] is not None
+
+
+@pytest.mark.parametrize("pipeline, exc_type", [
+    (lambda: mtp.Pipeline().stage(fail_at(500, ValueError), workers=3), ValueError),
+    (lambda: mtp.Pipeline().stage(async_fail, kind="async", workers=4), KeyError),
+    (lambda: mtp.Pipeline().stage(process_fail, kind="process", workers=2), RuntimeError),
+    (lambda: mtp.Pipeline().stage(fail_at(500, ValueError)).stage(async_fail, kind="async"), ValueError),
+])
+def test_pipeline_stage_failure_is_reraised(pipeline, exc_type):
+    with pytest.raises(exc_type):
+        list(pipeline().run(range(2_000)))
+
+
+def test_pipeline_source_failure_is_reraised():
+    with pytest.raises(OSError, match="source"):
+        list(mtp.Pipeline().stage(lambda x: x).run(failing_source()))
+
+
+def test_pipeline_early_close_stops_an_unbounded_source():
+    pulled = []
+
+    def endless():
+        for n in itertools.count():
+            pulled.append(n)
+            yield n
+
+    def consume():
+        results = mtp.Pipeline(batch_size=8, maxsize=32).stage(lambda x: x + 1, workers=2).run(endless())
+        assert next(results) in range(1, 100)
+        results.close()
+
+    closer = threading.Thread(target=consume, daemon=True)
+    closer.start()
+    closer.join(timeout=5)
+    assert not closer.is_alive(), "close() kept reading the source"
+    assert len(pulled) < 1_000
+
+
+# Work-stealing scheduler (user-008)
+
+@pytest.fixture
+def scheduler():
+    scheduler = mtp.WorkStealingScheduler(4, grain=100)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_stealing_matches_cpu_task(scheduler):
+    assert mtp.cpu_task_stealing(100_000, scheduler) == mtp.cpu_task(100_000)
+    assert scheduler.submit(pow, 2, 10).result() == 1024
+
+
+def test_kernel_failure_reraised_and_workers_survive(scheduler):
+    def kernel(lo, hi):
+        if lo <= 5_000 < hi:
+            raise ValueError("kernel")
+        return hi - lo
+
+    with pytest.raises(ValueError, match="kernel"):
+        scheduler.map_range(kernel, 0, 100_000)
+    assert all(t.is_alive() for t in scheduler._threads)
+    assert scheduler.map_range(lambda lo, hi: hi - lo, 0, 100_000) == 100_000
+
+
+def test_wait_timeout_raises(scheduler):
+    release = threading.Event()
+    job = scheduler.run_range(lambda lo, hi: release.wait() and 1, 0, 10, grain=10)
+    with pytest.raises(TimeoutError):
+        job.wait(0.05)
+    release.set()
+    assert job.wait(5) == 1
+
+
+def test_idle_workers_do_not_poll(scheduler):
+    time.sleep(0.05)
+    start = time.process_time()
+    time.sleep(0.3)
+    assert time.process_time() - start < 0.05
+
+
+# Import-time budget (user-009)
+
+# Two budgets. A cold import pays for the stdlib modules the file needs at import time (concurrent.futures
+# and multiprocessing alone are ~30 ms cold on a laptop), which no code in the file can avoid: the cold
+# budget only catches a heavy import (NumPy, asyncio, ...) or work creeping back in. The file's own code
+# gets the tight budget, measured with those stdlib modules already loaded.
+COLD_IMPORT_BUDGET_MS = 100.0
+OWN_IMPORT_BUDGET_MS = 5.0
+STDLIB_IMPORTS = ("array", "atexit", "collections", "concurrent.futures", "functools", "itertools", "math",
+                  "multiprocessing", "os", "pickle", "queue", "random", "sys", "threading", "time")
+LAZY_MODULES = ("numpy", "asyncio", "uvloop", "statistics", "json", "argparse", "subprocess",
+                "concurrent.futures.process", "multiprocessing.shared_memory")
+
+
+@pytest.fixture(scope="module")
+def import_probe(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("import")
+    probe = directory / "mtp_probe.py"  # an importable name for the hyphenated file
+    shutil.copy(mtp.__spec__.origin, probe)
+    py_compile.compile(str(probe), cfile=importlib.util.cache_from_source(str(probe)))  # time the import, not the compile
+    return directory
+
+
+def import_ms(directory, preload=()):
+    # A fresh interpreter each time: -X importtime's cumulative column for mtp_probe covers every module
+    # its import loads, so it is the real cost unless `preload` has loaded some of them already
+    code = "".join(f"import {name}\n" for name in ("sys", *preload)) + (
+        "import mtp_probe\n"
+        f"print(*sorted(set({LAZY_MODULES!r}) & set(sys.modules)))")
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=directory,
+                         capture_output=True, text=True, check=True)
+    line = next(line for line in run.stderr.splitlines() if line.endswith("| mtp_probe"))
+    return int(line.split("|")[1]) / 1000, run.stdout.split()
+
+
+def test_cold_import_stays_within_budget(import_probe):
+    samples = [import_ms(import_probe) for _ in range(3)]
+    assert samples[0][1] == [], f"imported eagerly: {samples[0][1]}"
+    best = min(ms for ms, _ in samples)
+    assert best <= COLD_IMPORT_BUDGET_MS, f"a cold import took {best:.1f} ms, budget {COLD_IMPORT_BUDGET_MS} ms"
+
+
+def test_import_of_the_files_own_code_stays_within_budget(import_probe):
+    best = min(import_ms(import_probe, STDLIB_IMPORTS)[0] for _ in range(3))
+    assert best <= OWN_IMPORT_BUDGET_MS, (f"importing took {best:.1f} ms on top of the stdlib, "
+                                          f"budget {OWN_IMPORT_BUDGET_MS} ms")
+
+
+# Shared-memory results (user-005)
+
+def test_shared_array_round_trip():
+    with mtp.SharedArray("q", 3) as shared:
+        with mtp.SharedArray.attach(shared.handle) as other:
+            other[:] = mtp.array.array("q", [1, 2, 3])
+        assert shared[:].tolist() == [1, 2, 3]
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn", "forkserver"])
+def test_shared_results_without_tracker_warnings(tmp_path, method):
+    # A fresh interpreter: resource tracker warnings only show up on its stderr at exit. Spawned workers
+    # import the module by name, so it gets an importable copy.
+    shutil.copy(mtp.__spec__.origin, tmp_path / "mtp_shared.py")
+    code = ("import multiprocessing\n"
+            "import mtp_shared as mtp\n"
+            "if __name__ == '__main__':\n"
+            f"    multiprocessing.set_start_method({method!r})\n"
+            "    mtp.compare_result_transfer(sizes_mb=(1,))\n"  # pool workers started before the block exists
+            "    print(mtp.run_processes_shared(2, 10_000) == [mtp.cpu_task(10_000)] * 2)\n")  # started after
+    script = tmp_path / "main.py"
+    script.write_text(code)
+    run = subprocess.run([sys.executable, str(script)], cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert run.returncode == 0, run.stderr
+    assert run.stdout.split()[-1] == "True"
+    assert "resource_tracker" not in run.stderr and "Traceback" not in run.stderr, run.stderr